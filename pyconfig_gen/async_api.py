@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+#
+# An asyncio API to config.txt, the regdom file and the display probe,
+# for callers (e.g. device agents) whose event loop must not block on
+# file I/O or on tvservice: file reads and writes run on a bounded pool
+# of threads, and tvservice runs as an asyncio subprocess, a limited
+# number at a time, killed if it overruns its timeout or its query is
+# cancelled
+#
+# the caches are those of the sync API: files are read through the
+# process-wide caches of file_watch.py (so the query daemon, say, and
+# this API parse each version of a file once between them), and probes
+# go through a DisplayProbe's query table and on-disk mode cache (so a
+# listing fetched by either API is fetched once)
+#
+# edits are made in transactions:
+#
+#   async with api.transaction(config_path, regdom_path) as (config, regdom):
+#       set_config_var("gpu_mem", 128, config)
+#
+# edit copies of the files as read, and on a clean exit save them, in a
+# single commit (see boot_commit.py), unless either file has changed
+# since (TransactionConflict), in which case nothing is written
+#
+# License: GPL v3+
+# NO WARRANTY
+
+import os, signal, asyncio, functools, threading
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, Future
+from pyconfig_gen.config_utils import *
+from pyconfig_gen.settings import read_settings_from_config
+from pyconfig_gen.display_probe import DisplayProbe, ModeCache, MODE_GROUPS
+from pyconfig_gen.file_watch import shared_cached_config_file, memoized
+from pyconfig_gen.boot_commit import save_config_files
+from pyconfig_gen import paths
+
+# seconds a tvservice query may take before it is killed
+PROBE_TIMEOUT = 10.0
+
+# commits in this process are made one at a time, so a conflict check
+# and the writes it guards cannot interleave with another's
+commit_lock = threading.Lock()
+
+class TransactionConflict(ValueError):
+    pass
+
+class ConfigTransaction:
+    # an async context manager, yielding copies of the given files (as
+    # ConfigFiles, regdom being None if regdom_path is) to edit, and
+    # saving them on a clean exit; written then lists the paths written
+    def __init__(self, api, config_path, regdom_path = None):
+        self.api = api
+        self.paths = [p for p in [config_path, regdom_path] if p is not None]
+        self.entries = []
+        self.written = []
+
+    async def __aenter__(self):
+        for p in self.paths:
+            cache = shared_cached_config_file(p)
+            (config, _, version) = await self.api.run_io(cache.current)
+            self.entries.append((cache, version, config.copy()))
+        copies = [c for (_, _, c) in self.entries]
+        return((copies[0], copies[1] if len(copies) > 1 else None))
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            # once started, a commit is seen through, even if the caller
+            # is cancelled meanwhile
+            await asyncio.shield(self.api.run_io(self.commit))
+        return(False)
+
+    def commit(self):
+        with commit_lock:
+            for (cache, version, config) in self.entries:
+                if cache.current()[2] != version:
+                    raise TransactionConflict(f"{config.path}: changed since read")
+            try:
+                # the config last, as for the GUI
+                self.written = save_config_files([c for (_, _, c) in reversed(self.entries)])
+            finally:
+                for (cache, _, _) in self.entries:
+                    cache.invalidate()
+
+class AsyncDisplayProbe:
+    # the queries of a DisplayProbe, made awaitable; results are shared
+    # through its query table with its sync users (and vice versa)
+    #
+    # a caller cancelled while awaiting a query stops waiting for it,
+    # but the query runs on (bounded by timeout) for any other callers;
+    # close() cancels every query still running
+    def __init__(self, probe, max_processes = 2, timeout = PROBE_TIMEOUT):
+        self.probe = probe
+        self.timeout = timeout
+        self.process_limit = asyncio.Semaphore(max_processes)
+        self.tasks = set()
+
+    async def run_command(self, cmd):
+        async with self.process_limit:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, stdout = asyncio.subprocess.PIPE,
+                stderr = asyncio.subprocess.DEVNULL, start_new_session = True)
+            try:
+                (out, _) = await asyncio.wait_for(proc.communicate(), self.timeout)
+            except BaseException:
+                # timed out, or cancelled; the whole process group is
+                # killed, as the process is waited for until anything
+                # holding its output open has gone
+                if proc.returncode is None:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                    await proc.wait()
+                raise
+        return(out.decode("utf-8"))
+
+    async def backend_output(self, name, *args):
+        # the result of the backend's method name: via a subprocess,
+        # where the backend says what to run, else on the probe's pool
+        command_fn = getattr(self.probe.backend, f"{name}_command", None)
+        if command_fn is not None:
+            return(await self.run_command(command_fn(*args)))
+        loop = asyncio.get_running_loop()
+        return(await loop.run_in_executor(
+            self.probe.executor, functools.partial(getattr(self.probe.backend, name), *args)))
+
+    def forget(self, key, future):
+        # failed queries are forgotten, to be retried when next asked
+        with self.probe.lock:
+            if self.probe.queries.get(key) is future:
+                del self.probe.queries[key]
+
+    async def fill(self, key, future, fn):
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self.forget(key, future)
+            future.cancel()
+            raise
+        except Exception as e:
+            self.forget(key, future)
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    async def query(self, key, fn):
+        # as DisplayProbe.query, awaiting the result
+        with self.probe.lock:
+            f = self.probe.queries.get(key)
+            if f is None:
+                f = self.probe.queries[key] = Future()
+                task = asyncio.ensure_future(self.fill(key, f, fn))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+        # shielded, so one caller's cancellation leaves the shared future
+        # (and the other callers) alone
+        return(await asyncio.shield(asyncio.wrap_future(f)))
+
+    async def display_list(self):
+        return(await self.query("list", lambda: self.backend_output("display_list")))
+
+    async def mode_listing(self, target, hdmi_index):
+        async def run():
+            display_list = await self.display_list()
+            return(await self.backend_output("mode_listing", target, hdmi_index, display_list))
+        return(await self.query((target, hdmi_index), run))
+
+    async def load_from_cache(self):
+        # as DisplayProbe.load_from_cache
+        await self.display_list()
+        return(self.probe.load_from_cache())
+
+    async def save_to_cache(self, hdmi_indices):
+        await asyncio.gather(*[self.mode_listing(t, i) for i in hdmi_indices for t in MODE_GROUPS])
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.probe.executor, self.probe.save_to_cache, hdmi_indices)
+
+    async def valid_modes(self, target, base_mode_txt, hdmi_index = 0):
+        return(modes_from_tvservice_output(
+            await self.mode_listing(target, hdmi_index), base_mode_txt))
+
+    async def port_modes(self, hdmi_index, base_mode_txt, fallback = False):
+        # as DisplayProbe.port_modes, with both groups queried together
+        if not fallback:
+            ((cea_modes, cea_modes_txt), (dmt_modes, dmt_modes_txt)) = await asyncio.gather(
+                self.valid_modes("CEA", base_mode_txt, hdmi_index),
+                self.valid_modes("DMT", base_mode_txt, hdmi_index))
+            if len(cea_modes) > 1 or len(dmt_modes) > 1:
+                return(cea_modes, cea_modes_txt, dmt_modes, dmt_modes_txt, False)
+        (cea_modes, cea_modes_txt) = get_fallback_modes("CEA", base_mode_txt)
+        (dmt_modes, dmt_modes_txt) = get_fallback_modes("DMT", base_mode_txt)
+        return(cea_modes, cea_modes_txt, dmt_modes, dmt_modes_txt, True)
+
+    async def close(self):
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions = True)
+
+class AsyncConfigAPI:
+    # at most max_io file operations, and max_probes probe subprocesses,
+    # run at once; probe may be a DisplayProbe to share (e.g. the GUI's),
+    # else one (with the usual on-disk cache) is made on first use
+    def __init__(self, max_io = 4, max_probes = 2, probe = None,
+                 probe_timeout = PROBE_TIMEOUT, use_fake_data = False):
+        self.executor = ThreadPoolExecutor(max_workers = max_io, thread_name_prefix = "async_api")
+        self.max_probes = max_probes
+        self.probe_timeout = probe_timeout
+        self.use_fake_data = use_fake_data
+        self.shared_probe = probe
+        self.own_probe = None
+        self.async_probe = None
+
+    async def run_io(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return(await loop.run_in_executor(self.executor, functools.partial(fn, *args)))
+
+    async def load(self, path):
+        # (ConfigFile, memo dict, version) for the file as it is now, as
+        # CachedConfigFile.current; the ConfigFile must not be edited
+        return(await self.run_io(shared_cached_config_file(path).current))
+
+    async def get(self, qualified_key, config_path, default = None, int_cast = True):
+        # as get_config_var
+        (config, memo, _) = await self.load(config_path)
+        value = memoized(memo, ("get", qualified_key, int_cast),
+                         lambda: get_config_var(qualified_key, config, None, int_cast))
+        return(default if value is None else value)
+
+    async def read_settings(self, config_path, regdom_path):
+        # a fresh namespace of the settings, as read_settings_from_config
+        ((config, memo, _), (regdom, _, regdom_version)) = await asyncio.gather(
+            self.load(config_path), self.load(regdom_path))
+        def read():
+            state = SimpleNamespace()
+            read_settings_from_config(state, config, regdom)
+            return(state)
+        return(SimpleNamespace(**vars(memoized(memo, ("state", regdom_version), read))))
+
+    def transaction(self, config_path, regdom_path = None):
+        return(ConfigTransaction(self, config_path, regdom_path))
+
+    def probe(self):
+        # the AsyncDisplayProbe, created on first use
+        if self.async_probe is None:
+            probe = self.shared_probe
+            if probe is None:
+                probe = self.own_probe = DisplayProbe(
+                    self.use_fake_data,
+                    cache = None if self.use_fake_data else ModeCache(paths.display_mode_cache_path()))
+            self.async_probe = AsyncDisplayProbe(probe, self.max_probes, self.probe_timeout)
+        return(self.async_probe)
+
+    async def valid_modes(self, target, base_mode_txt, hdmi_index = 0):
+        return(await self.probe().valid_modes(target, base_mode_txt, hdmi_index))
+
+    async def port_modes(self, hdmi_index, base_mode_txt, fallback = False):
+        return(await self.probe().port_modes(hdmi_index, base_mode_txt, fallback))
+
+    async def close(self):
+        # cancel running probes, and release the pools
+        if self.async_probe is not None:
+            await self.async_probe.close()
+        if self.own_probe is not None:
+            self.own_probe.shutdown(wait = False)
+        self.executor.shutdown(wait = False)
+
+    async def __aenter__(self):
+        return(self)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return(False)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+#
+# Replacing several files (config.txt, its last-known-good copy, the
+# regdom file, the wifi module's options, cmdline.txt, ...) as a single
+# commit: the new contents are staged beside their targets, and synced
+# as a batch; a journal listing the renames still to do is then synced,
+# the staged files renamed into place in the order given (config.txt
+# last, say, so the rest are in place before it takes effect), their
+# directories synced, and the journal removed
+#
+# an interrupted commit is thus either wholly undone (before the journal
+# is written, nothing has been replaced) or finished on recovery (the
+# journal's renames are re-done, those whose staged file has gone having
+# been done already); recovery is run before each commit, and by the
+# GUI on startup
+#
+# License: GPL v3+
+# NO WARRANTY
+
+import os, json, shutil
+from pathlib import Path
+from pyconfig_gen.config_utils import *
+
+STAGED_SUFFIX = ".new"
+JOURNAL_SUFFIX = ".jnl"
+
+def journal_path_for(path):
+    # the journal for commits ending with path (e.g. /boot/config.txt.jnl)
+    return(f"{path}{JOURNAL_SUFFIX}")
+
+def sync_dirs(paths):
+    # make renames (and removals) in the directories of paths durable,
+    # once per directory
+    for d in dict.fromkeys(os.path.dirname(os.path.abspath(p)) for p in paths):
+        fd = os.open(d, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass # not supported for directories on some filesystems
+        finally:
+            os.close(fd)
+
+def recover_commit(journal_path):
+    # finish the commit interrupted with journal_path in place, if any;
+    # return the paths it replaced
+    try:
+        with open(journal_path, "r") as f:
+            renames = json.load(f)["renames"]
+    except FileNotFoundError:
+        return([])
+    except (ValueError, KeyError, TypeError):
+        # never completely written (so no renames began); nothing to do
+        renames = []
+    done = []
+    for (staged, path) in renames:
+        if Path(staged).is_file():
+            os.replace(staged, path)
+            done.append(path)
+    sync_dirs([p for (_, p) in renames])
+    os.remove(journal_path)
+    return(done)
+
+class BootCommit:
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        self.staged = []
+
+    def stage(self, path, lines):
+        # replace path's contents with lines; files are replaced in the
+        # order they are staged
+        self.stage_bytes(path, "".join(lines).encode("utf-8", "surrogateescape"))
+
+    def stage_bytes(self, path, data):
+        # as stage, with the contents as they are to be written (e.g. a
+        # byte-for-byte copy of another file)
+        self.staged.append((path, data))
+
+    def stage_config(self, config):
+        # a ConfigFile's edits, if any
+        if config.is_modified():
+            self.stage(config.path, config.lines)
+
+    def unchanged(self, path, data):
+        try:
+            return(Path(path).read_bytes() == data)
+        except OSError:
+            return(False)
+
+    def commit(self):
+        # replace the staged files (those whose contents differ); return
+        # the paths written
+        recover_commit(self.journal_path)
+        todo = [(p, t) for (p, t) in self.staged if not self.unchanged(p, t)]
+        if not todo:
+            return([])
+        renames = [(f"{p}{STAGED_SUFFIX}", p) for (p, _) in todo]
+        try:
+            files = []
+            try:
+                for ((staged, path), (_, data)) in zip(renames, todo):
+                    f = open(staged, "wb")
+                    files.append(f)
+                    f.write(data)
+                    if Path(path).is_file():
+                        shutil.copymode(path, staged)
+                # the writes are all issued before any is waited for
+                for f in files:
+                    f.flush()
+                    os.fsync(f.fileno())
+            finally:
+                for f in files:
+                    f.close()
+            tmp_journal = f"{self.journal_path}{STAGED_SUFFIX}"
+            with open(tmp_journal, "w") as f:
+                json.dump({"renames": renames}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_journal, self.journal_path)
+            sync_dirs([self.journal_path])
+        except BaseException:
+            # nothing replaced yet; undo the staging
+            for staged in [s for (s, _) in renames] + [f"{self.journal_path}{STAGED_SUFFIX}"]:
+                if Path(staged).is_file():
+                    os.remove(staged)
+            raise
+        # from here, an interruption is finished by recover_commit
+        for (staged, path) in renames:
+            os.replace(staged, path)
+        sync_dirs([p for (_, p) in renames])
+        os.remove(self.journal_path)
+        self.staged = []
+        return([p for (p, _) in todo])
+
+def save_config_files(configs, journal_path = None):
+    # save the given ConfigFiles (those edited) in a single commit, in the
+    # order given, the journal going beside the last; any saved otherwise
+    # than to a file of their own (e.g. into a disk image) are saved
+    # separately, after; return the paths written
+    plain = [c for c in configs if c.path is not None and type(c).save is ConfigFile.save]
+    written = []
+    if plain:
+        commit = BootCommit(journal_path or journal_path_for(plain[-1].path))
+        for c in plain:
+            commit.stage_config(c)
+        written = commit.commit()
+        for c in plain:
+            c.saved_lines = list(c.lines)
+    for c in configs:
+        if c not in plain and c.save():
+            written.append(c.path)
+    return(written)
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+#
+# Headless command-line interface to config.txt (and files in the same
+# key=value format, such as the wifi regdom file), for scripted use;
+# imports no Qt, so needs no display and starts quickly
+#
+#   pyconfig_gen-cli get KEY...        print values (exit 1 if any unset)
+#   pyconfig_gen-cli set KEY VALUE     set KEY (uncommenting / adding it)
+#   pyconfig_gen-cli unset KEY...      comment KEY out
+#   pyconfig_gen-cli diff OTHER        material differences from OTHER
+#   pyconfig_gen-cli show             list all active settings
+#   pyconfig_gen-cli validate         check against the rules (exit 1 on errors)
+#   pyconfig_gen-cli overlays [NAME]  list installed overlays, or NAME's parameters
+#   pyconfig_gen-cli apply PROFILE     reconcile with a profile (see profile.py)
+#   pyconfig_gen-cli fleet ROOT ...    apply to every boot dir under ROOT
+#   pyconfig_gen-cli audit ROOT...     report every setting of each of them
+#   pyconfig_gen-cli index ROOT...     (re)build a SQLite index of them
+#   pyconfig_gen-cli query TERM...     list those matching, from the index
+#   pyconfig_gen-cli serve             answer queries over a Unix socket
+#
+# keys may be qualified by section, as elsewhere: "arm_freq@pi4"; the
+# file (or OTHER) may also be a raw disk image, whose boot partition's
+# config.txt is then used
+#
+# the modules only some commands need (those working on many targets,
+# or serving) are imported by those commands, keeping the start of the
+# rest quick
+#
+# License: GPL v3+
+# NO WARRANTY
+
+import os, sys, json, argparse
+from pyconfig_gen.config_utils import *
+from pyconfig_gen.paths import CONFIG_PATHNAME, WIFI_REGDOM_PATHNAME, QUERY_SOCKET_PATHNAME, \
+    settings_index_path, overlay_catalog_cache_path
+from pyconfig_gen.profile import load_profile, apply_profile, ProfileError
+from pyconfig_gen.disk_image import is_disk_image, ImageConfigFile
+from pyconfig_gen.validation import validate_config, problem_text, errors_only
+from pyconfig_gen.overlay_catalog import load_overlay_catalog, config_overlays_dir
+
+def print_json(obj):
+    print(json.dumps(obj, indent = 2))
+
+def cmd_get(args):
+    values = {k: get_config_var(k, args.file, None, int_cast = False) for k in args.keys}
+    if args.json:
+        print_json(values)
+    else:
+        for (k, v) in values.items():
+            if v is not None:
+                print(v if len(args.keys) == 1 else f"{k}={v}")
+    return(0 if None not in values.values() else 1)
+
+def cmd_set(args):
+    before = get_config_var(args.key, args.file, None, int_cast = False)
+    set_config_var(args.key, args.value, args.file, True, False)
+    if args.json:
+        print_json({"key": args.key, "old": before, "new": args.value,
+                    "changed": before != args.value})
+    return(0)
+
+def cmd_unset(args):
+    changed = {}
+    for k in args.keys:
+        changed[k] = config_var_defined(k, args.file)
+        comment_config_var(k, args.file)
+    if args.json:
+        print_json({"changed": [k for (k, c) in changed.items() if c]})
+    return(0)
+
+def cmd_diff(args):
+    lines = set(f"{k}@{f}={v}" for (k, f, v) in active_config_lines(args.file))
+    other_lines = set(f"{k}@{f}={v}" for (k, f, v) in active_config_lines(args.other))
+    removed = sorted(other_lines - lines)
+    added = sorted(lines - other_lines)
+    if args.json:
+        print_json({"differ": bool(added or removed),
+                    "added": added, "removed": removed})
+    else:
+        for l in removed:
+            print(f"-{l}")
+        for l in added:
+            print(f"+{l}")
+    # as diff(1)
+    return(1 if added or removed else 0)
+
+def cmd_show(args):
+    lines = active_config_lines(args.file)
+    if args.json:
+        print_json([{"key": k, "filter": f, "value": v} for (k, f, v) in lines])
+    else:
+        for (k, f, v) in lines:
+            print(f"{k}={v}" if f == "all" else f"{k}@{f}={v}")
+    return(0)
+
+def overlay_catalog(args):
+    # the catalogue of the overlays directory given, else of that beside
+    # the file, if any
+    overlays_dir = args.overlays or config_overlays_dir(args.file)
+    if overlays_dir is None:
+        return(None)
+    return(load_overlay_catalog(overlays_dir, overlay_catalog_cache_path()))
+
+def cmd_validate(args):
+    problems = validate_config(args.file, overlay_catalog(args))
+    if args.json:
+        print_json([p._asdict() for p in problems])
+    else:
+        for p in problems:
+            print(problem_text(p))
+    return(1 if errors_only(problems) else 0)
+
+def cmd_overlays(args):
+    catalog = overlay_catalog(args)
+    if catalog is None:
+        raise ValueError(f"{args.overlays or config_overlays_dir(args.file)}: "
+                         "no overlays directory")
+    if args.complete is not None:
+        # one per line, for shell completion
+        for c in catalog.complete(args.complete):
+            print(c)
+        return(0)
+    if args.name is None:
+        if args.json:
+            print_json(catalog.overlays)
+        else:
+            for n in sorted(catalog.overlays):
+                print(n)
+        return(0)
+    if not catalog.has_overlay(args.name):
+        print(f"pyconfig_gen-cli: {args.name}: no such overlay in {catalog.overlays_dir}",
+              file = sys.stderr)
+        return(1)
+    params = catalog.params(args.name)
+    if args.json:
+        print_json(params)
+    elif params is None:
+        print(f"pyconfig_gen-cli: {args.name}: unreadable overlay", file = sys.stderr)
+        return(1)
+    else:
+        for p in params:
+            print(p)
+    return(0)
+
+def cmd_apply(args):
+    report = apply_profile(load_profile(args.profile), args.file, args.regdom_file,
+                           dry_run = args.dry_run)
+    if args.json:
+        print_json(report)
+    else:
+        for c in report["changed_settings"]:
+            print(f"{c['setting']}: {c['old']} -> {c['new']}")
+        for l in report["removed_lines"]:
+            print(f"-{l}")
+        for l in report["added_lines"]:
+            print(f"+{l}")
+        if report["reboot_needed"]:
+            print("reboot needed" + (" (dry run; nothing written)" if args.dry_run else ""))
+    return(0)
+
+def cmd_fleet(args):
+    from pyconfig_gen.fleet import find_targets, load_edit_set, fleet_apply
+    if args.profile:
+        (kind, spec) = ("profile", load_profile(args.profile))
+    else:
+        (kind, spec) = ("edits", load_edit_set(args.edits))
+    def on_result(r):
+        if args.json:
+            print(json.dumps(r))
+        elif not r["ok"]:
+            print(f"{r['target']}: FAILED: {r['error']}")
+        elif r["added_lines"] or r["removed_lines"] or r.get("regdom_changed"):
+            print(f"{r['target']}: changed" + (", reboot needed" if r["reboot_needed"] else ""))
+    stats = fleet_apply(find_targets(args.root), kind, spec, args.regdom_name,
+                        args.dry_run, args.parallel, on_result)
+    if args.json:
+        print(json.dumps({"summary": stats}))
+    else:
+        print(", ".join(f"{k.replace('_', ' ')}: {v}" for (k, v) in stats.items()))
+    return(0 if stats["failed"] == 0 else 1)
+
+def cmd_audit(args):
+    # CSV (or, with -j, JSON Lines) rows to stdout, as they arrive
+    import csv, itertools
+    from pyconfig_gen.fleet import find_targets, fleet_audit, AUDIT_COLUMNS
+    out = sys.stdout
+    if args.json:
+        def on_result(r):
+            out.write(json.dumps(r) + "\n")
+    else:
+        writer = csv.DictWriter(out, fieldnames = AUDIT_COLUMNS)
+        writer.writeheader()
+        def on_result(r):
+            writer.writerow(dict(r, problems = "; ".join(r["problems"])))
+    targets = itertools.chain.from_iterable(find_targets(r) for r in args.roots)
+    stats = fleet_audit(targets, args.regdom_name, args.parallel, on_result)
+    out.flush()
+    print(", ".join(f"{k.replace('_', ' ')}: {v}" for (k, v) in stats.items()),
+          file = sys.stderr)
+    return(0 if stats["failed"] == 0 and stats["flagged"] == 0 else 1)
+
+def cmd_index(args):
+    from pyconfig_gen.settings_index import index_roots
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok = True)
+    def on_result(r):
+        if r["status"] == "failed":
+            print(f"{r['target']}: FAILED: {r['error']}", file = sys.stderr)
+    stats = index_roots(args.db, args.roots, args.parallel, on_result)
+    if args.json:
+        print_json(stats)
+    else:
+        print(", ".join(f"{k.replace('_', ' ')}: {v}" for (k, v) in stats.items()))
+    return(0 if stats["failed"] == 0 else 1)
+
+def cmd_query(args):
+    from pyconfig_gen.settings_index import query_index
+    rows = query_index(args.db, args.terms, args.group_by)
+    if args.group_by is not None:
+        counts = {}
+        for (t, v) in rows:
+            counts[v] = counts.get(v, 0) + 1
+        if args.json:
+            print_json([{"value": v, "count": c} for (v, c) in counts.items()])
+        else:
+            for (v, c) in sorted(counts.items(), key = lambda vc: -vc[1]):
+                print(f"{c}\t{'(unset)' if v is None else v}")
+    elif args.count:
+        if args.json:
+            print_json({"count": len(rows)})
+        else:
+            print(len(rows))
+    elif args.json:
+        print_json([t for (t, v) in rows])
+    else:
+        for (t, v) in rows:
+            print(t)
+    return(0 if rows else 1)
+
+def cmd_serve(args):
+    # the protocol is described in query_daemon.py
+    from pyconfig_gen.query_daemon import serve
+    serve(args.socket, args.file, args.regdom_file)
+    return(0)
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog = "pyconfig_gen-cli",
+                                     description = "Query and edit the RPi config.txt")
+    # commands working on many targets take no file
+    output = argparse.ArgumentParser(add_help = False)
+    output.add_argument("-j", "--json", action = "store_true",
+                        help = "output JSON")
+    common = argparse.ArgumentParser(add_help = False, parents = [output])
+    common.add_argument("-f", "--file", default = CONFIG_PATHNAME,
+                        help = f"file to work on (default {CONFIG_PATHNAME})")
+    sub = parser.add_subparsers(dest = "command", metavar = "COMMAND")
+    sub.required = True
+    p = sub.add_parser("get", parents = [common], help = "print values of keys")
+    p.add_argument("keys", nargs = "+", metavar = "KEY")
+    p.set_defaults(fn = cmd_get)
+    p = sub.add_parser("set", parents = [common], help = "set a key")
+    p.add_argument("key", metavar = "KEY")
+    p.add_argument("value", metavar = "VALUE")
+    p.set_defaults(fn = cmd_set)
+    p = sub.add_parser("unset", parents = [common], help = "comment keys out")
+    p.add_argument("keys", nargs = "+", metavar = "KEY")
+    p.set_defaults(fn = cmd_unset)
+    p = sub.add_parser("diff", parents = [common],
+                       help = "show material differences from another file")
+    p.add_argument("other", metavar = "OTHER")
+    p.set_defaults(fn = cmd_diff)
+    p = sub.add_parser("show", parents = [common], help = "list active settings")
+    p.set_defaults(fn = cmd_show)
+    p = sub.add_parser("validate", parents = [common],
+                       help = "check settings against the validation rules")
+    p.add_argument("-o", "--overlays", metavar = "DIR",
+                   help = "overlays directory to check overlays against "
+                          "(default: that beside the file)")
+    p.set_defaults(fn = cmd_validate)
+    p = sub.add_parser("overlays", parents = [common],
+                       help = "list the overlays installed, or the parameters of one")
+    p.add_argument("name", nargs = "?", metavar = "NAME")
+    p.add_argument("-o", "--overlays", metavar = "DIR",
+                   help = "overlays directory (default: that beside the file)")
+    p.add_argument("-c", "--complete", metavar = "TEXT",
+                   help = "list completions of TEXT, as the value of a dtoverlay line")
+    p.set_defaults(fn = cmd_overlays)
+    p = sub.add_parser("apply", parents = [common],
+                       help = "reconcile config.txt and the regdom file with a profile")
+    p.add_argument("profile", metavar = "PROFILE", help = "JSON or YAML profile")
+    p.add_argument("-r", "--regdom-file", default = WIFI_REGDOM_PATHNAME,
+                   help = f"wifi regdom file (default {WIFI_REGDOM_PATHNAME})")
+    p.add_argument("-n", "--dry-run", action = "store_true",
+                   help = "report, but write nothing")
+    p.set_defaults(fn = cmd_apply)
+    p = sub.add_parser("fleet", parents = [output],
+                       help = "apply a profile or edit set to every boot directory under ROOT")
+    p.add_argument("root", metavar = "ROOT")
+    g = p.add_mutually_exclusive_group(required = True)
+    g.add_argument("-p", "--profile", help = "JSON or YAML profile")
+    g.add_argument("-e", "--edits", help = "JSON edit set (see fleet.py)")
+    p.add_argument("-P", "--parallel", type = int, default = None,
+                   help = "worker processes (default: CPU count)")
+    p.add_argument("--regdom-name", default = None,
+                   help = "regdom file, relative to each boot directory (if any)")
+    p.add_argument("-n", "--dry-run", action = "store_true",
+                   help = "report, but write nothing")
+    p.set_defaults(fn = cmd_fleet)
+    p = sub.add_parser("audit", parents = [output],
+                       help = "report the effective settings of every boot directory "
+                              "(and disk image) under each ROOT, as CSV (or JSON Lines), "
+                              "flagging any that would fail validation")
+    p.add_argument("roots", nargs = "+", metavar = "ROOT")
+    p.add_argument("-P", "--parallel", type = int, default = None,
+                   help = "worker processes (default: CPU count)")
+    p.add_argument("--regdom-name", default = None,
+                   help = "regdom file, relative to each boot directory (if any)")
+    p.set_defaults(fn = cmd_audit)
+    p = sub.add_parser("index", parents = [output],
+                       help = "index the settings of every boot directory (and disk image) "
+                              "under each ROOT, skipping those unchanged")
+    p.add_argument("roots", nargs = "+", metavar = "ROOT")
+    p.add_argument("-d", "--db", default = settings_index_path(),
+                   help = f"index database (default {settings_index_path()})")
+    p.add_argument("-P", "--parallel", type = int, default = None,
+                   help = "worker processes (default: CPU count)")
+    p.set_defaults(fn = cmd_index)
+    p = sub.add_parser("query", parents = [output],
+                       help = "list indexed targets with settings matching every TERM")
+    p.add_argument("terms", nargs = "*", metavar = "TERM",
+                   help = "a config line, key[@filter][=value], which may use glob "
+                          "wildcards; with no value, any matches")
+    p.add_argument("-d", "--db", default = settings_index_path(),
+                   help = f"index database (default {settings_index_path()})")
+    g = p.add_mutually_exclusive_group()
+    g.add_argument("-c", "--count", action = "store_true",
+                   help = "print only the number of matching targets")
+    g.add_argument("-g", "--group-by", metavar = "KEY",
+                   help = "count matching targets by their value of KEY")
+    p.set_defaults(fn = cmd_query)
+    p = sub.add_parser("serve", parents = [common],
+                       help = "answer get, diff and validate queries (JSON) on a Unix socket")
+    p.add_argument("-s", "--socket", default = QUERY_SOCKET_PATHNAME,
+                   help = f"socket to listen on (default {QUERY_SOCKET_PATHNAME})")
+    p.add_argument("-r", "--regdom-file", default = WIFI_REGDOM_PATHNAME,
+                   help = f"wifi regdom file (default {WIFI_REGDOM_PATHNAME})")
+    p.set_defaults(fn = cmd_serve)
+    return(parser)
+
+def main(argv = None):
+    args = make_parser().parse_args(argv)
+    try:
+        for a in ["file", "other"]:
+            if is_disk_image(getattr(args, a, None) or ""):
+                setattr(args, a, ImageConfigFile(getattr(args, a)))
+        ret = args.fn(args)
+        if isinstance(getattr(args, "file", None), ImageConfigFile):
+            args.file.save()
+        return(ret)
+    except (OSError, ValueError) as e:
+        # includes ProfileError and malformed JSON
+        print(f"pyconfig_gen-cli: {e}", file = sys.stderr)
+        return(2)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+#
+# The constraints between settings: each names the settings it reads
+# (its inputs) and those whose config lines and widgets depend on them
+# (its outputs), and may also force output values (e.g. the camera
+# forcing enough GPU memory) or decide whether the outputs' widgets are
+# enabled (e.g. a CMA size only for the KMS drivers)
+#
+# constraints are indexed by input, so a change to one setting
+# re-evaluates only the constraints reading it (and, should they force
+# a change, those reading that, and so on), and re-renders only the
+# settings transitively dependent upon it; nothing is ever recomputed
+# globally
+#
+# License: GPL v3+
+# NO WARRANTY
+
+from collections import deque
+from pyconfig_gen.settings import *
+from pyconfig_gen.validation import check_values, errors_only, CAMERA_GPU_MEM
+
+# evaluations allowed in one propagation, before the constraints are
+# taken to be fighting one another
+MAX_EVALUATIONS = 1000
+
+class Constraint:
+    # enforce(state) returns {output: value} to force (or {}); enabled
+    # (state) whether the outputs' widgets are to be enabled; message is
+    # for the user, when values are forced
+    def __init__(self, name, inputs, outputs, enforce = None, enabled = None,
+                 message = None):
+        self.name = name
+        self.inputs = inputs
+        self.outputs = outputs
+        self.enforce = enforce
+        self.enabled = enabled
+        self.message = message
+
+class ConstraintGraph:
+    def __init__(self, constraints):
+        self.constraints = constraints
+        self.readers = {}
+        self.dependents = {}
+        self.enablers = {}
+        for c in constraints:
+            for n in c.inputs:
+                self.readers.setdefault(n, []).append(c)
+                deps = self.dependents.setdefault(n, [])
+                deps += [o for o in c.outputs if o != n and o not in deps]
+            if c.enabled is not None:
+                for o in c.outputs:
+                    self.enablers.setdefault(o, []).append(c)
+
+    def affected(self, names):
+        # the given settings plus everything transitively dependent upon
+        # them, ordered so each setting follows those it depends on
+        visited = set()
+        order = []
+        def visit(n):
+            if n not in visited:
+                visited.add(n)
+                for d in self.dependents.get(n, []):
+                    visit(d)
+                order.append(n)
+        for n in names:
+            visit(n)
+        order.reverse()
+        return(order)
+
+    def propagate(self, state, names):
+        # the given settings have changed on state: enforce the
+        # constraints reading them, and so on, until nothing more is
+        # forced; returns the settings changed (names first), and the
+        # constraints which forced values, in order
+        changed = list(names)
+        fired = []
+        queue = deque(names)
+        evaluations = 0
+        while queue:
+            n = queue.popleft()
+            for c in self.readers.get(n, []):
+                if c.enforce is None:
+                    continue
+                evaluations += 1
+                if evaluations > MAX_EVALUATIONS:
+                    raise RuntimeError(f"constraint {c.name}: settings do not settle")
+                forced = [(o, v) for (o, v) in c.enforce(state).items() if getattr(state, o) != v]
+                for (o, v) in forced:
+                    setattr(state, o, v)
+                    queue.append(o)
+                    if o not in changed:
+                        changed.append(o)
+                if forced and c not in fired:
+                    fired.append(c)
+        return((changed, fired))
+
+    def enabled(self, state, name):
+        # whether the widget(s) for the setting are to be enabled
+        return(all(c.enabled(state) for c in self.enablers.get(name, [])))
+
+def enforce_camera_gpu_mem(state):
+    # gpu_mem 0 is unset
+    values = {"start_x": 1}
+    if GPUS[state.gpu_vc4] != 0:
+        values["gpu_mem"] = GPUS[state.gpu_vc4]
+    if state.dtparam_camera and errors_only(check_values(values)):
+        return({"gpu_vc4": GPUS.index(CAMERA_GPU_MEM)})
+    return({})
+
+def port_constraints(port):
+    s = port_suffix(port)
+    def enforce_mode_in_group(state):
+        # a mode not in the (new) group is reset to auto
+        if not is_valid_mode(getattr(state, f"hdmi_group{s}"), getattr(state, f"hdmi_mode{s}")):
+            return({f"hdmi_mode{s}": 0})
+        return({})
+    return([
+        # safe mode comments out (or leaves alone) the normal mode lines
+        Constraint(f"hdmi_safe{s}", [f"hdmi_safe{s}"],
+                   [f"{n}{s}" for n in ["hdmi_group", "hdmi_force_hotplug",
+                                        "hdmi_ignore_edid", "config_hdmi_boost",
+                                        "disable_overscan", "hdmi_force_edid_audio",
+                                        "hdmi_drive"]]),
+        Constraint(f"hdmi_mode_in_group{s}", [f"hdmi_group{s}"], [f"hdmi_mode{s}"],
+                   enforce = enforce_mode_in_group,
+                   enabled = lambda state: getattr(state, f"hdmi_group{s}") > 0),
+        # ignoring EDID swaps in the fallback mode lists
+        Constraint(f"hdmi_ignore_edid{s}", [f"hdmi_ignore_edid{s}"], [f"hdmi_mode{s}"]),
+        # disabled overscan comments out the overscan lines
+        Constraint(f"disable_overscan{s}", [f"disable_overscan{s}"],
+                   [f"overscan_{d}{s}" for d in OVERSCAN_SIDES]),
+    ])
+
+SETTING_CONSTRAINTS = [
+    Constraint("vc4_cma", ["dtoverlay_vc4"], ["cma_vc4"],
+               enabled = lambda state: 0 <= state.dtoverlay_vc4 <= 1),
+    Constraint("camera_gpu_mem", ["dtparam_camera", "gpu_vc4"], ["gpu_vc4"],
+               enforce = enforce_camera_gpu_mem,
+               message = "Your GPU memory allocation is too low to use the camera; "
+                         f"it has been set to {CAMERA_GPU_MEM} MiB."),
+    Constraint("gpio_fan", ["dtoverlay_gpio_fan"], ["gpio_fan_trigger"]),
+]
+for p in HDMI_PORTS:
+    SETTING_CONSTRAINTS += port_constraints(p)
+
+SETTING_GRAPH = ConstraintGraph(SETTING_CONSTRAINTS)
+
+def affected_settings(names):
+    return(SETTING_GRAPH.affected(names))
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+#
+# A structured model of the dtoverlay, dtparam and gpio lines of a
+# config: each overlay as its name and an ordered map of parameters
+# (including those set by the dtparam lines following it), the base
+# device tree's dtparams, and the settings of each GPIO pin, indexed by
+# (section, name), (section, param) and (section, pin) respectively, so
+# reading or editing a single parameter takes a dict lookup, and does
+# not depend on the order parameters are written in
+#
+# the model round-trips losslessly: lines not edited are rendered
+# exactly as read; edited lines are regenerated in place (keeping their
+# indentation and line ending), disabled ones commented out, and new
+# ones placed as set_config_var would place them
+#
+# a dtparam line's parameters apply to the overlay most recently loaded
+# (in file order, across sections, as for a board every section applies
+# to) if it takes them, else to the base device tree (as do all, if no
+# overlay has been loaded, or "dtoverlay=" has reset it); whether an
+# overlay takes a parameter is as a catalogue of the installed overlays
+# says (see overlay_catalog.py), if given one, else only so for those
+# parameters of the overlays this app writes (the vc4 CMA sizes, the fan
+# shim's pin and temperature); commented-out lines and those under
+# [none] are not indexed
+#
+# License: GPL v3+
+# NO WARRANTY
+
+import re
+from pyconfig_gen.config_utils import *
+
+DIRECTIVE_LINE = re.compile(r"^(\s*)(#?)\s*(dtoverlay|dtparam|gpio)\s*=(.*?)(\s*)$", re.S)
+FILTER_LINE = re.compile(r"^\s*\[([^[]+)\]")
+
+def parse_params(text):
+    # "a=1,b,c=2" -> {"a": "1", "b": None, "c": "2"}
+    params = {}
+    for p in text.split(","):
+        p = p.strip()
+        if p:
+            (k, eq, v) = p.partition("=")
+            params[k.strip()] = v.strip() if eq else None
+    return(params)
+
+def params_text(params):
+    return(",".join(k if v is None else f"{k}={v}" for (k, v) in params.items()))
+
+def fallback_takes_param(name, param):
+    # whether an overlay not in the catalogue surely takes the parameter
+    if name.startswith("vc4-"):
+        return(param.startswith("cma-"))
+    return(name == "gpio-fan" and param in ("gpiopin", "temp"))
+
+def parse_pins(text):
+    # "2-5,7" -> [2, 3, 4, 5, 7]; raises ValueError if malformed
+    pins = []
+    for part in text.split(","):
+        (lo, dash, hi) = part.strip().partition("-")
+        pins += range(int(lo), int(hi) + 1) if dash else [int(lo)]
+    return(pins)
+
+class Directive:
+    # one dtoverlay, dtparam or gpio line; name is the overlay name (for
+    # dtoverlay), pins and settings the GPIO pins and their settings
+    # (for gpio), and params the parameters (otherwise)
+    def __init__(self, index, section, kind, body, lead, ending, commented):
+        self.index = index
+        self.section = section
+        self.kind = kind
+        self.lead = lead
+        self.ending = ending
+        self.commented = commented
+        self.dirty = False
+        self.name = None
+        self.params = {}
+        self.pins = None
+        self.settings = None
+        # overlays: {param: the directive (this, or a dtparam) setting it}
+        self.param_owner = {}
+        if kind == "dtoverlay":
+            (name, _, rest) = body.partition(",")
+            self.name = name.strip()
+            self.params = parse_params(rest)
+        elif kind == "dtparam":
+            self.params = parse_params(body)
+        else:
+            (pins, _, settings) = body.partition("=")
+            self.pins_text = pins.strip()
+            try:
+                self.pins = parse_pins(self.pins_text)
+            except ValueError:
+                self.pins = []
+            self.settings = [s.strip() for s in settings.split(",") if s.strip()]
+
+    def body(self):
+        if self.kind == "dtoverlay":
+            return(params_text(dict([(self.name, None)] + list(self.params.items()))))
+        if self.kind == "dtparam":
+            return(params_text(self.params))
+        return(f"{self.pins_text}={','.join(self.settings)}")
+
+    def render(self):
+        return(f"{self.lead}{'#' if self.commented else ''}{self.kind}={self.body()}{self.ending}")
+
+class BootDirectives:
+    def __init__(self, lines, catalog = None):
+        self.source = lines
+        self.catalog = catalog
+        self.lines = list(lines)
+        self.modified = False
+        self.parse()
+
+    def parse(self):
+        self.directives = {}
+        self.overlays = {}
+        self.section_overlays = {}
+        self.base_params = {}
+        self.pins = {}
+        # commented-out overlays and single-parameter base dtparams,
+        # which may be revived rather than added afresh
+        self.commented_overlays = {}
+        self.commented_params = {}
+        # the line after the last block of each section, where new
+        # lines go (as for set_config_lines)
+        self.section_ends = {}
+        section = "all"
+        context = None
+        for (i, line) in enumerate(self.lines):
+            m = FILTER_LINE.match(line)
+            if m:
+                f = m.group(1)
+                if f == "all" or f == "none" or f.find("pi") == 0:
+                    if f != section:
+                        self.section_ends[section] = i
+                    section = f
+                continue
+            m = DIRECTIVE_LINE.match(line)
+            if m is None:
+                continue
+            (lead, comment, kind, body, ending) = m.groups()
+            d = Directive(i, section, kind, body, lead, ending, bool(comment))
+            # the overlay in force at the line
+            d.context = context
+            self.directives[i] = d
+            if d.commented or section == "none":
+                if kind == "dtoverlay" and d.commented:
+                    self.commented_overlays.setdefault((section, d.name), d)
+                elif kind == "dtparam" and d.commented and len(d.params) == 1:
+                    p = next(iter(d.params))
+                    # only one which would set the base parameter, revived
+                    if context is None or not self.takes_param(context, p):
+                        self.commented_params.setdefault((section, p), d)
+                continue
+            if kind == "dtoverlay":
+                if d.name:
+                    self.index_overlay(d)
+                    context = d
+                else:
+                    context = None
+            elif kind == "dtparam":
+                for p in d.params:
+                    if context is not None and self.takes_param(context, p):
+                        context.param_owner[p] = d
+                    else:
+                        self.base_params.setdefault((section, p), d)
+            else:
+                for pin in d.pins:
+                    self.pins.setdefault((section, pin), []).append(d)
+        self.section_ends[section] = len(self.lines)
+
+    def takes_param(self, overlay, param):
+        params = self.catalog.params(overlay.name) if self.catalog is not None else None
+        if params is not None:
+            return(param in params)
+        return(fallback_takes_param(overlay.name, param))
+
+    def index_overlay(self, d):
+        d.param_owner = {p: d for p in d.params}
+        self.overlays.setdefault((d.section, d.name), []).append(d)
+        self.section_overlays.setdefault(d.section, []).append(d)
+
+    def is_modified(self):
+        return(self.modified or any(d.dirty for d in self.directives.values()))
+
+    def render(self):
+        return([self.directives[i].render() if i in self.directives and self.directives[i].dirty
+                else line for (i, line) in enumerate(self.lines)])
+
+    def rebase(self, lines):
+        # lines (as rendered) are now those the model was read from
+        if lines == self.render():
+            self.source = lines
+            self.lines = list(lines)
+            self.modified = False
+            for d in self.directives.values():
+                d.dirty = False
+        else:
+            self.__init__(lines, self.catalog)
+
+    # overlays
+
+    def overlay(self, name, section = "all"):
+        # the first overlay of that name loaded in the section, or None
+        found = self.overlays.get((section, name))
+        return(found[0] if found else None)
+
+    def overlays_matching(self, fn, section = "all"):
+        # the overlays loaded in the section whose names satisfy fn
+        return([d for d in self.section_overlays.get(section, []) if fn(d.name)])
+
+    def param(self, overlay, param, default = None):
+        owner = overlay.param_owner.get(param)
+        return(default if owner is None else owner.params[param])
+
+    def has_param(self, overlay, param):
+        return(param in overlay.param_owner)
+
+    def set_param(self, overlay, param, value = None):
+        # value None for a flag parameter (e.g. cma-64)
+        owner = overlay.param_owner.get(param, overlay)
+        if param in owner.params and owner.params[param] == value:
+            return
+        owner.params[param] = value
+        overlay.param_owner[param] = owner
+        owner.dirty = True
+
+    def remove_param(self, overlay, param):
+        owner = overlay.param_owner.pop(param, None)
+        if owner is None:
+            return
+        if owner is not overlay and len(owner.params) == 1:
+            # a dtparam line setting nothing else
+            owner.commented = True
+        else:
+            del owner.params[param]
+        owner.dirty = True
+
+    def rename(self, overlay, name):
+        if overlay.name == name:
+            return
+        self.overlays[(overlay.section, overlay.name)].remove(overlay)
+        overlay.name = name
+        self.overlays.setdefault((overlay.section, name), []).append(overlay)
+        # keep file order
+        self.overlays[(overlay.section, name)].sort(key = lambda d: d.index)
+        overlay.dirty = True
+
+    def disable(self, directive):
+        # comment the line out, as comment_config_var would
+        self.disable_all([directive])
+
+    def disable_all(self, directives):
+        # comment the lines out; directives obtained from the model before
+        # this are stale after it
+        directives = [d for d in directives if not d.commented]
+        if not directives:
+            return
+        for d in directives:
+            (d.commented, d.dirty) = (True, True)
+        # parameters set by following dtparam lines would now apply
+        # elsewhere; the rest of the model is rebuilt to match
+        self.restructure()
+
+    def add_overlay(self, name, params = {}, section = "all"):
+        # load the overlay (by reviving a commented-out line loading it,
+        # if there is one); returns it
+        old = self.commented_overlays.get((section, name))
+        if old is not None:
+            (old.params, old.commented, old.dirty) = (dict(params), False, True)
+            index = old.index
+        else:
+            index = self.insert_line(section, f"dtoverlay={params_text(dict([(name, None)] + list(params.items())))}\n")
+        self.restructure()
+        return(self.directives[index])
+
+    # base device tree parameters
+
+    def base_param(self, param, section = "all", default = None):
+        owner = self.base_params.get((section, param))
+        return(default if owner is None else owner.params[param])
+
+    def set_base_param(self, param, value, section = "all"):
+        owner = self.base_params.get((section, param))
+        if owner is not None:
+            if owner.params[param] != value:
+                owner.params[param] = value
+                owner.dirty = True
+            return
+        old = self.commented_params.get((section, param))
+        if old is not None:
+            (old.params, old.commented, old.dirty) = ({param: value}, False, True)
+        else:
+            self.insert_line(section, f"dtparam={param}={value}\n",
+                             self.base_param_end(section, param))
+        self.restructure()
+
+    def remove_base_param(self, param, section = "all"):
+        # from every line setting it, as comment_config_var would
+        owner = self.base_params.get((section, param))
+        while owner is not None:
+            if len(owner.params) == 1:
+                owner.commented = True
+            else:
+                del owner.params[param]
+            owner.dirty = True
+            # any later line setting it now counts instead
+            self.restructure()
+            owner = self.base_params.get((section, param))
+
+    def base_param_end(self, section, param):
+        # where a new base dtparam goes: after the section's last line
+        # setting base parameters where the overlay in force (if any)
+        # would not take it, else before the first overlay is loaded, if
+        # the section has a block before it
+        last = max((d.index for ((s, _), d) in self.base_params.items() if s == section and
+                    (d.context is None or not self.takes_param(d.context, param))),
+                   default = None)
+        if last is not None:
+            return(last + 1)
+        first_overlay = min((d.index for ds in self.section_overlays.values() for d in ds),
+                            default = None)
+        if first_overlay is None:
+            return(None)
+        current = "all"
+        for (i, line) in enumerate(self.lines[:first_overlay]):
+            m = FILTER_LINE.match(line)
+            if m and (m.group(1) in ("all", "none") or m.group(1).find("pi") == 0):
+                if current == section and m.group(1) != section:
+                    return(i)
+                current = m.group(1)
+        return(first_overlay if current == section else None)
+
+    # GPIO pins
+
+    def gpio_settings(self, pin, section = "all"):
+        # the settings of the pin, by the last line setting it, or None
+        found = self.pins.get((section, pin))
+        return(list(found[-1].settings) if found else None)
+
+    def set_gpio(self, pin, settings, section = "all"):
+        found = self.pins.get((section, pin))
+        if found and found[-1].pins == [pin]:
+            d = found[-1]
+            if d.settings != list(settings):
+                (d.settings, d.dirty) = (list(settings), True)
+            return
+        # set for this pin alone; being later, it takes precedence
+        self.insert_line(section, f"gpio={pin}={','.join(settings)}\n")
+        self.restructure()
+
+    # structural edits
+
+    def insert_line(self, section, text, index = None):
+        # insert text at index (by default, the end of the section's
+        # last block, or a new section at the end); returns its index
+        self.lines = self.render()
+        if index is None:
+            index = self.section_ends.get(section)
+        if index is None:
+            if self.lines and not self.lines[-1].endswith("\n"):
+                self.lines[-1] += "\n"
+            if self.current_section() != section:
+                self.lines.append(f"[{section}]\n")
+            self.lines.append(text)
+            index = len(self.lines) - 1
+        else:
+            if index > 0 and not self.lines[index - 1].endswith("\n"):
+                self.lines[index - 1] += "\n"
+            self.lines.insert(index, text)
+        self.modified = True
+        for d in self.directives.values():
+            d.dirty = False
+        self.directives = {}
+        return(index)
+
+    def current_section(self):
+        # the section in force at the end of the file
+        section = "all"
+        for line in self.lines:
+            m = FILTER_LINE.match(line)
+            if m and (m.group(1) in ("all", "none") or m.group(1).find("pi") == 0):
+                section = m.group(1)
+        return(section)
+
+    def restructure(self):
+        self.lines = self.render()
+        self.modified = True
+        self.parse()
+
+def directives_of(path, catalog = None):
+    # the model of the given config (a path, or a ConfigFile), given the
+    # catalogue of overlays, if any; that of a ConfigFile is kept with
+    # it, for as long as its lines (and the catalogue) are unchanged
+    if isinstance(path, ConfigFile):
+        model = getattr(path, "directives", None)
+        if model is None or model.source is not path.lines or model.catalog is not catalog:
+            model = path.directives = BootDirectives(path.lines, catalog)
+        return(model)
+    return(BootDirectives(config_lines(path), catalog))
+
+def save_directives(path, model):
+    # write back any edits made to the model
+    if not model.is_modified():
+        return
+    store_config_lines(path, model.render())
+    if isinstance(path, ConfigFile):
+        model.rebase(path.lines)
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+#
+# Offline access to config.txt (or any file) on the FAT boot partition
+# of a raw disk image, without loop-mounting (so without root): the
+# partition is found from the MBR (or GPT) partition table, and the
+# file read, and rewritten, by a minimal FAT12/16/32 implementation
+#
+# only what is needed is read (the partition table, boot sector, FAT
+# and the directories and clusters on the file's path), with a handful
+# of preads, so many images can be processed quickly
+#
+# rewrites are copy-on-write where there is room: the new contents go
+# to free clusters, and only then is the directory entry switched over
+# to them and the old chain freed; there is no journal, so (as with any
+# FAT writer) an interruption can still leak clusters, but not leave a
+# half-written file in place
+#
+# License: GPL v3+
+# NO WARRANTY
+
+import os, struct, time, itertools
+from pathlib import Path
+from pyconfig_gen.config_utils import ConfigFile
+
+SECTOR_SIZE = 512
+CONFIG_FILENAME = "config.txt"
+
+# MBR partition types that may hold a FAT filesystem
+MBR_FAT_TYPES = {0x01, 0x04, 0x06, 0x0b, 0x0c, 0x0e, 0xef}
+MBR_GPT_PROTECTIVE = 0xee
+# GPT partition type GUIDs (in on-disk byte order) that may hold one
+GPT_FAT_TYPES = {
+    # basic data
+    bytes.fromhex("a2a0d0ebe5b9334487c068b6b72699c7"),
+    # EFI system
+    bytes.fromhex("28732ac11ff8d211ba4b00a0c93ec93b"),
+}
+
+DIR_ENTRY_SIZE = 32
+ATTR_VOLUME_ID = 0x08
+ATTR_DIRECTORY = 0x10
+ATTR_ARCHIVE = 0x20
+ATTR_LONG_NAME = 0x0f
+# NT case flags, for 8.3 names displayed in lower case
+NT_LOWER_BASE = 0x08
+NT_LOWER_EXT = 0x10
+DELETED = 0xe5
+SHORT_NAME_CHARS = set("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789!#$%&'()-@^_`{}~")
+
+class DiskImageError(ValueError):
+    pass
+
+def looks_like_fat_boot_sector(sector):
+    (bps, spc, reserved, nfats) = struct.unpack_from("<HBHB", sector, 11)
+    return(sector[510:512] == b"\x55\xaa" and sector[0] in (0xeb, 0xe9) and
+           bps in (512, 1024, 2048, 4096) and spc != 0 and spc & (spc - 1) == 0 and
+           reserved != 0 and nfats != 0)
+
+def fat_partitions(fd):
+    # byte (offset, length) of each partition that may be FAT, in table
+    # order; a bare (unpartitioned) FAT filesystem counts as one
+    mbr = os.pread(fd, SECTOR_SIZE, 0)
+    if len(mbr) < SECTOR_SIZE or mbr[510:512] != b"\x55\xaa":
+        raise DiskImageError("no partition table")
+    if looks_like_fat_boot_sector(mbr):
+        return([(0, os.fstat(fd).st_size)])
+    entries = [struct.unpack_from("<4xB3xII", mbr, 446 + 16 * i) for i in range(4)]
+    if any(t == MBR_GPT_PROTECTIVE for (t, start, count) in entries):
+        return(gpt_fat_partitions(fd))
+    return([(start * SECTOR_SIZE, count * SECTOR_SIZE)
+            for (t, start, count) in entries if t in MBR_FAT_TYPES and count != 0])
+
+def gpt_fat_partitions(fd):
+    header = os.pread(fd, SECTOR_SIZE, SECTOR_SIZE)
+    if header[0:8] != b"EFI PART":
+        raise DiskImageError("bad GPT header")
+    (entries_lba, n_entries, entry_size) = struct.unpack_from("<QII", header, 72)
+    if entry_size < 128 or n_entries > 1024:
+        raise DiskImageError("bad GPT header")
+    table = os.pread(fd, n_entries * entry_size, entries_lba * SECTOR_SIZE)
+    parts = []
+    for i in range(len(table) // entry_size):
+        (type_guid, first, last) = struct.unpack_from("<16s16xQQ", table, i * entry_size)
+        if type_guid in GPT_FAT_TYPES and last >= first:
+            parts += [(first * SECTOR_SIZE, (last - first + 1) * SECTOR_SIZE)]
+    return(parts)
+
+def fat_timestamp(t = None):
+    # (date, time) words, as in a directory entry
+    tm = time.localtime(t)
+    return(((max(tm.tm_year, 1980) - 1980) << 9 | tm.tm_mon << 5 | tm.tm_mday,
+            tm.tm_hour << 11 | tm.tm_min << 5 | tm.tm_sec // 2))
+
+def short_name(name):
+    # the 11-byte 8.3 name and NT case flags for name, or None if it
+    # would need a long name
+    (base, dot, ext) = name.rpartition(".") if "." in name else (name, "", "")
+    if not 1 <= len(base) <= 8 or len(ext) > 3:
+        return(None)
+    flags = 0
+    for (part, lower_flag) in [(base, NT_LOWER_BASE), (ext, NT_LOWER_EXT)]:
+        if part != part.upper():
+            if part != part.lower():
+                return(None)
+            flags |= lower_flag
+        if not set(part.upper()) <= SHORT_NAME_CHARS:
+            return(None)
+    return(((base.upper().ljust(8) + ext.upper().ljust(3)).encode("ascii"), flags))
+
+def long_name_part(entry):
+    chars = entry[1:11] + entry[14:26] + entry[28:32]
+    return(chars.decode("utf-16-le", "replace").split("\0")[0].rstrip("￿"))
+
+def short_name_checksum(name11):
+    s = 0
+    for c in name11:
+        s = ((s >> 1) | ((s & 1) << 7)) + c & 0xff
+    return(s)
+
+class FatVolume:
+    # a FAT filesystem at a byte offset of an open file descriptor
+    def __init__(self, fd, offset):
+        self.fd = fd
+        self.offset = offset
+        bs = os.pread(fd, SECTOR_SIZE, offset)
+        if len(bs) < SECTOR_SIZE or not looks_like_fat_boot_sector(bs):
+            raise DiskImageError("not a FAT filesystem")
+        (self.bps, self.spc, reserved, self.n_fats, root_entries,
+         total16, fatsz16) = struct.unpack_from("<HBHBHHxH", bs, 11)
+        (total32, fatsz32, self.root_cluster, self.fsinfo_sector) = \
+            struct.unpack_from("<4xII4xIH", bs, 28)
+        self.fat_size = (fatsz16 or fatsz32) * self.bps
+        self.fat_start = offset + reserved * self.bps
+        self.root_start = self.fat_start + self.n_fats * self.fat_size
+        self.root_size = root_entries * DIR_ENTRY_SIZE
+        self.data_start = self.root_start + -(-self.root_size // self.bps) * self.bps
+        self.cluster_size = self.bps * self.spc
+        self.n_clusters = ((total16 or total32) * self.bps - (self.data_start - offset)) \
+                          // self.cluster_size
+        if self.n_clusters < 4085:
+            (self.fat_bits, self.eoc) = (12, 0xfff)
+        elif self.n_clusters < 65525:
+            (self.fat_bits, self.eoc) = (16, 0xffff)
+        else:
+            (self.fat_bits, self.eoc) = (32, 0x0fffffff)
+        if self.fat_bits != 32:
+            self.root_cluster = 0
+            self.fsinfo_sector = 0
+        self.fat = bytearray(os.pread(fd, self.fat_size, self.fat_start))
+        self.dirty_fat_sectors = set()
+        self.free_delta = 0
+        self.next_free = 2
+
+    # FAT access
+
+    def get_fat(self, n):
+        if self.fat_bits == 12:
+            o = n + n // 2
+            v = self.fat[o] | self.fat[o + 1] << 8
+            return(v >> 4 if n & 1 else v & 0xfff)
+        elif self.fat_bits == 16:
+            return(struct.unpack_from("<H", self.fat, n * 2)[0])
+        return(struct.unpack_from("<I", self.fat, n * 4)[0] & 0x0fffffff)
+
+    def set_fat(self, n, value):
+        if self.fat_bits == 12:
+            o = n + n // 2
+            v = self.fat[o] | self.fat[o + 1] << 8
+            v = (v & 0x000f) | value << 4 if n & 1 else (v & 0xf000) | value
+            struct.pack_into("<H", self.fat, o, v)
+            self.dirty_fat_sectors |= {o // self.bps, (o + 1) // self.bps}
+        elif self.fat_bits == 16:
+            struct.pack_into("<H", self.fat, n * 2, value)
+            self.dirty_fat_sectors.add(n * 2 // self.bps)
+        else:
+            # the top four bits are reserved, and kept
+            old = struct.unpack_from("<I", self.fat, n * 4)[0]
+            struct.pack_into("<I", self.fat, n * 4, old & 0xf0000000 | value)
+            self.dirty_fat_sectors.add(n * 4 // self.bps)
+
+    def chain(self, first):
+        clusters = []
+        c = first
+        while 2 <= c < self.n_clusters + 2:
+            clusters += [c]
+            if len(clusters) > self.n_clusters:
+                raise DiskImageError("looped cluster chain")
+            c = self.get_fat(c)
+        if c < self.eoc - 7 and first != 0:
+            raise DiskImageError(f"bad cluster chain (entry {c:#x})")
+        return(clusters)
+
+    def allocate(self, n):
+        # link n free clusters into a new chain, and return them; nothing
+        # is changed if there are not enough
+        found = []
+        last = self.n_clusters + 2
+        for c in itertools.chain(range(self.next_free, last), range(2, self.next_free)):
+            if len(found) == n:
+                break
+            if self.get_fat(c) == 0:
+                found += [c]
+        if len(found) < n:
+            raise DiskImageError("not enough free space")
+        for (c, nxt) in zip(found, found[1:] + [self.eoc]):
+            self.set_fat(c, nxt)
+        self.free_delta -= n
+        if found:
+            self.next_free = found[-1] + 1 if found[-1] + 1 < last else 2
+        return(found)
+
+    def free(self, clusters):
+        for c in clusters:
+            self.set_fat(c, 0)
+        self.free_delta += len(clusters)
+
+    def flush_fat(self):
+        for s in sorted(self.dirty_fat_sectors):
+            data = self.fat[s * self.bps:(s + 1) * self.bps]
+            for i in range(self.n_fats):
+                os.pwrite(self.fd, data, self.fat_start + i * self.fat_size + s * self.bps)
+        self.dirty_fat_sectors = set()
+        if self.fsinfo_sector and self.free_delta:
+            # keep the FAT32 free cluster hint honest, if it is kept
+            o = self.offset + self.fsinfo_sector * self.bps
+            info = os.pread(self.fd, 512, o)
+            (free, ) = struct.unpack_from("<I", info, 488)
+            if info[0:4] == b"RRaA" and info[484:488] == b"rrAa" and free != 0xffffffff:
+                os.pwrite(self.fd, struct.pack("<II", free + self.free_delta, self.next_free),
+                          o + 488)
+        self.free_delta = 0
+
+    # data access
+
+    def cluster_offset(self, c):
+        return(self.data_start + (c - 2) * self.cluster_size)
+
+    def runs(self, clusters):
+        # (first cluster, count) for each contiguous run
+        runs = []
+        for c in clusters:
+            if runs and runs[-1][0] + runs[-1][1] == c:
+                runs[-1][1] += 1
+            else:
+                runs += [[c, 1]]
+        return(runs)
+
+    def read_clusters(self, clusters):
+        return(b"".join(os.pread(self.fd, n * self.cluster_size, self.cluster_offset(c))
+                        for (c, n) in self.runs(clusters)))
+
+    def write_clusters(self, clusters, data):
+        data = data.ljust(len(clusters) * self.cluster_size, b"\0")
+        o = 0
+        for (c, n) in self.runs(clusters):
+            os.pwrite(self.fd, data[o:o + n * self.cluster_size], self.cluster_offset(c))
+            o += n * self.cluster_size
+
+    # directories
+
+    def dir_regions(self, cluster):
+        # (byte offset, length) of each piece of a directory
+        if cluster == 0:
+            return([(self.root_start, self.root_size)])
+        return([(self.cluster_offset(c), self.cluster_size) for c in self.chain(cluster)])
+
+    def dir_entries(self, cluster):
+        # yield (byte offset, entry, long name) for each live entry
+        lfn = []
+        for (o, n) in self.dir_regions(cluster):
+            data = os.pread(self.fd, n, o)
+            for i in range(0, len(data), DIR_ENTRY_SIZE):
+                e = data[i:i + DIR_ENTRY_SIZE]
+                if e[0] == 0:
+                    return
+                if e[0] == DELETED:
+                    lfn = []
+                elif e[11] & 0x3f == ATTR_LONG_NAME:
+                    lfn = [e] + lfn if not e[0] & 0x40 else [e]
+                elif not e[11] & ATTR_VOLUME_ID:
+                    long_name = None
+                    if lfn and all(l[13] == short_name_checksum(e[0:11]) for l in lfn):
+                        long_name = "".join(long_name_part(l) for l in lfn)
+                    lfn = []
+                    yield((o + i, e, long_name))
+
+    def find_entry(self, cluster, name):
+        target = short_name(name)
+        for (o, e, long_name) in self.dir_entries(cluster):
+            if (long_name is not None and long_name.lower() == name.lower()) or \
+               (target is not None and e[0:11] == target[0]):
+                return((o, e))
+        return(None)
+
+    def entry_cluster(self, e):
+        (hi, lo) = struct.unpack_from("<H4xH", e, 20)
+        return(hi << 16 | lo if self.fat_bits == 32 else lo)
+
+    def lookup(self, path):
+        # (directory cluster, entry offset, entry) for path, with the
+        # entry None if it does not exist (but its directory does)
+        cluster = self.root_cluster
+        parts = [p for p in path.split("/") if p]
+        if not parts:
+            raise DiskImageError("no file name given")
+        for p in parts[:-1]:
+            found = self.find_entry(cluster, p)
+            if found is None or not found[1][11] & ATTR_DIRECTORY:
+                raise DiskImageError(f"{path}: no such directory")
+            cluster = self.entry_cluster(found[1])
+        found = self.find_entry(cluster, parts[-1])
+        if found is not None and found[1][11] & ATTR_DIRECTORY:
+            raise DiskImageError(f"{path}: is a directory")
+        return((cluster, ) + (found or (None, None)))
+
+    def new_entry(self, cluster, name):
+        # make an empty file entry for name in the given directory;
+        # return its offset and contents
+        sn = short_name(name)
+        if sn is None:
+            raise DiskImageError(f"{name}: cannot create a file with a long name")
+        (date, tod) = fat_timestamp()
+        e = bytearray(DIR_ENTRY_SIZE)
+        e[0:11] = sn[0]
+        e[11] = ATTR_ARCHIVE
+        e[12] = sn[1]
+        struct.pack_into("<HHHHHH", e, 14, tod, date, date, 0, tod, date)
+        for (o, n) in self.dir_regions(cluster):
+            data = os.pread(self.fd, n, o)
+            for i in range(0, len(data), DIR_ENTRY_SIZE):
+                if data[i] in (0, DELETED):
+                    os.pwrite(self.fd, e, o + i)
+                    return((o + i, bytes(e)))
+        if cluster == 0:
+            raise DiskImageError("root directory full")
+        # grow the directory by a (zeroed) cluster
+        (c, ) = self.allocate(1)
+        self.write_clusters([c], bytes(e))
+        self.set_fat(self.chain(cluster)[-1], c)
+        self.flush_fat()
+        return((self.cluster_offset(c), bytes(e)))
+
+    # files
+
+    def read_file(self, path):
+        # the contents of path, or None if it does not exist
+        (cluster, o, e) = self.lookup(path)
+        if e is None:
+            return(None)
+        size = struct.unpack_from("<I", e, 28)[0]
+        return(self.read_clusters(self.chain(self.entry_cluster(e)))[:size])
+
+    def write_file(self, path, data):
+        # replace (or create) path with data
+        (cluster, o, e) = self.lookup(path)
+        if e is None:
+            (o, e) = self.new_entry(cluster, path.split("/")[-1])
+        old_chain = self.chain(self.entry_cluster(e))
+        needed = -(-len(data) // self.cluster_size)
+        try:
+            new_chain = self.allocate(needed)
+            surplus = old_chain
+        except DiskImageError:
+            # no room to copy; reuse the old chain, in place
+            extra = self.allocate(max(needed - len(old_chain), 0))
+            new_chain = old_chain[:needed] + extra
+            surplus = old_chain[needed:]
+            for (c, nxt) in zip(new_chain, new_chain[1:] + [self.eoc]):
+                self.set_fat(c, nxt)
+        self.write_clusters(new_chain, data)
+        self.flush_fat()
+        first = new_chain[0] if new_chain else 0
+        (date, tod) = fat_timestamp()
+        e = bytearray(e)
+        struct.pack_into("<HH", e, 18, date, first >> 16 if self.fat_bits == 32 else 0)
+        struct.pack_into("<HHHI", e, 22, tod, date, first & 0xffff, len(data))
+        e[11] |= ATTR_ARCHIVE
+        os.pwrite(self.fd, e, o)
+        self.free(surplus)
+        self.flush_fat()
+
+class BootVolume(FatVolume):
+    # the (first) FAT partition of a disk image file, as a context manager
+    def __init__(self, image_path, writable = False):
+        fd = os.open(image_path, os.O_RDWR if writable else os.O_RDONLY)
+        try:
+            parts = fat_partitions(fd)
+            if not parts:
+                raise DiskImageError("no FAT partition")
+            super().__init__(fd, parts[0][0])
+        except Exception as e:
+            os.close(fd)
+            if isinstance(e, (DiskImageError, struct.error, IndexError)):
+                # truncated or corrupt
+                raise DiskImageError(f"{image_path}: {e}")
+            raise
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, *exc):
+        self.close()
+
+def is_disk_image(path):
+    # whether path is a file starting with a partition table (or FAT
+    # boot sector), rather than text
+    if isinstance(path, ConfigFile) or not Path(path).is_file():
+        return(False)
+    with open(path, "rb") as f:
+        sector = f.read(SECTOR_SIZE)
+    return(len(sector) == SECTOR_SIZE and sector[510:512] == b"\x55\xaa")
+
+def decode_text(data):
+    # as reading in text mode would
+    text = data.decode("utf-8", "surrogateescape")
+    return(text.replace("\r\n", "\n").replace("\r", "\n"))
+
+class ImageConfigFile(ConfigFile):
+    # a ConfigFile for a file on the boot partition of a disk image
+    def __init__(self, image_path, name = CONFIG_FILENAME):
+        self.path = image_path
+        self.name = name
+        with BootVolume(image_path) as vol:
+            data = vol.read_file(name)
+        self.lines = decode_text(data).splitlines(keepends = True) if data is not None else []
+        self.saved_lines = list(self.lines)
+
+    def save(self):
+        if not self.is_modified():
+            return(False)
+        with BootVolume(self.path, writable = True) as vol:
+            vol.write_file(self.name, "".join(self.lines).encode("utf-8", "surrogateescape"))
+            os.fsync(vol.fd)
+        self.saved_lines = list(self.lines)
+        return(True)
+
+def open_config_file(path, name = CONFIG_FILENAME):
+    # a ConfigFile for path, which may be a disk image
+    if isinstance(path, ConfigFile):
+        return(path)
+    if is_disk_image(path):
+        return(ImageConfigFile(path, name))
+    return(ConfigFile(path))
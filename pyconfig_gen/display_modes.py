@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+#
+# The CEA (hdmi_group=1) and DMT (hdmi_group=2) video modes known to
+# the RPi firmware, as listed for hdmi_mode in the config.txt docs;
+# each table is packed into a single bytes object, indexed directly by
+# mode number, with small indexes for filtering by resolution / refresh
+#
+# License: GPL v3+
+# NO WARRANTY
+
+import struct
+from collections import namedtuple
+
+# width, height, refresh Hz, aspect w, aspect h, flags
+MODE_RECORD = struct.Struct("<HHHHHB")
+MODE_INTERLACED = 0x01
+MODE_REDUCED_BLANKING = 0x02
+
+ModeInfo = namedtuple("ModeInfo", ["mode", "width", "height", "refresh",
+                                   "aspect_w", "aspect_h", "interlaced",
+                                   "reduced_blanking"])
+
+class ModeTable:
+    def __init__(self, target, spec):
+        # spec: one "mode width height refresh aspect_w aspect_h flags"
+        # line per mode, flags being "i" (interlaced) and / or "r"
+        # (reduced blanking), or "-"
+        rows = [l.split() for l in spec.strip().splitlines()]
+        self.target = target
+        self.max_mode = max(int(r[0]) for r in rows)
+        # slot 0 (and any gap) is all zeroes, i.e. no such mode
+        self.records = bytearray(MODE_RECORD.size * (self.max_mode + 1))
+        self.by_resolution = {}
+        self.by_refresh = {}
+        for r in rows:
+            (mode, w, h, hz, aw, ah) = [int(v) for v in r[:6]]
+            flags = (MODE_INTERLACED if "i" in r[6] else 0) | \
+                    (MODE_REDUCED_BLANKING if "r" in r[6] else 0)
+            MODE_RECORD.pack_into(self.records, MODE_RECORD.size * mode,
+                                  w, h, hz, aw, ah, flags)
+            self.by_resolution.setdefault((w, h), []).append(mode)
+            self.by_refresh.setdefault(hz, []).append(mode)
+        self.records = bytes(self.records)
+        self.by_resolution = {k: tuple(v) for (k, v) in self.by_resolution.items()}
+        self.by_refresh = {k: tuple(v) for (k, v) in self.by_refresh.items()}
+
+    def __contains__(self, mode):
+        return(self.lookup(mode) is not None)
+
+    def lookup(self, mode):
+        # return the ModeInfo for the given mode number, or None
+        if not 0 < mode <= self.max_mode:
+            return(None)
+        (w, h, hz, aw, ah, flags) = MODE_RECORD.unpack_from(
+            self.records, MODE_RECORD.size * mode)
+        if w == 0:
+            return(None)
+        return(ModeInfo(mode, w, h, hz, aw, ah, bool(flags & MODE_INTERLACED),
+                        bool(flags & MODE_REDUCED_BLANKING)))
+
+    def modes(self):
+        return([m for m in range(1, self.max_mode + 1) if m in self])
+
+    def matching(self, width = None, height = None, refresh = None,
+                 interlaced = None, reduced_blanking = None, aspect = None):
+        # mode numbers, ascending, of those modes matching all the given
+        # criteria (None matching anything)
+        if width is not None and height is not None:
+            candidates = self.by_resolution.get((width, height), ())
+        elif refresh is not None:
+            candidates = self.by_refresh.get(refresh, ())
+        else:
+            candidates = self.modes()
+        result = []
+        for m in candidates:
+            i = self.lookup(m)
+            if (width is None or i.width == width) and \
+               (height is None or i.height == height) and \
+               (refresh is None or i.refresh == refresh) and \
+               (interlaced is None or i.interlaced == interlaced) and \
+               (reduced_blanking is None or i.reduced_blanking == reduced_blanking) and \
+               (aspect is None or (i.aspect_w, i.aspect_h) == aspect):
+                result.append(m)
+        return(result)
+
+    def mode_text(self, mode, tags = ""):
+        # as shown in the mode dropdowns
+        i = self.lookup(mode)
+        return(f"{mode}: {i.width}x{i.height} {i.refresh}Hz {i.aspect_w}:{i.aspect_h}{tags}")
+
+
+CEA_MODES = ModeTable("CEA", """
+  1  640  480  60   4   3 -
+  2  720  480  60   4   3 -
+  3  720  480  60  16   9 -
+  4 1280  720  60  16   9 -
+  5 1920 1080  60  16   9 i
+  6  720  480  60   4   3 i
+  7  720  480  60  16   9 i
+  8  720  240  60   4   3 -
+  9  720  240  60  16   9 -
+ 10 2880  480  60   4   3 i
+ 11 2880  480  60  16   9 i
+ 12 2880  240  60   4   3 -
+ 13 2880  240  60  16   9 -
+ 14 1440  480  60   4   3 -
+ 15 1440  480  60  16   9 -
+ 16 1920 1080  60  16   9 -
+ 17  720  576  50   4   3 -
+ 18  720  576  50  16   9 -
+ 19 1280  720  50  16   9 -
+ 20 1920 1080  50  16   9 i
+ 21  720  576  50   4   3 i
+ 22  720  576  50  16   9 i
+ 23  720  288  50   4   3 -
+ 24  720  288  50  16   9 -
+ 25 2880  576  50   4   3 i
+ 26 2880  576  50  16   9 i
+ 27 2880  288  50   4   3 -
+ 28 2880  288  50  16   9 -
+ 29 1440  576  50   4   3 -
+ 30 1440  576  50  16   9 -
+ 31 1920 1080  50  16   9 -
+ 32 1920 1080  24  16   9 -
+ 33 1920 1080  25  16   9 -
+ 34 1920 1080  30  16   9 -
+ 35 2880  480  60   4   3 -
+ 36 2880  480  60  16   9 -
+ 37 2880  576  50   4   3 -
+ 38 2880  576  50  16   9 -
+ 39 1920 1080  50  16   9 i
+ 40 1920 1080 100  16   9 i
+ 41 1280  720 100  16   9 -
+ 42  720  576 100   4   3 -
+ 43  720  576 100  16   9 -
+ 44  720  576 100   4   3 i
+ 45  720  576 100  16   9 i
+ 46 1920 1080 120  16   9 i
+ 47 1280  720 120  16   9 -
+ 48  720  480 120   4   3 -
+ 49  720  480 120  16   9 -
+ 50  720  480 120   4   3 i
+ 51  720  480 120  16   9 i
+ 52  720  576 200   4   3 -
+ 53  720  576 200  16   9 -
+ 54  720  576 200   4   3 i
+ 55  720  576 200  16   9 i
+ 56  720  480 240   4   3 -
+ 57  720  480 240  16   9 -
+ 58  720  480 240   4   3 i
+ 59  720  480 240  16   9 i
+ 60 1280  720  24  16   9 -
+ 61 1280  720  25  16   9 -
+ 62 1280  720  30  16   9 -
+ 63 1920 1080 120  16   9 -
+ 64 1920 1080 100  16   9 -
+ 65 1280  720  24  64  27 -
+ 66 1280  720  25  64  27 -
+ 67 1280  720  30  64  27 -
+ 68 1280  720  50  64  27 -
+ 69 1280  720  60  64  27 -
+ 70 1280  720 100  64  27 -
+ 71 1280  720 120  64  27 -
+ 72 1920 1080  24  64  27 -
+ 73 1920 1080  25  64  27 -
+ 74 1920 1080  30  64  27 -
+ 75 1920 1080  50  64  27 -
+ 76 1920 1080  60  64  27 -
+ 77 1920 1080 100  64  27 -
+ 78 1920 1080 120  64  27 -
+ 79 1680  720  24  64  27 -
+ 80 1680  720  25  64  27 -
+ 81 1680  720  30  64  27 -
+ 82 1680  720  50  64  27 -
+ 83 1680  720  60  64  27 -
+ 84 1680  720 100  64  27 -
+ 85 1680  720 120  64  27 -
+ 86 2560 1080  24  64  27 -
+ 87 2560 1080  25  64  27 -
+ 88 2560 1080  30  64  27 -
+ 89 2560 1080  50  64  27 -
+ 90 2560 1080  60  64  27 -
+ 91 2560 1080 100  64  27 -
+ 92 2560 1080 120  64  27 -
+ 93 3840 2160  24  16   9 -
+ 94 3840 2160  25  16   9 -
+ 95 3840 2160  30  16   9 -
+ 96 3840 2160  50  16   9 -
+ 97 3840 2160  60  16   9 -
+ 98 4096 2160  24 256 135 -
+ 99 4096 2160  25 256 135 -
+100 4096 2160  30 256 135 -
+101 4096 2160  50 256 135 -
+102 4096 2160  60 256 135 -
+103 3840 2160  24  64  27 -
+104 3840 2160  25  64  27 -
+105 3840 2160  30  64  27 -
+106 3840 2160  50  64  27 -
+107 3840 2160  60  64  27 -
+""")
+
+DMT_MODES = ModeTable("DMT", """
+  1  640  350  85  16   9 -
+  2  640  400  85  16  10 -
+  3  720  400  85  16   9 -
+  4  640  480  60   4   3 -
+  5  640  480  72   4   3 -
+  6  640  480  75   4   3 -
+  7  640  480  85   4   3 -
+  8  800  600  56   4   3 -
+  9  800  600  60   4   3 -
+ 10  800  600  72   4   3 -
+ 11  800  600  75   4   3 -
+ 12  800  600  85   4   3 -
+ 13  800  600 120   4   3 r
+ 14  848  480  60  16   9 -
+ 15 1024  768  43   4   3 i
+ 16 1024  768  60   4   3 -
+ 17 1024  768  70   4   3 -
+ 18 1024  768  75   4   3 -
+ 19 1024  768  85   4   3 -
+ 20 1024  768 120   4   3 r
+ 21 1152  864  75   4   3 -
+ 22 1280  768  60  15   9 r
+ 23 1280  768  60  15   9 -
+ 24 1280  768  75  15   9 -
+ 25 1280  768  85  15   9 -
+ 26 1280  768 120  15   9 r
+ 27 1280  800  60  16  10 r
+ 28 1280  800  60  16  10 -
+ 29 1280  800  75  16  10 -
+ 30 1280  800  85  16  10 -
+ 31 1280  800 120  16  10 r
+ 32 1280  960  60   4   3 -
+ 33 1280  960  85   4   3 -
+ 34 1280  960 120   4   3 r
+ 35 1280 1024  60   5   4 -
+ 36 1280 1024  75   5   4 -
+ 37 1280 1024  85   5   4 -
+ 38 1280 1024 120   5   4 r
+ 39 1360  768  60  16   9 -
+ 40 1360  768 120  16   9 r
+ 41 1400 1050  60   4   3 r
+ 42 1400 1050  60   4   3 -
+ 43 1400 1050  75   4   3 -
+ 44 1400 1050  85   4   3 -
+ 45 1400 1050 120   4   3 r
+ 46 1440  900  60  16  10 r
+ 47 1440  900  60  16  10 -
+ 48 1440  900  75  16  10 -
+ 49 1440  900  85  16  10 -
+ 50 1440  900 120  16  10 r
+ 51 1600 1200  60   4   3 -
+ 52 1600 1200  65   4   3 -
+ 53 1600 1200  70   4   3 -
+ 54 1600 1200  75   4   3 -
+ 55 1600 1200  85   4   3 -
+ 56 1600 1200 120   4   3 r
+ 57 1680 1050  60  16  10 r
+ 58 1680 1050  60  16  10 -
+ 59 1680 1050  75  16  10 -
+ 60 1680 1050  85  16  10 -
+ 61 1680 1050 120  16  10 r
+ 62 1792 1344  60   4   3 -
+ 63 1792 1344  75   4   3 -
+ 64 1792 1344 120   4   3 r
+ 65 1856 1392  60   4   3 -
+ 66 1856 1392  75   4   3 -
+ 67 1856 1392 120   4   3 r
+ 68 1920 1200  60  16  10 r
+ 69 1920 1200  60  16  10 -
+ 70 1920 1200  75  16  10 -
+ 71 1920 1200  85  16  10 -
+ 72 1920 1200 120  16  10 r
+ 73 1920 1440  60   4   3 -
+ 74 1920 1440  75   4   3 -
+ 75 1920 1440 120   4   3 r
+ 76 2560 1600  60  16  10 r
+ 77 2560 1600  60  16  10 -
+ 78 2560 1600  75  16  10 -
+ 79 2560 1600  85  16  10 -
+ 80 2560 1600 120  16  10 r
+ 81 1366  768  60  16   9 -
+ 82 1920 1080  60  16   9 -
+ 83 1600  900  60  16   9 r
+ 84 2048 1152  60  16   9 r
+ 85 1280  720  60  16   9 -
+ 86 1366  768  60  16   9 r
+""")
+
+MODE_TABLES = {"CEA": CEA_MODES, "DMT": DMT_MODES}
+# hdmi_group values
+GROUP_TABLES = {1: CEA_MODES, 2: DMT_MODES}
+
+def find_mode(target, mode):
+    # return the ModeInfo for the given mode number, or None
+    return(MODE_TABLES[target].lookup(mode))
+
+def match_mode(target, width, height, refresh, interlaced = False,
+               reduced_blanking = None, aspect = None):
+    # return the number of the first mode with the given timing (any
+    # blanking or aspect, if these are None), or None
+    m = MODE_TABLES[target].matching(width, height, refresh, interlaced,
+                                     reduced_blanking, aspect)
+    return(m[0] if m else None)
+
+def is_valid_mode(group, mode):
+    # hdmi_mode 0 (auto) is valid in any group; otherwise the mode must
+    # exist in the group's table
+    return(mode == 0 or (group in GROUP_TABLES and mode in GROUP_TABLES[group]))
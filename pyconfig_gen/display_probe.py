@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+#
+# Cached, concurrent querying of the attached displays, via tvservice
+# or by decoding their EDIDs from sysfs: the display list is fetched
+# once per session, and the per-port,
+# per-group mode listings are each fetched at most once, concurrently,
+# with every caller asking for the same listing sharing the one query;
+# listings may also be served from (and saved to) an on-disk cache,
+# keyed by a hash of the display list, and revalidated in the background
+#
+# License: GPL v3+
+# NO WARRANTY
+
+import threading, json, hashlib, glob
+from concurrent.futures import ThreadPoolExecutor, Future
+from pyconfig_gen.config_utils import *
+from pyconfig_gen.edid import decode_edid, tvservice_style_listing
+
+MODE_GROUPS = ["CEA", "DMT"]
+# cached display setups kept, most recently used last
+MODE_CACHE_ENTRIES = 8
+DRM_CLASS_DIR = "/sys/class/drm"
+TVSERVICE_PATHNAME = "/opt/vc/bin/tvservice"
+
+def completed_future(result):
+    f = Future()
+    f.set_result(result)
+    return(f)
+
+def listing_name(target, hdmi_index):
+    return(f"{target.lower()}{hdmi_index}")
+
+
+class ModeCache:
+    # raw mode listings per display setup, as JSON:
+    # {"displays": {key: {"cea0": listing, "dmt0": listing, ...}}}
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path, "r") as f:
+                self.displays = json.load(f)["displays"]
+        except (OSError, ValueError, KeyError, TypeError):
+            # absent or unreadable: start afresh
+            self.displays = {}
+
+    def lookup(self, key):
+        with self.lock:
+            return(self.displays.get(key))
+
+    def store(self, key, listings):
+        with self.lock:
+            self.displays.pop(key, None)
+            self.displays[key] = listings
+            for k in list(self.displays)[:-MODE_CACHE_ENTRIES]:
+                del self.displays[k]
+            save_json_cache(self.path, {"displays": self.displays})
+
+
+# backends ----------------------------------------------------------
+#
+# each provides display_list() (text identifying the attached displays)
+# and mode_listing(target, hdmi_index, display_list) (the modes of the
+# given group on the given port, in tvservice -m format)
+
+class TvserviceBackend:
+    name = "tvservice"
+
+    def __init__(self, use_fake_data = False):
+        self.use_fake_data = use_fake_data
+
+    # the commands run, so they may also be run asynchronously
+
+    def display_list_command(self):
+        return(tvservice_command(["-l"], "list.txt", self.use_fake_data))
+
+    def mode_listing_command(self, target, hdmi_index, display_list):
+        device_id = display_number_from_list(display_list, hdmi_index)
+        return(tvservice_command(["-v", str(device_id), "-m", target],
+                                 f"{target.lower()}{hdmi_index}.txt",
+                                 self.use_fake_data))
+
+    def display_list(self):
+        return(run_for_output(self.display_list_command()))
+
+    def mode_listing(self, target, hdmi_index, display_list):
+        return(run_for_output(self.mode_listing_command(target, hdmi_index, display_list)))
+
+
+class DrmEdidBackend:
+    # reads the EDIDs the kernel exposes for its HDMI connectors (under
+    # both KMS and FKMS), spawning nothing; HDMI port n is HDMI-A-(n+1)
+    name = "drm"
+
+    def __init__(self, drm_dir = DRM_CLASS_DIR):
+        self.drm_dir = drm_dir
+
+    def connector_edids(self):
+        # {connector name: EDID bytes}, for connectors with a display
+        edids = {}
+        for path in sorted(glob.glob(f"{self.drm_dir}/card*-HDMI-A-*/edid")):
+            name = Path(path).parent.name.split("-", 1)[1]
+            try:
+                data = Path(path).read_bytes()
+            except OSError:
+                continue
+            if data and name not in edids:
+                edids[name] = data
+        return(edids)
+
+    def available(self):
+        return(bool(self.connector_edids()))
+
+    def display_list(self):
+        return("".join(f"{name} {hashlib.sha1(data).hexdigest()}\n"
+                       for (name, data) in self.connector_edids().items()))
+
+    def mode_listing(self, target, hdmi_index, display_list):
+        data = self.connector_edids().get(f"HDMI-A-{hdmi_index + 1}")
+        if data is None:
+            return("")
+        try:
+            modes = decode_edid(data)
+        except ValueError:
+            return("")
+        return(tvservice_style_listing(target, modes[target]))
+
+
+def default_backend(use_fake_data = False):
+    # decode EDIDs directly where the kernel provides them, since under
+    # KMS tvservice is often absent or reports nothing
+    if not use_fake_data:
+        drm = DrmEdidBackend()
+        if drm.available() or not Path(TVSERVICE_PATHNAME).is_file():
+            return(drm)
+    return(TvserviceBackend(use_fake_data))
+
+
+class DisplayProbe:
+    def __init__(self, use_fake_data = False, max_workers = 4, cache = None,
+                 backend = None):
+        self.use_fake_data = use_fake_data
+        self.backend = backend or default_backend(use_fake_data)
+        self.cache = cache
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers = max_workers,
+                                           thread_name_prefix = "display_probe")
+        self.lock = threading.Lock()
+        self.queries = {}
+
+    def query(self, key, fn):
+        # return the future for the given query, starting it only if no
+        # caller has asked for it before
+        with self.lock:
+            f = self.queries.get(key)
+            if f is None:
+                f = self.queries[key] = self.executor.submit(fn)
+            return(f)
+
+    def display_list(self):
+        return(self.query("list", self.backend.display_list))
+
+    def display_key(self):
+        # identifies the attached display setup (as seen by the backend)
+        return(hashlib.sha1((self.backend.name + "\n" +
+                             self.display_list().result()).encode("utf-8")).hexdigest())
+
+    def load_from_cache(self):
+        # serve the mode listings for the attached displays from the
+        # cache, if present there; call before any listing is queried
+        if self.cache is None:
+            return(False)
+        entry = self.cache.lookup(self.display_key())
+        if entry is None:
+            return(False)
+        with self.lock:
+            for (name, listing) in entry.items():
+                (target, hdmi_index) = (name[:3].upper(), int(name[3:]))
+                self.queries.setdefault((target, hdmi_index), completed_future(listing))
+        return(True)
+
+    def listings(self, hdmi_indices):
+        return({listing_name(t, i): self.mode_listing(t, i).result()
+                for i in hdmi_indices for t in MODE_GROUPS})
+
+    def save_to_cache(self, hdmi_indices):
+        if self.cache is not None:
+            self.cache.store(self.display_key(), self.listings(hdmi_indices))
+
+    def revalidate(self, hdmi_indices):
+        # re-query everything afresh, adopt (and cache) the results, and
+        # return whether they differ from what was being served
+        fresh = DisplayProbe(self.use_fake_data, self.max_workers, backend = self.backend)
+        try:
+            fresh.prefetch(hdmi_indices)
+            new_listings = fresh.listings(hdmi_indices)
+            changed = new_listings != self.listings(hdmi_indices)
+            with self.lock:
+                self.queries = dict(fresh.queries)
+        finally:
+            fresh.shutdown(wait = False)
+        self.save_to_cache(hdmi_indices)
+        return(changed)
+
+    def mode_listing(self, target, hdmi_index):
+        # the list query is started first, so (the pool's queue being
+        # FIFO) a listing waiting on it can never starve it of a worker
+        display_list = self.display_list()
+        def run():
+            return(self.backend.mode_listing(target, hdmi_index, display_list.result()))
+        return(self.query((target, hdmi_index), run))
+
+    def prefetch(self, hdmi_indices):
+        # start every listing needed for the given ports
+        for i in hdmi_indices:
+            for t in MODE_GROUPS:
+                self.mode_listing(t, i)
+
+    def valid_modes(self, target, base_mode_txt, hdmi_index = 0):
+        # as config_utils.get_valid_modes
+        return(modes_from_tvservice_output(
+            self.mode_listing(target, hdmi_index).result(), base_mode_txt))
+
+    def port_modes(self, hdmi_index, base_mode_txt, fallback = False):
+        # return (cea_modes, cea_modes_txt, dmt_modes, dmt_modes_txt,
+        # using_fallback) for the given port, falling back to the generic
+        # lists if asked to, or if the display reports no modes at all
+        if not fallback:
+            self.prefetch([hdmi_index])
+            (cea_modes, cea_modes_txt) = self.valid_modes("CEA", base_mode_txt, hdmi_index)
+            (dmt_modes, dmt_modes_txt) = self.valid_modes("DMT", base_mode_txt, hdmi_index)
+            if len(cea_modes) > 1 or len(dmt_modes) > 1:
+                return(cea_modes, cea_modes_txt, dmt_modes, dmt_modes_txt, False)
+        (cea_modes, cea_modes_txt) = get_fallback_modes("CEA", base_mode_txt)
+        (dmt_modes, dmt_modes_txt) = get_fallback_modes("DMT", base_mode_txt)
+        return(cea_modes, cea_modes_txt, dmt_modes, dmt_modes_txt, True)
+
+    def shutdown(self, wait = True):
+        self.executor.shutdown(wait = wait)
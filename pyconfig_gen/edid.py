@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+#
+# Minimal EDID decoder: finds the CEA and DMT modes a display offers
+# (from its established, standard and detailed timings, and its CEA
+# extension's video data block), and which are preferred / native,
+# without needing tvservice
+#
+# License: GPL v3+
+# NO WARRANTY
+
+from pyconfig_gen.display_modes import *
+
+EDID_HEADER = b"\x00\xff\xff\xff\xff\xff\xff\x00"
+EDID_BLOCK_SIZE = 128
+CEA_EXTENSION_TAG = 0x02
+CEA_VIDEO_DATA_BLOCK = 2
+
+# DMT modes for the established timing bits (bytes 35..37, msb first);
+# None where the timing has no DMT equivalent
+ESTABLISHED_TIMINGS = [
+    None, None, 4, None, 5, 6, 8, 9,
+    10, 11, None, 15, 16, 17, 18, 36,
+    None,
+]
+
+# standard timing aspect ratio codes (EDID 1.3+)
+STANDARD_TIMING_ASPECTS = [(16, 10), (4, 3), (5, 4), (16, 9)]
+
+def block_checksum_ok(block):
+    return(sum(block) % 256 == 0)
+
+def decode_standard_timing(b0, b1):
+    if (b0, b1) in ((0x01, 0x01), (0x00, 0x00)):
+        return(None) # unused slot
+    width = (b0 + 31) * 8
+    (aw, ah) = STANDARD_TIMING_ASPECTS[b1 >> 6]
+    return(width, width * ah // aw, (b1 & 0x3f) + 60)
+
+def decode_detailed_timing(d):
+    # return (width, height, refresh, interlaced, reduced_blanking,
+    # image aspect or None) for an 18-byte descriptor, or None if it is
+    # a display (not timing) descriptor
+    clock = d[0] | d[1] << 8 # 10kHz units
+    if clock == 0:
+        return(None)
+    hactive = d[2] | (d[4] >> 4) << 8
+    hblank = d[3] | (d[4] & 0x0f) << 8
+    vactive = d[5] | (d[7] >> 4) << 8
+    vblank = d[6] | (d[7] & 0x0f) << 8
+    interlaced = bool(d[17] & 0x80)
+    if hactive + hblank == 0 or vactive + vblank == 0:
+        return(None)
+    refresh = round(clock * 10000 / ((hactive + hblank) * (vactive + vblank)))
+    height = vactive * 2 if interlaced else vactive
+    hsize = d[12] | (d[14] >> 4) << 8 # mm
+    vsize = d[13] | (d[14] & 0x0f) << 8
+    aspect = None
+    if hsize and vsize:
+        # nearest of the aspects in the mode tables
+        r = hsize / vsize
+        aspect = min([(4, 3), (16, 9), (64, 27), (256, 135), (16, 10), (5, 4), (15, 9)],
+                     key = lambda a: abs(a[0] / a[1] - r))
+    # CVT reduced blanking uses a fixed 160 pixel horizontal blank
+    return(hactive, height, refresh, interlaced, hblank == 160, aspect)
+
+def decode_edid(data):
+    # return {"CEA": [(mode, preferred, native), ...], "DMT": [...]} for
+    # the given EDID (base block plus any extensions), modes in the
+    # order found; raises ValueError if this is not an EDID
+    data = bytes(data)
+    if len(data) < EDID_BLOCK_SIZE or data[:8] != EDID_HEADER:
+        raise ValueError("not an EDID (bad header or too short)")
+    found = {"CEA": {}, "DMT": {}}
+
+    def add(target, mode, preferred = False, native = False):
+        if mode is None:
+            return
+        (p, n) = found[target].get(mode, (False, False))
+        found[target][mode] = (p or preferred, n or native)
+
+    def add_detailed(d, preferred):
+        t = decode_detailed_timing(d)
+        if t is None:
+            return
+        (w, h, hz, interlaced, rb, aspect) = t
+        cea = match_mode("CEA", w, h, hz, interlaced, aspect = aspect) or \
+              match_mode("CEA", w, h, hz, interlaced)
+        add("CEA", cea, preferred, preferred)
+        dmt = match_mode("DMT", w, h, hz, interlaced, rb) or \
+              match_mode("DMT", w, h, hz, interlaced)
+        add("DMT", dmt, preferred, preferred)
+
+    base = data[:EDID_BLOCK_SIZE]
+    # the first detailed timing is the preferred (native) one
+    for i in range(4):
+        add_detailed(base[54 + 18*i:72 + 18*i], i == 0)
+    bits = base[35] << 16 | base[36] << 8 | base[37]
+    for (i, mode) in enumerate(ESTABLISHED_TIMINGS):
+        if bits & (1 << (23 - i)):
+            add("DMT", mode)
+    for i in range(8):
+        t = decode_standard_timing(base[38 + 2*i], base[39 + 2*i])
+        if t is not None:
+            (w, h, hz) = t
+            add("DMT", match_mode("DMT", w, h, hz, reduced_blanking = False) or
+                       match_mode("DMT", w, h, hz))
+            add("CEA", match_mode("CEA", w, h, hz))
+
+    for n in range(1, min(base[126], len(data) // EDID_BLOCK_SIZE - 1) + 1):
+        ext = data[n*EDID_BLOCK_SIZE:(n+1)*EDID_BLOCK_SIZE]
+        if ext[0] != CEA_EXTENSION_TAG or not block_checksum_ok(ext):
+            continue
+        dtd_offset = ext[2]
+        i = 4
+        while 4 <= i < dtd_offset and i < EDID_BLOCK_SIZE:
+            (tag, length) = (ext[i] >> 5, ext[i] & 0x1f)
+            if tag == CEA_VIDEO_DATA_BLOCK:
+                for svd in ext[i+1:i+1+length]:
+                    # the native flag is only carried by VICs 1..64
+                    if 129 <= svd <= 192:
+                        add("CEA", svd & 0x7f, native = True)
+                    elif find_mode("CEA", svd) is not None:
+                        add("CEA", svd)
+            i += 1 + length
+        if dtd_offset >= 4:
+            for j in range(dtd_offset, EDID_BLOCK_SIZE - 18, 18):
+                add_detailed(ext[j:j+18], False)
+    return({t: [(m,) + f for (m, f) in found[t].items()] for t in found})
+
+def tvservice_style_listing(target, modes):
+    # render decoded modes as tvservice -m would list them, so either
+    # source may be parsed (and cached) alike
+    lines = []
+    for (mode, preferred, native) in sorted(modes):
+        t = find_mode(target, mode)
+        if t is None:
+            continue
+        (w, h, hz, aw, ah, interlaced) = t[1:7]
+        tags = (" (prefer)" if preferred else "") + (" (native)" if native else "")
+        scan = "interlaced" if interlaced else "progressive"
+        lines += [f"  mode {mode}: {w}x{h} @ {hz}Hz {aw}:{ah}, {scan}{tags}"]
+    return("".join(l + "\n" for l in lines))
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+#
+# Change notification for the files pyconfig_gen works on, via Linux
+# inotify (through ctypes, so needing no extra packages), and config
+# file caches invalidated by it: a cached file is re-read exactly when
+# an event says it has changed, rather than re-stat'ed (or re-read) on
+# every use; where inotify is unavailable, the caches fall back to
+# checking the file's stat
+#
+# directories, not files, are watched, so files replaced by rename (as
+# ConfigFile.save does) or deleted and re-created stay watched
+#
+# events are read without blocking, by poll(), which any user (on any
+# thread) may call, so each is read by whichever poll comes first; users
+# needing to know of changes should so register listeners, which are
+# called on that thread, rather than rely on the paths a poll of their
+# own returns; a wait on fileno() (e.g. by a QSocketNotifier) can
+# trigger polls when nothing else does
+#
+# License: GPL v3+
+# NO WARRANTY
+
+import os, struct, select, threading, itertools
+from pyconfig_gen.config_utils import ConfigFile
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_APPEARED = IN_CREATE | IN_MOVED_TO
+IN_VANISHED = IN_DELETE | IN_MOVED_FROM
+DIR_WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_APPEARED | IN_VANISHED
+EVENT_HEADER = struct.Struct("iIII")
+
+libc = None
+ctypes = None
+
+def inotify_libc():
+    # loaded on first use, keeping this module cheap to import
+    global libc, ctypes
+    if libc is None:
+        import ctypes, ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno = True)
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return(libc)
+
+class FileWatcher:
+    # tracks changes to, and the presence of, a set of files
+    def __init__(self):
+        try:
+            fd = inotify_libc().inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            raise OSError("inotify not available")
+        if fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+        self.fd = fd
+        # cheaper than a read() failing with EAGAIN, when (as usual)
+        # nothing has changed
+        self.poller = select.poll()
+        self.poller.register(fd, select.POLLIN)
+        self.lock = threading.RLock()
+        self.dir_of_wd = {}
+        self.wd_of_dir = {}
+        self.names_in_dir = {}
+        self.present = {}
+        self.listeners = {}
+
+    def fileno(self):
+        return(self.fd)
+
+    def watch(self, path, listener = None):
+        # start watching path (if not already), calling listener(path) on
+        # each change to it; returns False if its directory cannot be
+        # watched (e.g. does not exist)
+        path = os.path.abspath(path)
+        (d, name) = os.path.split(path)
+        with self.lock:
+            if d not in self.wd_of_dir:
+                wd = libc.inotify_add_watch(self.fd, os.fsencode(d), DIR_WATCH_MASK)
+                if wd < 0:
+                    return(False)
+                self.wd_of_dir[d] = wd
+                self.dir_of_wd[wd] = d
+                self.names_in_dir[d] = set()
+            self.names_in_dir[d].add(name)
+            self.present.setdefault(path, os.path.isfile(path))
+            if listener is not None:
+                self.listeners.setdefault(path, []).append(listener)
+        return(True)
+
+    def watches(self, path):
+        return(os.path.abspath(path) in self.present)
+
+    def exists(self, path):
+        # whether a watched path is (as far as events tell) a file
+        self.poll()
+        return(self.present[os.path.abspath(path)])
+
+    def poll(self):
+        # process any pending events, calling listeners; returns the set
+        # of watched paths changed
+        changed = set()
+        if not self.poller.poll(0):
+            return(changed)
+        with self.lock:
+            while True:
+                try:
+                    data = os.read(self.fd, 65536)
+                except BlockingIOError:
+                    break
+                o = 0
+                while o < len(data):
+                    (wd, mask, cookie, n) = EVENT_HEADER.unpack_from(data, o)
+                    name = os.fsdecode(data[o + EVENT_HEADER.size:o + EVENT_HEADER.size + n]
+                                       .rstrip(b"\0"))
+                    o += EVENT_HEADER.size + n
+                    changed |= self.handle_event(wd, mask, name)
+        for path in changed:
+            for fn in self.listeners.get(path, []):
+                fn(path)
+        return(changed)
+
+    def handle_event(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            # events lost; assume the worst
+            for p in self.present:
+                self.present[p] = os.path.isfile(p)
+            return(set(self.present))
+        d = self.dir_of_wd.get(wd)
+        if d is None:
+            return(set())
+        if mask & IN_IGNORED:
+            # the directory has gone; its files are no longer watched
+            # (so their users fall back to checking for themselves)
+            paths = {os.path.join(d, n) for n in self.names_in_dir.pop(d)}
+            del self.dir_of_wd[wd], self.wd_of_dir[d]
+            for p in paths:
+                del self.present[p]
+            return(paths)
+        if name not in self.names_in_dir[d]:
+            return(set())
+        path = os.path.join(d, name)
+        if mask & IN_APPEARED:
+            self.present[path] = True
+        elif mask & IN_VANISHED:
+            self.present[path] = False
+        return({path})
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+def watcher_for(paths):
+    # a FileWatcher watching paths, or None if inotify is unavailable
+    try:
+        watcher = FileWatcher()
+    except OSError:
+        return(None)
+    for p in paths:
+        watcher.watch(p)
+    return(watcher)
+
+def is_file(path, watcher = None):
+    # as Path(path).is_file(), but answered from events where path is
+    # watched
+    if watcher is not None and watcher.watches(path):
+        return(watcher.exists(path))
+    return(os.path.isfile(path))
+
+class CachedConfigFile:
+    # a ConfigFile kept in memory, and re-read only when the file
+    # changes: as notified by watcher, if given (and able to watch it),
+    # and otherwise when its identity, size or mtime do; values derived
+    # from it may be memoized (in the dict returned alongside) until then
+    versions = itertools.count()
+
+    def __init__(self, path, watcher = None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.stale = True
+        self.stat_key = None
+        self.config = None
+        self.derived = {}
+        self.version = None
+        self.watcher = watcher
+        if watcher is not None:
+            watcher.watch(path, self.invalidate)
+
+    def invalidate(self, path = None):
+        self.stale = True
+
+    def file_stat_key(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return(None)
+        return((st.st_ino, st.st_size, st.st_mtime_ns))
+
+    def current(self):
+        # (ConfigFile, memo dict, version) for the file as it is now;
+        # versions are unique across all instances
+        if self.watcher is not None and self.watcher.watches(self.path):
+            self.watcher.poll()
+            key = None
+        else:
+            key = self.file_stat_key()
+            if key != self.stat_key:
+                self.stale = True
+        with self.lock:
+            if self.stale:
+                # cleared first, so a change made while reading is seen
+                # next time
+                self.stale = False
+                self.config = ConfigFile(self.path)
+                self.derived = {}
+                self.version = next(self.versions)
+                self.stat_key = key
+            return((self.config, self.derived, self.version))
+
+def memoized(derived, name, fn):
+    if name not in derived:
+        derived[name] = fn()
+    return(derived[name])
+
+# caches shared by every user in the process (the sync and async APIs
+# alike), on one watcher started on first use
+shared_lock = threading.Lock()
+shared_watcher = None
+shared_watcher_started = False
+shared_caches = {}
+
+def shared_cached_config_file(path):
+    # the process-wide CachedConfigFile for path
+    global shared_watcher, shared_watcher_started
+    path = os.path.abspath(path)
+    with shared_lock:
+        if not shared_watcher_started:
+            shared_watcher = watcher_for([])
+            shared_watcher_started = True
+        if path not in shared_caches:
+            shared_caches[path] = CachedConfigFile(path, shared_watcher)
+        return(shared_caches[path])
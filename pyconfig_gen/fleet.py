@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+#
+# Fleet operations: apply a profile (see profile.py) or a set of raw
+# edits to the config.txt of every device boot directory, and raw disk
+# image (see disk_image.py), under a tree, or audit them all, reporting
+# the effective value of every setting, concurrently, in a pool of
+# worker processes; results stream back in target order, with only a
+# bounded number of targets in flight, so fleets of any size take
+# constant memory
+#
+# an edit set is JSON: {"set": {"key@filter": value, ...},
+#                       "unset": ["key@filter", ...]}
+#
+# License: GPL v3+
+# NO WARRANTY
+
+import os, json, time, itertools
+from collections import deque
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor
+from pyconfig_gen.config_utils import *
+from pyconfig_gen.settings import *
+from pyconfig_gen.profile import *
+from pyconfig_gen.disk_image import ImageConfigFile, CONFIG_FILENAME
+from pyconfig_gen.validation import validate_config, problem_text
+
+DISK_IMAGE_SUFFIX = ".img"
+# targets handed to a worker at a time
+FLEET_CHUNK_SIZE = 16
+
+def find_targets(root):
+    # yield, in a stable order, each directory under root (inclusive)
+    # holding a config.txt, and each disk image; root may itself be
+    # a disk image
+    if os.path.isfile(root):
+        yield(root)
+        return
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"{root}: no such directory")
+    for (d, subdirs, files) in os.walk(root):
+        subdirs.sort()
+        if CONFIG_FILENAME in files:
+            yield(d)
+        for f in sorted(files):
+            if f.endswith(DISK_IMAGE_SUFFIX):
+                yield(os.path.join(d, f))
+
+def load_edit_set(path):
+    with open(path, "r") as f:
+        edits = json.load(f)
+    if not isinstance(edits, dict) or set(edits) - {"set", "unset"} or \
+       not isinstance(edits.get("set", {}), dict) or \
+       not isinstance(edits.get("unset", []), list):
+        raise ProfileError(f"{path}: expected {{\"set\": {{...}}, \"unset\": [...]}}")
+    return(edits)
+
+def apply_edit_set(edits, config_path, dry_run = False):
+    # as apply_profile, but for raw key edits
+    config = as_config_file(config_path)
+    old_lines = active_config_lines(config)
+    for (k, v) in edits.get("set", {}).items():
+        set_config_var(k, v, config, True, False)
+    for k in edits.get("unset", []):
+        comment_config_var(k, config)
+    new_lines = active_config_lines(config)
+    return({
+        "removed_lines": [f"{k}@{f}={v}" for (k, f, v) in old_lines if (k, f, v) not in new_lines],
+        "added_lines": [f"{k}@{f}={v}" for (k, f, v) in new_lines if (k, f, v) not in old_lines],
+        "reboot_needed": old_lines != new_lines,
+        "written": [config.path] if not dry_run and config.save() else [],
+    })
+
+def open_target(target, regdom_name):
+    # (config, regdom) ConfigFiles for a target; the regdom one has no
+    # path if there is no regdom_name
+    if os.path.isdir(target):
+        return((ConfigFile(os.path.join(target, CONFIG_FILENAME)),
+                ConfigFile(os.path.join(target, regdom_name) if regdom_name else None)))
+    # a disk image, whose boot partition holds both
+    return((ImageConfigFile(target),
+            ImageConfigFile(target, regdom_name) if regdom_name else ConfigFile()))
+
+def run_chunk(fn, jobs):
+    return([fn(j) for j in jobs])
+
+def pool_map(fn, jobs, parallel = None):
+    # as ProcessPoolExecutor.map, but submitting jobs in chunks, and
+    # only a few chunks ahead of the one whose results are being
+    # yielded
+    window = 2 * (parallel or os.cpu_count() or 1)
+    jobs = iter(jobs)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers = parallel) as executor:
+        while True:
+            chunk = list(itertools.islice(jobs, FLEET_CHUNK_SIZE))
+            if chunk:
+                pending.append(executor.submit(run_chunk, fn, chunk))
+            if pending and (len(pending) >= window or not chunk):
+                yield from pending.popleft().result()
+            elif not chunk:
+                return
+
+def apply_to_target(job):
+    # worker process entry point; never raises, so one bad target
+    # cannot sink the rest
+    (kind, spec, target, regdom_name, dry_run) = job
+    start = time.monotonic()
+    result = {"target": target, "ok": True}
+    try:
+        (config, regdom) = open_target(target, regdom_name)
+        # written out here, so the bytes can be counted
+        if kind == "profile":
+            report = apply_profile(spec, config, regdom if regdom.path else None, True)
+        else:
+            report = apply_edit_set(spec, config, True)
+        result.update(report)
+        result["bytes_written"] = 0
+        if not dry_run:
+            for f in [config, regdom]:
+                if f.save():
+                    result["written"] += [f.path]
+                    result["bytes_written"] += len("".join(f.lines).encode())
+    except (OSError, ValueError) as e:
+        result.update({"ok": False, "error": str(e), "bytes_written": 0})
+    result["seconds"] = time.monotonic() - start
+    return(result)
+
+def fleet_apply(targets, kind, spec, regdom_name = None, dry_run = False,
+                parallel = None, on_result = None):
+    # apply a profile (kind "profile") or edit set (kind "edits") to
+    # each target boot directory, using up to parallel processes (the
+    # CPU count, by default); on_result is called with each target's
+    # result, in target order, as it arrives; returns summary stats
+    if kind == "profile":
+        # bad profiles are caught once, up front
+        values = decode_profile(spec)
+        if regdom_name is None and "wifi_regdom" in values:
+            raise ProfileError("wifi_regdom: no regdom file name given")
+    stats = {"targets": 0, "ok": 0, "failed": 0, "changed": 0,
+             "reboot_needed": 0, "files_written": 0, "bytes_written": 0}
+    start = time.monotonic()
+    jobs = ((kind, spec, t, regdom_name, dry_run) for t in targets)
+    for r in pool_map(apply_to_target, jobs, parallel):
+        stats["targets"] += 1
+        if r["ok"]:
+            stats["ok"] += 1
+            stats["changed"] += bool(r["added_lines"] or r["removed_lines"] or
+                                     r.get("regdom_changed"))
+            stats["reboot_needed"] += r["reboot_needed"]
+            stats["files_written"] += len(r["written"])
+            stats["bytes_written"] += r["bytes_written"]
+        else:
+            stats["failed"] += 1
+        if on_result is not None:
+            on_result(r)
+    return(finish_stats(stats, start))
+
+def finish_stats(stats, start):
+    elapsed = time.monotonic() - start
+    stats["seconds"] = round(elapsed, 3)
+    stats["files_per_sec"] = round(stats["targets"] / elapsed, 1) if elapsed > 0 else None
+    return(stats)
+
+# audit -------------------------------------------------------------
+
+# the columns of an audit report; settings are in their natural units,
+# as in profiles
+AUDIT_COLUMNS = ["target", "ok", "error", "problems"] + ALL_SETTINGS
+
+def config_problems(state, config):
+    # reasons the config would fail validation: settings a profile
+    # could not hold, and anything the rules (see validation.py) flag
+    problems = []
+    for n in ALL_SETTINGS:
+        try:
+            PROFILE_DECODERS[n](profile_value(n, getattr(state, n)))
+        except ValueError as e:
+            problems += [f"{n}: bad value {profile_value(n, getattr(state, n))!r} ({e})"]
+    return(problems + [problem_text(p) for p in validate_config(config)])
+
+def audit_target(job):
+    # worker process entry point; as apply_to_target, never raises
+    (target, regdom_name) = job
+    row = {"target": target, "ok": True, "error": None}
+    try:
+        (config, regdom) = open_target(target, regdom_name)
+        state = SimpleNamespace()
+        read_settings_from_config(state, config, regdom)
+        row["problems"] = config_problems(state, config)
+        for n in ALL_SETTINGS:
+            row[n] = profile_value(n, getattr(state, n))
+    except (OSError, ValueError) as e:
+        row.update({"ok": False, "error": str(e), "problems": []})
+    return(row)
+
+def fleet_audit(targets, regdom_name = None, parallel = None, on_result = None):
+    # audit each target, calling on_result with each row (see
+    # AUDIT_COLUMNS), in target order; returns summary stats
+    stats = {"targets": 0, "ok": 0, "failed": 0, "flagged": 0}
+    start = time.monotonic()
+    for r in pool_map(audit_target, ((t, regdom_name) for t in targets), parallel):
+        stats["targets"] += 1
+        stats["ok" if r["ok"] else "failed"] += 1
+        stats["flagged"] += bool(r["problems"])
+        if on_result is not None:
+            on_result(r)
+    return(finish_stats(stats, start))
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+#
+# Entry point for the pyconfig_gen GUI; the common autostart case (no
+# pending changes, not a first run) is settled here, before PyQt5 or the
+# dialog module are imported, so a login with nothing to do exits at once
+#
+# License: GPL v3+
+# NO WARRANTY
+
+import sys
+from pyconfig_gen.paths import autostart_has_nothing_to_do
+
+def is_autostart_run(argv):
+    # matches QCommandLineParser's handling of "-a", alone or grouped
+    # with other single-letter options (e.g. "-aR")
+    for a in argv[1:]:
+        if a == "--":
+            break
+        if a.startswith("-") and not a.startswith("--") and "a" in a[1:]:
+            return(True)
+    return(False)
+
+def main():
+    if is_autostart_run(sys.argv) and autostart_has_nothing_to_do():
+        sys.exit(0)
+    from pyconfig_gen import main_dialog
+    main_dialog.main()
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@
 # License: GPL v3+
 # NO WARRANTY
 
-import sys, os, re, shutil, time, subprocess, pwd
+import sys, os, re, shutil, time, pwd, html, threading
 from PyQt5 import QtCore
 from pathlib import Path
 from PyQt5.QtWidgets import QApplication, QDialog, QWidget, QPushButton
@@ -14,21 +14,33 @@ from PyQt5.QtWidgets import QMessageBox, QDialogButtonBox, QButtonGroup
 from PyQt5.QtGui import QIcon
 from pyconfig_gen.pyconfig_gen_dialog import Ui_MainDialog
 from pyconfig_gen.config_utils import *
-
-CONFIG_PATHNAME = "/boot/config.txt"
-CONFIG_LNG_PATHNAME = "/boot/config.txt.lng"
-CONFIG_TBC_PATHNAME = "/boot/config.txt.tbc"
-CONFIG_REJ_PATHNAME = "/boot/config.txt.rej"
-CONFIG_OLD_PATHNAME = "/boot/config.txt.old"
-WIFI_REGDOM_PATHNAME = "/etc/conf.d/rpi3-wifi-regdom"
-WIFI_MODPROBE_PATHNAME = "/etc/modprobe.d/rpi3-wifi-regdom.conf"
+from pyconfig_gen.settings import *
+from pyconfig_gen.startup_tasks import StartupTasks
+from pyconfig_gen.display_probe import DisplayProbe, ModeCache
+from pyconfig_gen.file_watch import CachedConfigFile, watcher_for
+from pyconfig_gen.validation import validate_config, errors_only, problem_text
+from pyconfig_gen.overlay_catalog import load_overlay_catalog
+from pyconfig_gen.boot_commit import BootCommit, recover_commit
+from pyconfig_gen.constraints import SETTING_GRAPH
+from pyconfig_gen import paths
+from pyconfig_gen.paths import CONFIG_PATHNAME, CONFIG_LNG_PATHNAME, \
+    CONFIG_TBC_PATHNAME, CONFIG_REJ_PATHNAME, CONFIG_OLD_PATHNAME, \
+    WIFI_REGDOM_PATHNAME, WIFI_MODPROBE_PATHNAME, OVERLAYS_PATHNAME
 
 HDMI_BASE_MODE_TXT = "Auto-detect from EDID"
 BREAK_REBOOT_NOTIFIED = "break_reboot_notified"
 BASE_TITLE = "RPi Configuration"
 SAVE_NEEDED = " (Unsaved Changes)"
-CMAS = [256, 192, 128, 96, 64, 0]
-GPUS = [256, 192, 128, 96, 64, 32, 16, 0]
+# idle time before a burst of slider / spinbox edits is written out
+COALESCE_MSECS = 150
+# tab page object names, and the build_*_tab methods constructing them
+TAB_BUILDERS = {
+    "display_tab": "display",
+    "second_display_tab": "second_display",
+    "wifi_tab": "interfaces",
+    "tab_2": "wifi",
+    "tab": "tuning",
+}
 
 
 class TimeoutMessageBox(QMessageBox):
@@ -63,6 +75,35 @@ class TimeoutMessageBox(QMessageBox):
         event.accept()
 
 
+class StartupTaskRelay(QtCore.QObject):
+    # carries startup task completions from the pool's worker threads
+    # over to the GUI thread (as a queued connection)
+    task_done = QtCore.pyqtSignal(str, object)
+
+
+class FileChangeRelay(QtCore.QObject):
+    # carries watched file changes, noted on whichever thread's poll of
+    # the watcher read them, over to the GUI thread
+    files_changed = QtCore.pyqtSignal()
+
+
+class TextListModel(QtCore.QAbstractListModel):
+    # read-only view onto a list of strings, shared (without copying)
+    # with the dialog state; dropdowns switch between these with
+    # setModel, rather than being cleared and refilled
+    def __init__(self, texts, parent = None):
+        super(TextListModel, self).__init__(parent)
+        self.texts = texts
+
+    def rowCount(self, parent = QtCore.QModelIndex()):
+        return(0 if parent.isValid() else len(self.texts))
+
+    def data(self, index, role = QtCore.Qt.DisplayRole):
+        if index.isValid() and role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return(self.texts[index.row()])
+        return(None)
+
+
 class MainDialog(QDialog):
 
     allow_reboot = False
@@ -144,11 +185,44 @@ class MainDialog(QDialog):
     dtoverlay_gpio_fan = None
     gpio_fan_trigger = None
 
+    setting_sources = None
+    gui_readers = None
+    gui_views = None
+    pending_settings = None
+    loaded_mode_groups = None
+    pushed_widget_states = None
+    mode_data_ignores_edid = None
+
+    built_tabs = None
+    startup_time = None
+    show_startup_timing = False
+    first_paint_done = False
+
+    mode_models = None
+    country_model = None
+
+    startup_tasks = None
+    display_probe = None
+    startup_task_relay = None
+    file_watcher = None
+    file_notifier = None
+    file_change_relay = None
+    changed_files = None
+    changed_files_lock = None
+    following_changes = False
+    live_config = None
+    live_regdom = None
+
+    coalesce_timer = None
+    deferred_settings = None
+    deferred_signals = 0
+    coalesced_updates = 0
+
     # utilities -----------------------------------------------------
 
     def make_tmp_copy_of_config(self):
         # populate GUI with to-be-confirmed state if present
-        if Path(CONFIG_TBC_PATHNAME).is_file():
+        if paths.has_pending_config_changes(self.file_watcher):
             self.tmp_pathname=setup_tmpfile_copy(CONFIG_TBC_PATHNAME)
         else:
             self.tmp_pathname=setup_tmpfile_copy(CONFIG_PATHNAME)
@@ -165,158 +239,38 @@ class MainDialog(QDialog):
             if os.path.exists(self.tmp_regdom_pathname):
                 os.remove(self.tmp_regdom_pathname)
 
-    def sys_exit(self, retval = 0):
+    def shutdown(self):
+        # on exit: stop background work, then clean up
+        if self.startup_tasks is not None:
+            # a copy still being made would escape cleanup
+            self.startup_tasks.shutdown(wait = True)
+        if self.display_probe is not None:
+            self.display_probe.shutdown(wait = False)
+        if self.file_notifier is not None:
+            self.file_notifier.setEnabled(False)
+        self.following_changes = False
+        if self.file_watcher is not None:
+            self.file_watcher.close()
         self.cleanup_tmp_copy_of_config()
+
+    def sys_exit(self, retval = 0):
+        self.shutdown()
         sys.exit(retval)
 
     # state management ----------------------------------------------
 
     def populate_state_from_config(self, is_initial = False):
-        find_vc4_and_cma=re.compile("([^,\s]+)\s*,?\s*(cma-(\d+))?")
-        v = get_config_var("hdmi_safe", self.tmp_pathname, 0)
-        self.hdmi_safe = (v == 1)
-        v = get_config_var("hdmi_safe:1@pi4", self.tmp_pathname, 0)
-        self.hdmi_safe1 = (v == 1)
-        v = get_config_var("hdmi_group", self.tmp_pathname, 0)
-        # assume default if undefined
-        self.hdmi_group = v if 0 <= v <= 2 else 0
-        v = get_config_var("hdmi_group:1@pi4", self.tmp_pathname, 0)
-        # assume default if undefined
-        self.hdmi_group1 = v if 0 <= v <= 2 else 0
-        v = get_config_var("hdmi_mode", self.tmp_pathname, 0)
-        # assume default if undefined
-        self.hdmi_mode = v if (self.hdmi_group == 1 and 0 <= v <= 59) or \
-            (self.hdmi_group == 2 and 0 <= v <= 86) else 0
-        v = get_config_var("hdmi_mode:1@pi4", self.tmp_pathname, 0)
-        # assume default if undefined
-        self.hdmi_mode1 = v if (self.hdmi_group1 == 1 and 0 <= v <= 59) or \
-            (self.hdmi_group1 == 2 and 0 <= v <= 86) else 0
-        v = get_config_var("dtoverlay=vc4-", self.tmp_pathname,
-                           "", False)
-        m = find_vc4_and_cma.match(v)
-        if m:
-            if m.group(1) == "fkms-v3d":
-                self.dtoverlay_vc4 = 0
-            elif m.group(1) == "kms-v3d":
-                self.dtoverlay_vc4 = 1
-            else:
-                self.dtoverlay_vc4 = 2
-            try:
-                self.cma_vc4 = CMAS.index(int(m.group(3)))
-            except (ValueError, TypeError):
-                self.cma_vc4 = CMAS.index(0)
-        else:
-            self.dtoverlay_vc4 = 2
-            self.cma_vc4 = CMAS.index(0)
-        v = get_config_var("gpu_mem", self.tmp_pathname, 9999)
-        try:
-            self.gpu_vc4 = GPUS.index(v)
-        except (ValueError, TypeError):
-            self.gpu_vc4 = GPUS.index(0)
-        v = get_config_var("hdmi_force_hotplug", self.tmp_pathname, 0)
-        self.hdmi_force_hotplug = v == 1
-        v = get_config_var("hdmi_force_hotplug:1@pi4", self.tmp_pathname, 0)
-        self.hdmi_force_hotplug1 = v == 1
-        v = get_config_var("hdmi_ignore_edid", self.tmp_pathname,
-                           None, False)
-        self.hdmi_ignore_edid = v is not None and v.lower() == "0xa5000080"
-        v = get_config_var("hdmi_ignore_edid:1@pi4", self.tmp_pathname,
-                           None, False)
-        self.hdmi_ignore_edid1 = v is not None and v.lower() == "0xa5000080"
-        v = get_config_var("config_hdmi_boost", self.tmp_pathname, 5)
-        self.config_hdmi_boost = v
-        v = get_config_var("config_hdmi_boost:1@pi4", self.tmp_pathname, 5)
-        self.config_hdmi_boost1 = v
-        v = get_config_var("disable_overscan", self.tmp_pathname, 0)
-        self.disable_overscan = v == 1
-        v = get_config_var("disable_overscan:1@pi4", self.tmp_pathname, 0)
-        self.disable_overscan1 = v == 1
-        v = get_config_var("overscan_left", self.tmp_pathname, 0)
-        self.overscan_left = v
-        v = get_config_var("overscan_right", self.tmp_pathname, 0)
-        self.overscan_right = v
-        v = get_config_var("overscan_top", self.tmp_pathname, 0)
-        self.overscan_top = v
-        v = get_config_var("overscan_bottom", self.tmp_pathname, 0)
-        self.overscan_bottom = v
-        v = get_config_var("overscan_left:1@pi4", self.tmp_pathname, 0)
-        self.overscan_left1 = v
-        v = get_config_var("overscan_right:1@pi4", self.tmp_pathname, 0)
-        self.overscan_right1 = v
-        v = get_config_var("overscan_top:1@pi4", self.tmp_pathname, 0)
-        self.overscan_top1 = v
-        v = get_config_var("overscan_bottom:1@pi4", self.tmp_pathname, 0)
-        self.overscan_bottom1 = v
-        v = get_config_var("hdmi_force_edid_audio", self.tmp_pathname, 0)
-        self.hdmi_force_edid_audio = v == 1
-        v = get_config_var("hdmi_force_edid_audio:1@pi4", self.tmp_pathname, 0)
-        self.hdmi_force_edid_audio1 = v == 1
-        v = get_config_var("hdmi_drive", self.tmp_pathname, 1)
-        self.hdmi_drive = v
-        v = get_config_var("hdmi_drive:1@pi4", self.tmp_pathname, 1)
-        self.hdmi_drive1 = v
-        v = get_config_var("dtparam=spi=", self.tmp_pathname,
-                           None, False)
-        self.dtparam_spi = True if v and "on" in v else False
-        v = get_config_var("dtparam=i2c_arm=", self.tmp_pathname,
-                           None, False)
-        self.dtparam_i2c = True if v and "on" in v else False
-        v = get_config_var("dtparam=i2s=", self.tmp_pathname,
-                           None, False)
-        self.dtparam_i2s = True if v and "on" in v else False
-        v = get_config_var("dtparam=audio=", self.tmp_pathname,
-                           None, False)
-        self.dtparam_audio = True if v and "on" in v else False
-        v = get_config_var("dtoverlay=pi3-disable-bt", self.tmp_pathname,
-                           None, False)
-        self.dtoverlay_disable_bt = v is not None
-        v = get_config_var("start_x", self.tmp_pathname, 0)
-        self.dtparam_camera = v == 1
-
-        force_turbo = max(get_config_var("force_turbo", self.tmp_pathname, 0),
-                          get_config_var("force_turbo@pi4", self.tmp_pathname, 0))
-        arm_freq = get_config_var("arm_freq@pi4", self.tmp_pathname, 1500)
-        gpu_freq = get_config_var("gpu_freq@pi4", self.tmp_pathname, 500)
-        over_voltage = get_config_var("over_voltage@pi4", self.tmp_pathname, 0)
-        # infer the overclock level
-        self.overclock_level = 4
-        if force_turbo == 0:
-            if arm_freq == 1500 and gpu_freq == 500 and over_voltage == 0:
-                self.overclock_level = 0
-            elif arm_freq == 1750 and gpu_freq == 500 and over_voltage == 2:
-                self.overclock_level = 1
-            elif arm_freq == 1750 and gpu_freq == 600 and over_voltage == 4:
-                self.overclock_level = 2
-            elif arm_freq == 2000 and gpu_freq == 600 and over_voltage == 6:
-                self.overclock_level = 3
-        
-        # WiFi status
-        v = get_config_var("WIFI_REGDOM", self.tmp_regdom_pathname,
-                           None, False)
-        v = v.replace('"', '')
-        v = v.replace("'", "")
-        self.wifi_regdom = v
-
-        # Pimoroni fan shim
-        v = get_config_var("dtoverlay=gpio-fan,gpiopin=18,temp=@pi4", self.tmp_pathname)
-        self.dtoverlay_gpio_fan = v is not None
-        if v is None:
-            self.gpio_fan_trigger = 65000
-        else:
-            self.gpio_fan_trigger = v
-        # force sane defaults
-        if self.gpio_fan_trigger < 45000 or self.gpio_fan_trigger > 75000:
-            self.gpio_fan_trigger = 65000
-
-        # Pi-4 specific display settings
-        v = get_config_var("hdmi_enable_4kp60@pi4", self.tmp_pathname, 0)
-        self.hdmi_4kp60 = (v == 1)
+        # one parse of each file, however many keys are read
+        read_settings_from_config(self, ConfigFile(self.tmp_pathname),
+                                  ConfigFile(self.tmp_regdom_pathname))
             
     def dirty_check(self):
-        if config_files_differ_materially(self.tmp_pathname, CONFIG_PATHNAME,
+        # the live files are re-read only when they change
+        if config_files_differ_materially(self.tmp_pathname, self.live_config.current()[0],
                                           print_debug = self.use_fake_data) or \
-           config_files_differ_materially(self.tmp_regdom_pathname, WIFI_REGDOM_PATHNAME,
-                                       print_debug = self.use_fake_data):
+           config_files_differ_materially(self.tmp_regdom_pathname,
+                                          self.live_regdom.current()[0],
+                                          print_debug = self.use_fake_data):
             self.setWindowTitle(BASE_TITLE + SAVE_NEEDED)
             self.dirty = True
         else:
@@ -329,302 +283,192 @@ class MainDialog(QDialog):
             self.reset_b.setEnabled(False)
             self.ok_b.setEnabled(False)
 
-    def populate_gui_from_state(self, is_initial = False):
-        self.ui.graphics_driver_cb.setCurrentIndex(self.dtoverlay_vc4)
-        self.ui.cma_cb.setCurrentIndex(self.cma_vc4)
-        self.ui.gpu_cb.setCurrentIndex(self.gpu_vc4)
-        self.ui.cma_cb.setEnabled(0 <= self.dtoverlay_vc4 <= 1)
-        self.ui.safe_mode_rb.setChecked(self.hdmi_safe)
-        self.ui.safe_mode1_rb.setChecked(self.hdmi_safe1)
-        self.ui.normal_mode_rb.setChecked(not self.hdmi_safe)
-        self.ui.normal_mode_gb.setEnabled(not self.hdmi_safe)
-        self.ui.normal_mode1_rb.setChecked(not self.hdmi_safe1)
-        self.ui.normal_mode1_gb.setEnabled(not self.hdmi_safe1)
-        self.ui.hdmi_group_cb.setCurrentIndex(self.hdmi_group)
-        self.ui.hdmi_group1_cb.setCurrentIndex(self.hdmi_group1)
-        self.ui.hdmi_mode_cb.setEnabled(self.hdmi_group > 0)
-        self.ui.hdmi_mode1_cb.setEnabled(self.hdmi_group1 > 0)
-        self.ui.hdmi_group_cb.setCurrentIndex(self.hdmi_group)
-        self.ui.hdmi_group1_cb.setCurrentIndex(self.hdmi_group1)
-        self.ui.overscan_gb.setChecked(not self.disable_overscan)
-        self.ui.overscan1_gb.setChecked(not self.disable_overscan1)
-        # ensure dialog populated
-        if is_initial:
-            self.hdmi_group_changed(self.hdmi_group)
-            self.hdmi_group1_changed(self.hdmi_group1)
-        ix = [i for i, j in enumerate(self.valid_modes) if j[0] == self.hdmi_mode]
-        if ix:
-            self.ui.hdmi_mode_cb.setCurrentIndex(ix[0])
-        else:
-            self.ui.hdmi_mode_cb.setCurrentIndex(0)
-        ix1 = [i for i, j in enumerate(self.valid_modes1) if j[0] == self.hdmi_mode1]
-        if ix1:
-            self.ui.hdmi_mode1_cb.setCurrentIndex(ix1[0])
-        else:
-            self.ui.hdmi_mode1_cb.setCurrentIndex(0)
-        self.ui.hdmi_force_hotplug_cb.setChecked(self.hdmi_force_hotplug)
-        self.ui.hdmi_force_hotplug1_cb.setChecked(self.hdmi_force_hotplug1)
-        self.ui.hdmi_ignore_edid_cb.setChecked(self.hdmi_ignore_edid)
-        self.ui.hdmi_ignore_edid1_cb.setChecked(self.hdmi_ignore_edid1)
-        self.ui.config_hdmi_boost_sb.setValue(self.config_hdmi_boost)
-        if self.config_hdmi_boost == 5:
-            self.ui.config_hdmi_boost_status_lb.setText("(default)")
-        elif self.config_hdmi_boost==11:
-            self.ui.config_hdmi_boost_status_lb.setText("(max)")
-        elif self.config_hdmi_boost==0:
-            self.ui.config_hdmi_boost_status_lb.setText("(min)")
-        else:
-            self.ui.config_hdmi_boost_status_lb.clear()
-        self.ui.config_hdmi_boost1_sb.setValue(self.config_hdmi_boost1)
-        if self.config_hdmi_boost1 == 5:
-            self.ui.config_hdmi_boost_status1_lb.setText("(default)")
-        elif self.config_hdmi_boost1==11:
-            self.ui.config_hdmi_boost_status1_lb.setText("(max)")
-        elif self.config_hdmi_boost1==0:
-            self.ui.config_hdmi_boost_status1_lb.setText("(min)")
-        else:
-            self.ui.config_hdmi_boost_status1_lb.clear()
-        self.ui.overscan_gb.setChecked(not self.disable_overscan)
-        self.ui.overscan_left_sb.setValue(self.overscan_left)
-        self.ui.overscan_right_sb.setValue(self.overscan_right)
-        self.ui.overscan_top_sb.setValue(self.overscan_top)
-        self.ui.overscan_bottom_sb.setValue(self.overscan_bottom)
-        self.ui.overscan_left1_sb.setValue(self.overscan_left1)
-        self.ui.overscan_right1_sb.setValue(self.overscan_right1)
-        self.ui.overscan_top1_sb.setValue(self.overscan_top1)
-        self.ui.overscan_bottom1_sb.setValue(self.overscan_bottom1)
-        self.ui.hdmi_force_edid_audio_cb.setChecked(self.hdmi_force_edid_audio)
-        self.ui.hdmi_force_edid_audio1_cb.setChecked(self.hdmi_force_edid_audio1)
-        self.ui.hdmi_drive_cb.setChecked(self.hdmi_drive == 2)
-        self.ui.hdmi_drive1_cb.setChecked(self.hdmi_drive1 == 2)
-        self.ui.spi_cb.setChecked(self.dtparam_spi)
-        self.ui.i2c_cb.setChecked(self.dtparam_i2c)
-        self.ui.i2s_cb.setChecked(self.dtparam_i2s)
-        self.ui.audio_cb.setChecked(self.dtparam_audio)
-        self.ui.camera_cb.setChecked(self.dtparam_camera)
-        self.ui.bluetooth_cb.setChecked(not self.dtoverlay_disable_bt)
-        ix = [i for i, j in enumerate(self.country_list) if j[0:2] == self.wifi_regdom]
-        if ix:
-            self.ui.wifi_country_code_cb.setCurrentIndex(ix[0])
-        else:
-            self.ui.wifi_country_code_cb.setCurrentIndex(0)
-        self.overclock_bg.button(self.overclock_level).setChecked(True)
-        self.ui.pimoroni_gb.setChecked(self.dtoverlay_gpio_fan)
-        self.ui.fan_temps_hs.setValue(self.gpio_fan_trigger/1000)
-        self.ui.fan_temps_lb.setText(f"{int(self.gpio_fan_trigger/1000)}°C (off at {int(self.gpio_fan_trigger/1000 - 10)}°C)")
-        self.ui.pi4_4kp60_cb.setChecked(self.hdmi_4kp60)
-        
+    def populate_gui_from_state(self, is_initial = False, settings = None):
+        # push the given settings (all, by default) out to their widgets,
+        # touching only those widget properties which differ from what
+        # was last pushed, with their signals blocked; settings on tabs
+        # not yet built are skipped
+        changes = []
+        for n in (ALL_SETTINGS if settings is None else settings):
+            if n in self.gui_views:
+                changes += self.widget_state_changes(self.gui_views[n]())
+        self.push_widget_states(changes)
         self.dirty_check()
 
-    def populate_state_from_gui(self, is_initial = False):
-        self.dtoverlay_vc4 = self.ui.graphics_driver_cb.currentIndex()
-        self.cma_vc4 = self.ui.cma_cb.currentIndex()
-        self.gpu_vc4 = self.ui.gpu_cb.currentIndex()
-        self.hdmi_safe = self.ui.safe_mode_rb.isChecked()
-        self.hdmi_safe1 = self.ui.safe_mode1_rb.isChecked()
-        self.hdmi_group = self.ui.hdmi_group_cb.currentIndex()
-        self.hdmi_group1 = self.ui.hdmi_group1_cb.currentIndex()
-        try:
-            self.hdmi_mode = self.valid_modes[self.ui.hdmi_mode_cb.currentIndex()][0]
-        except IndexError:
-            self.hdmi_mode = 0
+    def widget_state_changes(self, states):
+        return([(w, prop, v) for (w, prop, v) in states
+                if (w, prop) not in self.pushed_widget_states or
+                self.pushed_widget_states[(w, prop)] != v])
+
+    def push_widget_states(self, changes):
+        blocked = {}
         try:
-            self.hdmi_mode1 = self.valid_modes1[self.ui.hdmi_mode1_cb.currentIndex()][0]
-        except IndexError:
-            self.hdmi_mode1 = 0
-        self.hdmi_force_hotplug = self.ui.hdmi_force_hotplug_cb.isChecked()
-        self.hdmi_force_hotplug1 = self.ui.hdmi_force_hotplug1_cb.isChecked()
-        self.hdmi_ignore_edid = self.ui.hdmi_ignore_edid_cb.isChecked()
-        self.hdmi_ignore_edid1 = self.ui.hdmi_ignore_edid1_cb.isChecked()
-        self.config_hdmi_boost = self.ui.config_hdmi_boost_sb.value()
-        self.config_hdmi_boost1 = self.ui.config_hdmi_boost1_sb.value()
-        self.disable_overscan = not self.ui.overscan_gb.isChecked()
-        self.disable_overscan1 = not self.ui.overscan1_gb.isChecked()
-        self.overscan_left = self.ui.overscan_left_sb.value()
-        self.overscan_right = self.ui.overscan_right_sb.value()
-        self.overscan_top = self.ui.overscan_top_sb.value()
-        self.overscan_bottom = self.ui.overscan_bottom_sb.value()
-        self.hdmi_force_edid_audio = self.ui.hdmi_force_edid_audio_cb.isChecked()
-        self.hdmi_force_edid_audio1 = self.ui.hdmi_force_edid_audio1_cb.isChecked()
-        self.hdmi_drive = 2 if self.ui.hdmi_drive_cb.isChecked() else 0
-        self.hdmi_drive1 = 2 if self.ui.hdmi_drive1_cb.isChecked() else 0
-        self.dtparam_spi = self.ui.spi_cb.isChecked()
-        self.dtparam_i2c = self.ui.i2c_cb.isChecked()
-        self.dtparam_i2s = self.ui.i2s_cb.isChecked()
-        self.dtparam_audio = self.ui.audio_cb.isChecked()
-        self.dtparam_camera = self.ui.camera_cb.isChecked()
-        self.dtoverlay_disable_bt = not self.ui.bluetooth_cb.isChecked()
-        self.wifi_regdom = self.country_list[self.ui.wifi_country_code_cb.currentIndex()][0:2]
-        self.overclock_level = self.overclock_bg.checkedId()
-        self.dtoverlay_gpio_fan = self.ui.pimoroni_gb.isChecked()
-        self.gpio_fan_trigger = self.ui.fan_temps_hs.value() * 1000
-        self.hdmi_4kp60 = self.ui.pi4_4kp60_cb.isChecked()
-        
+            for (w, prop, v) in changes:
+                if w not in blocked:
+                    blocked[w] = w.blockSignals(True)
+            for (w, prop, v) in changes:
+                self.push_widget_state(w, prop, v)
+                self.pushed_widget_states[(w, prop)] = v
+        finally:
+            for (w, b) in blocked.items():
+                w.blockSignals(b)
+
+    def push_widget_state(self, w, prop, v):
+        if prop == "index":
+            w.setCurrentIndex(v)
+        elif prop == "checked":
+            w.setChecked(v)
+        elif prop == "value":
+            w.setValue(v)
+        elif prop == "enabled":
+            w.setEnabled(v)
+        elif prop == "text":
+            w.setText(v)
+
+    def populate_state_from_gui(self, is_initial = False):
+        for n in ALL_SETTINGS:
+            if n in self.gui_readers:
+                setattr(self, n, self.gui_readers[n]())
+
     def populate_config_from_state(self, is_initial = False):
-        if self.dtoverlay_vc4 == 2:
-            comment_config_var("dtoverlay=vc4-", self.tmp_pathname)
-        else:
-            v = ""
-            if self.dtoverlay_vc4 == 0:
-                v += "f"
-            v += "kms-v3d"
-            if self.cma_vc4 < 5:
-                v += f",cma-{CMAS[self.cma_vc4]}"
-            set_config_var("dtoverlay=vc4-", v, self.tmp_pathname, True, False)
-        set_or_comment_config_var("gpu_mem", GPUS[self.gpu_vc4], 0, self.tmp_pathname)
-        if self.hdmi_safe:
-            set_config_var("hdmi_safe", "1", self.tmp_pathname)
-            # comment out anything else related
-            comment_config_var("hdmi_force_hotplug", self.tmp_pathname)
-            comment_config_var("hdmi_ignore_edid", self.tmp_pathname)
-
-            comment_config_var("config_hdmi_boost", self.tmp_pathname)
-            comment_config_var("hdmi_group", self.tmp_pathname)
-            comment_config_var("hdmi_mode", self.tmp_pathname)
-            comment_config_var("disable_overscan", self.tmp_pathname)
-            for d in ["left", "right", "top", "bottom"]:
-                comment_config_var(f"overscan_{d}", self.tmp_pathname)
-        else:
-            comment_config_var("hdmi_safe", self.tmp_pathname)
-            # set other hdmi-related vars, respecting defaults
-            set_or_comment_config_var("hdmi_group", self.hdmi_group,
-                                      0, self.tmp_pathname)
-            set_or_comment_config_var("hdmi_mode", self.hdmi_mode,
-                                      0, self.tmp_pathname)
-            set_or_comment_config_var("hdmi_force_hotplug",
-                                      1 if self.hdmi_force_hotplug else 0,
-                                      0, self.tmp_pathname)
-            set_or_comment_config_var("hdmi_ignore_edid",
-                                      "0xa5000080" if self.hdmi_ignore_edid else None,
-                                      None, self.tmp_pathname)
-            set_or_comment_config_var("config_hdmi_boost", self.config_hdmi_boost,
-                                      5, self.tmp_pathname)
-            set_or_comment_config_var("disable_overscan",
-                                      1 if self.disable_overscan else 0,
-                                      0, self.tmp_pathname)
-            if self.disable_overscan:
-                for d in ["left", "right", "top", "bottom"]:
-                    comment_config_var(f"overscan_{d}", self.tmp_pathname)
-            else:
-                set_or_comment_config_var("overscan_left", self.overscan_left,
-                                          0, self.tmp_pathname)
-                set_or_comment_config_var("overscan_right", self.overscan_right,
-                                          0, self.tmp_pathname)
-                set_or_comment_config_var("overscan_top", self.overscan_top,
-                                          0, self.tmp_pathname)
-                set_or_comment_config_var("overscan_bottom", self.overscan_bottom,
-                                          0, self.tmp_pathname)
-            set_or_comment_config_var("hdmi_force_edid_audio",
-                                      1 if self.hdmi_force_edid_audio else 0,
-                                      0, self.tmp_pathname)
-            set_or_comment_config_var("hdmi_drive", self.hdmi_drive,
-                                      0, self.tmp_pathname)
-        if self.hdmi_safe1:
-            set_config_var("hdmi_safe:1@pi4", "1", self.tmp_pathname)
-            # comment out anything else related
-            comment_config_var("hdmi_force_hotplug:1@pi4", self.tmp_pathname)
-            comment_config_var("hdmi_ignore_edid:1@pi4", self.tmp_pathname)
-
-            comment_config_var("config_hdmi_boost:1@pi4", self.tmp_pathname)
-            comment_config_var("hdmi_group:1@pi4", self.tmp_pathname)
-            comment_config_var("hdmi_mode:1@pi4", self.tmp_pathname)
-            comment_config_var("disable_overscan:1@pi4", self.tmp_pathname)
-            for d in ["left", "right", "top", "bottom"]:
-                comment_config_var(f"overscan_{d}:1@pi4", self.tmp_pathname)
-        else:
-            comment_config_var("hdmi_safe:1@pi4", self.tmp_pathname)
-            # set other hdmi-related vars, respecting defaults
-            set_or_comment_config_var("hdmi_group:1@pi4", self.hdmi_group1,
-                                      0, self.tmp_pathname)
-            set_or_comment_config_var("hdmi_mode:1@pi4", self.hdmi_mode1,
-                                      0, self.tmp_pathname)
-            set_or_comment_config_var("hdmi_force_hotplug:1@pi4",
-                                      1 if self.hdmi_force_hotplug1 else 0,
-                                      0, self.tmp_pathname)
-            set_or_comment_config_var("hdmi_ignore_edid:1@pi4",
-                                      "0xa5000080" if self.hdmi_ignore_edid1 else None,
-                                      None, self.tmp_pathname)
-            set_or_comment_config_var("config_hdmi_boost:1@pi4", self.config_hdmi_boost1,
-                                      5, self.tmp_pathname)
-            set_or_comment_config_var("disable_overscan:1@pi4",
-                                      1 if self.disable_overscan1 else 0,
-                                      0, self.tmp_pathname)
-            if self.disable_overscan1:
-                for d in ["left", "right", "top", "bottom"]:
-                    comment_config_var(f"overscan_{d}:1@pi4", self.tmp_pathname)
-            else:
-                set_or_comment_config_var("overscan_left:1@pi4", self.overscan_left1,
-                                          0, self.tmp_pathname)
-                set_or_comment_config_var("overscan_right:1@pi4", self.overscan_right1,
-                                          0, self.tmp_pathname)
-                set_or_comment_config_var("overscan_top:1@pi4", self.overscan_top1,
-                                          0, self.tmp_pathname)
-                set_or_comment_config_var("overscan_bottom:1@pi4", self.overscan_bottom1,
-                                          0, self.tmp_pathname)
-            set_or_comment_config_var("hdmi_force_edid_audio:1@pi4",
-                                      1 if self.hdmi_force_edid_audio1 else 0,
-                                      0, self.tmp_pathname)
-            set_or_comment_config_var("hdmi_drive:1@pi4", self.hdmi_drive1,
-                                      0, self.tmp_pathname)
-
-        if self.dtparam_spi:
-            set_config_var("dtparam=spi=", "on", self.tmp_pathname, True, False)
-        else:
-            comment_config_var("dtparam=spi=", self.tmp_pathname)
-        if self.dtparam_i2c:
-            set_config_var("dtparam=i2c_arm=", "on", self.tmp_pathname, True, False)
-        else:
-            comment_config_var("dtparam=i2c_arm=", self.tmp_pathname)
-        if self.dtparam_i2s:
-            set_config_var("dtparam=i2s=", "on", self.tmp_pathname, True, False)
-        else:
-            comment_config_var("dtparam=i2s=", self.tmp_pathname)
-        if self.dtparam_audio:
-            set_config_var("dtparam=audio=", "on", self.tmp_pathname, True, False)
-        else:
-            comment_config_var("dtparam=audio=", self.tmp_pathname)
-        if self.dtoverlay_disable_bt:
-            set_config_var("dtoverlay=pi3-disable-bt", "", self.tmp_pathname, True, False)
-        else:
-            comment_config_var("dtoverlay=pi3-disable-bt", self.tmp_pathname)
-        set_or_comment_config_var("start_x",
-                                  1 if self.dtparam_camera else 0,
-                                  0, self.tmp_pathname)
-        if self.overclock_level < 4:
-            if self.overclock_level == 0:
-                (arm_freq, gpu_freq, over_voltage) = (1500, 500, 0)
-            elif self.overclock_level == 1:
-                (arm_freq, gpu_freq, over_voltage) = (1750, 500, 2)
-            elif self.overclock_level == 2:
-                (arm_freq, gpu_freq, over_voltage) = (1750, 600, 4)
-            elif self.overclock_level == 3:
-                (arm_freq, gpu_freq, over_voltage) = (2000, 600, 6)
-            set_or_comment_config_var("force_turbo", 0, 0, self.tmp_pathname)
-            set_or_comment_config_var("force_turbo@pi4", 0, 0, self.tmp_pathname)
-            set_or_comment_config_var("arm_freq@pi4", arm_freq, 1500, self.tmp_pathname)
-            set_or_comment_config_var("gpu_freq@pi4", gpu_freq, 500, self.tmp_pathname)
-            set_or_comment_config_var("over_voltage@pi4", over_voltage, 0, self.tmp_pathname)
-        
-        set_config_var("WIFI_REGDOM", '"' + self.wifi_regdom + '"',
-                       self.tmp_regdom_pathname, True, False)
-
-        if self.dtoverlay_gpio_fan:
-            set_config_var("dtoverlay=gpio-fan,gpiopin=18,temp=@pi4",
-                           self.gpio_fan_trigger, self.tmp_pathname)
-        else:
-            comment_config_var("dtoverlay=gpio-fan,gpiopin=18,temp=@pi4", self.tmp_pathname)
+        apply_settings_to_config(self, ALL_SETTINGS, self.tmp_pathname,
+                                 self.tmp_regdom_pathname)
+
+    def derive_settings(self, names):
+        # recompute any settings whose value depends upon others
+        for p in HDMI_PORTS:
+            if port_setting("hdmi_mode", p) in names:
+                self.derive_hdmi_mode(p)
+
+    def derive_hdmi_mode(self, port):
+        # the mode list depends upon the group and on whether EDID is
+        # overridden; a changed group invalidates the selected mode, a
+        # changed list merely requires that it still be on offer
+        s = port_suffix(port)
+        ignore_edid = getattr(self, f"hdmi_ignore_edid{s}")
+        reload = False
+        if self.mode_data_ignores_edid.get(port) != ignore_edid:
+            self.get_port_system_data(port, fallback = ignore_edid)
+            reload = True
+        group = getattr(self, f"hdmi_group{s}")
+        loaded = self.loaded_mode_groups.get(port)
+        if loaded is None:
+            self.load_mode_list(port)
+        elif loaded != group:
+            setattr(self, f"hdmi_mode{s}", 0)
+            self.load_mode_list(port)
+        elif reload:
+            self.load_mode_list(port, force = True)
+            mode = getattr(self, f"hdmi_mode{s}")
+            if not [j for j in getattr(self, f"valid_modes{s}") if j[0] == mode]:
+                setattr(self, f"hdmi_mode{s}", 0)
+
+    def load_mode_list(self, port, force = False):
+        # (re)fill the mode dropdown for the port's current group
+        s = port_suffix(port)
+        group = getattr(self, f"hdmi_group{s}")
+        if not force and self.loaded_mode_groups.get(port) == group:
+            return
+        target = "cea" if group == 1 else "dmt"
+        setattr(self, f"valid_modes{s}", getattr(self, f"valid_{target}_modes{s}"))
+        setattr(self, f"valid_modes_txt{s}", getattr(self, f"valid_{target}_modes_txt{s}"))
+        self.loaded_mode_groups[port] = group
+        if port_setting("hdmi_mode", port) not in self.gui_views:
+            # tab not built yet
+            return
+        cb = getattr(self.ui, f"hdmi_mode{s}_cb")
+        model = self.mode_models.get((port, target))
+        if model is None:
+            # NB: parented to the dialog, as the combobox would delete a
+            # model it owned on switching away from it
+            model = TextListModel(getattr(self, f"valid_modes_txt{s}"), self)
+            self.mode_models[(port, target)] = model
+        if cb.model() is not model:
+            cb.blockSignals(True)
+            try:
+                cb.setModel(model)
+            finally:
+                cb.blockSignals(False)
+        # the index last pushed no longer reflects the widget
+        self.pushed_widget_states.pop((cb, "index"), None)
+
+    def propagate_settings(self, names):
+        # enforce the constraints on the given settings, then bring just
+        # those config lines and widgets affected into line with the
+        # state; returns the constraints which forced values
+        names = names + [n for n in self.pending_settings if n not in names]
+        self.pending_settings = []
+        (names, forced_by) = SETTING_GRAPH.propagate(self, names)
+        affected = SETTING_GRAPH.affected(names)
+        self.derive_settings(affected)
+        apply_settings_to_config(self, affected, self.tmp_pathname,
+                                 self.tmp_regdom_pathname)
+        self.populate_gui_from_state(settings = affected)
+        return(forced_by)
+
+    def notify_forced(self, constraints):
+        for c in constraints:
+            if c.message is not None:
+                QMessageBox.warning(self, self.windowTitle(),
+                                    f"<p><strong>Warning:</strong> {html.escape(c.message)}</p>")
 
-        set_or_comment_config_var("hdmi_enable_4kp60@pi4",
-                                      1 if self.hdmi_4kp60 else 0,
-                                      0, self.tmp_pathname)
+    def settings_changed(self, names):
+        # the given settings have been edited in the GUI
+        self.flush_deferred_settings()
+        if not self.in_update:
+            self.in_update = True
+            try:
+                for n in names:
+                    setattr(self, n, self.gui_readers[n]())
+                forced_by = self.propagate_settings(names)
+            finally:
+                self.in_update = False
+            self.notify_forced(forced_by)
+
+    def setting_edited(self, name):
+        # continuous input (slider drags, held spinbox arrows) is folded
+        # into a single propagation, once idle for COALESCE_MSECS; the
+        # state itself always tracks the latest widget value, so nothing
+        # is lost if a flush is forced early
+        if self.in_update:
+            return
+        self.in_update = True
+        try:
+            setattr(self, name, self.gui_readers[name]())
+            self.push_widget_states(self.widget_state_changes(self.gui_views[name]()))
+        finally:
+            self.in_update = False
+        if name not in self.deferred_settings:
+            self.deferred_settings += [name]
+        self.deferred_signals += 1
+        self.coalesce_timer.start()
+
+    def flush_deferred_settings(self):
+        self.coalesce_timer.stop()
+        if self.deferred_settings and not self.in_update:
+            names = self.deferred_settings
+            self.deferred_settings = []
+            self.coalesced_updates += self.deferred_signals - 1
+            self.deferred_signals = 0
+            self.in_update = True
+            try:
+                forced_by = self.propagate_settings(names)
+            finally:
+                self.in_update = False
+            self.notify_forced(forced_by)
+            if self.use_fake_data:
+                print(f"flushed {names}; {self.coalesced_updates} updates coalesced so far")
 
     def update_everything(self):
+        self.flush_deferred_settings()
         if not self.in_update:
             self.in_update = True
             try:
                 self.populate_state_from_gui()
+                self.derive_settings(ALL_SETTINGS)
                 self.populate_config_from_state()
                 self.populate_gui_from_state()
+                self.pending_settings = []
             finally:
                 self.in_update = False
 
@@ -633,52 +477,54 @@ class MainDialog(QDialog):
             self.in_update = True
             try:
                 self.populate_state_from_config(True)
-                # set sensible defaults for overscan
-                if self.hdmi_safe:
-                    self.disable_overscan = False
-                if not config_var_defined("overscan_left", self.tmp_pathname):
-                    self.overscan_left = 24
-                if not config_var_defined("overscan_right", self.tmp_pathname):
-                    self.overscan_right = 24
-                if not config_var_defined("overscan_top", self.tmp_pathname):
-                    self.overscan_top = 24
-                if not config_var_defined("overscan_bottom", self.tmp_pathname):
-                    self.overscan_bottom = 24
-                if self.hdmi_safe1:
-                    self.disable_overscan1 = False
-                if not config_var_defined("overscan_left:1@pi4", self.tmp_pathname):
-                    self.overscan_left1 = 24
-                if not config_var_defined("overscan_right:1@pi4", self.tmp_pathname):
-                    self.overscan_right1 = 24
-                if not config_var_defined("overscan_top:1@pi4", self.tmp_pathname):
-                    self.overscan_top1 = 24
-                if not config_var_defined("overscan_bottom:1@pi4", self.tmp_pathname):
-                    self.overscan_bottom1 = 24
+                # set sensible defaults for overscan; these are written
+                # out along with the first change made
+                self.pending_settings = []
+                for p in HDMI_PORTS:
+                    s = port_suffix(p)
+                    if getattr(self, f"hdmi_safe{s}"):
+                        setattr(self, f"disable_overscan{s}", False)
+                    for d in OVERSCAN_SIDES:
+                        if not config_var_defined(port_key(f"overscan_{d}", p),
+                                                  self.tmp_pathname):
+                            setattr(self, f"overscan_{d}{s}", 24)
+                            self.pending_settings += [f"overscan_{d}{s}"]
+                self.loaded_mode_groups = {}
+                self.derive_settings(ALL_SETTINGS)
                 self.populate_gui_from_state(True)
             finally:
                 self.in_update=False
 
     def do_revert(self):
+        self.flush_deferred_settings()
         self.cleanup_tmp_copy_of_config()
         self.make_tmp_copy_of_config()
         self.initial_update()
 
     def do_save_state(self):
+        # our own writes are not outside changes
+        self.following_changes = False
+        if self.file_notifier is not None:
+            self.file_notifier.setEnabled(False)
         cdm = config_files_differ_materially(self.tmp_pathname,
                                              CONFIG_PATHNAME,
                                              self.use_fake_data)
+        # every file is replaced in a single commit: the last-known-good
+        # copy first, and config.txt last; copies are byte for byte
+        commit = BootCommit(paths.COMMIT_JOURNAL_PATHNAME)
+        if cdm and self.save_lng:
+            commit.stage_bytes(CONFIG_LNG_PATHNAME, Path(CONFIG_PATHNAME).read_bytes())
+        regdom_data = Path(self.tmp_regdom_pathname).read_bytes()
+        commit.stage_bytes(WIFI_REGDOM_PATHNAME, regdom_data)
+        if regdom_data and Path(WIFI_MODPROBE_PATHNAME).is_file():
+            # reflect in module settings too
+            modprobe = ConfigFile(WIFI_MODPROBE_PATHNAME)
+            write_modprobe_regdom(self.wifi_regdom, modprobe)
+            commit.stage_config(modprobe)
         if cdm:
-            if self.save_lng:
-                shutil.copyfile(CONFIG_PATHNAME, CONFIG_LNG_PATHNAME)
-            shutil.copyfile(self.tmp_pathname, CONFIG_PATHNAME)
+            commit.stage_bytes(CONFIG_PATHNAME, Path(self.tmp_pathname).read_bytes())
+        commit.commit()
         os.remove(self.tmp_pathname)
-        shutil.copyfile(self.tmp_regdom_pathname, WIFI_REGDOM_PATHNAME)
-        # reflect in module settings too
-        subprocess.run(f"[[ -s \"{WIFI_REGDOM_PATHNAME}\" ]] && " +
-                       f"sed -i 's#ieee80211_regdom=.*$#" +
-                       f"ieee80211_regdom=\"{self.wifi_regdom}\"#g' " +
-                       f"\"{WIFI_MODPROBE_PATHNAME}\"",
-                       shell=True)
         os.remove(self.tmp_regdom_pathname)
 
         if self.save_lng:
@@ -700,26 +546,23 @@ class MainDialog(QDialog):
     # slots ---------------------------------------------------------
 
     def gui_changed(self):
-        # generic handler
-        self.update_everything()
+        # generic handler; propagate just the setting whose widget
+        # sent the signal, falling back to a full update
+        name = self.setting_sources.get(self.sender())
+        if name is None:
+            self.update_everything()
+        elif name in CONTINUOUS_SETTINGS:
+            self.setting_edited(name)
+        else:
+            self.settings_changed([name])
 
     def gui_value_changed(self, v):
         # generic handler
         self.gui_changed()
 
     def camera_cb_value_changed(self, v):
-        if self.ui.camera_cb.isChecked() and GPUS[self.gpu_vc4] < 128:
-            if not self.in_update:
-                QMessageBox.warning(self, self.windowTitle(),
-"""
-
-<p><strong>Warning:</strong> your current GPU memory allocation is too low to use the camera.</p>
-
-<p>Force-setting 128 MiB GPU memory allocation instead.</p>
-
-""")
-                self.ui.gpu_cb.setCurrentIndex(GPUS.index(128))
-        self.gui_changed()
+        # the GPU memory the camera needs is forced by its constraint
+        self.settings_changed(["dtparam_camera"])
 
     def gui_bool_changed(self, b):
         # generic handler
@@ -747,8 +590,28 @@ class MainDialog(QDialog):
 <p>No restart is necessary, as your configuration is now unchanged
 again from that which this session was booted under.</p>
 
+"""
+        invalid_txt = """
+
+<p><strong>Warning:</strong> your configuration has problems, which may
+stop your RPi from booting as expected:</p>
+
+<ul>{}</ul>
+
+<p>Save it anyway?</p>
+
 """
         if self.dirty:
+            # hand edits are kept, so may yet break the rules (or load
+            # overlays not installed, only otherwise found on rebooting)
+            catalog = load_overlay_catalog(OVERLAYS_PATHNAME, paths.overlay_catalog_cache_path())
+            errors = errors_only(validate_config(self.tmp_pathname, catalog))
+            if errors and QMessageBox.question(
+                    self, self.windowTitle(),
+                    invalid_txt.format("".join(f"<li>{html.escape(problem_text(p))}</li>"
+                                               for p in errors)),
+                    QMessageBox.Yes | QMessageBox.No, QMessageBox.No) != QMessageBox.Yes:
+                return
             reboot_needed = self.do_save_state()
             if reboot_needed:
                 if QMessageBox.question(self, self.windowTitle(), do_reboot_txt,
@@ -763,65 +626,33 @@ again from that which this session was booted under.</p>
         super(MainDialog, self).accept()
 
     def reject(self):
+        self.flush_deferred_settings()
         super(MainDialog, self).reject()
 
+    def closeEvent(self, event):
+        self.flush_deferred_settings()
+        super(MainDialog, self).closeEvent(event)
+
     def hdmi_group_changed(self, index):
-        self.ui.hdmi_mode_cb.clear()
-        if index == 1:
-            self.valid_modes = self.valid_cea_modes
-            self.valid_modes_txt = self.valid_cea_modes_txt
-        else:
-            self.valid_modes = self.valid_dmt_modes
-            self.valid_modes_txt = self.valid_dmt_modes_txt
-        self.ui.hdmi_mode_cb.addItems(self.valid_modes_txt)
-        self.update_everything()
+        # the mode list is reloaded when hdmi_mode is derived
+        self.settings_changed(["hdmi_group"])
 
     def hdmi_group1_changed(self, index):
-        self.ui.hdmi_mode1_cb.clear()
-        if index == 1:
-            self.valid_modes1 = self.valid_cea_modes1
-            self.valid_modes_txt1 = self.valid_cea_modes_txt1
-        else:
-            self.valid_modes1 = self.valid_dmt_modes1
-            self.valid_modes_txt1 = self.valid_dmt_modes_txt1
-        self.ui.hdmi_mode1_cb.addItems(self.valid_modes_txt1)
-        self.update_everything()
-
-    def sync_fallback_lists(self):
-        # force dropdowns to update with new list
-        old_hdmi_mode = self.hdmi_mode
-        self.hdmi_group_changed(self.hdmi_group)
-        # may be we can still use old mode, if it exists in new mode list
-        self.hdmi_mode = old_hdmi_mode
-        self.populate_gui_from_state()
-        self.update_everything()
-
-    def sync_fallback_lists1(self):
-        # force dropdowns to update with new list
-        old_hdmi_mode1 = self.hdmi_mode1
-        self.hdmi_group1_changed(self.hdmi_group1)
-        # may be we can still use old mode, if it exists in new mode list
-        self.hdmi_mode1 = old_hdmi_mode1
-        self.populate_gui_from_state()
-        self.update_everything()
+        self.settings_changed(["hdmi_group1"])
 
     def hdmi_ignore_edid_changed(self, b):
-        # repopulate the HDMI mode lists with sane defaults,
-        # if ignoring EDID...
-        self.update_everything()
-        self.get_system_data(fallback = self.ui.hdmi_ignore_edid_cb.isChecked())
-        self.sync_fallback_lists()
+        # the HDMI mode lists are repopulated with sane defaults when
+        # hdmi_mode is derived, if ignoring EDID...
+        self.settings_changed(["hdmi_ignore_edid"])
 
     def hdmi_ignore_edid1_changed(self, b):
-        # repopulate the HDMI mode lists with sane defaults,
-        # if ignoring EDID...
-        self.update_everything()
-        self.get_system_data1(fallback = self.ui.hdmi_ignore_edid1_cb.isChecked())
-        self.sync_fallback_lists1()
+        self.settings_changed(["hdmi_ignore_edid1"])
 
     def button_bar_button_clicked(self, button):
         if(button.text() == "Revert"):
             self.do_revert()
+        elif(button.text() == "Refresh Displays"):
+            self.refresh_display_modes()
 
     def layout_editor_button_clicked(self, b):
         existing_pid = pid_of_process("arandr")
@@ -886,32 +717,32 @@ and your last-known-good config is again in force.</p>
 
 """ f"<em>{CONFIG_REJ_PATHNAME}</em>, until the next reboot.</p>")
 
+    def set_port_system_data(self, port, data, ignores_edid):
+        s = port_suffix(port)
+        (cea_modes, cea_modes_txt, dmt_modes, dmt_modes_txt, using_fallback) = data
+        setattr(self, f"valid_cea_modes{s}", cea_modes)
+        setattr(self, f"valid_cea_modes_txt{s}", cea_modes_txt)
+        setattr(self, f"valid_dmt_modes{s}", dmt_modes)
+        setattr(self, f"valid_dmt_modes_txt{s}", dmt_modes_txt)
+        setattr(self, f"using_fallback_hdmi_data{s}", using_fallback)
+        self.mode_data_ignores_edid[port] = ignores_edid
+        # models onto the old lists are rebuilt when next shown
+        for target in ["cea", "dmt"]:
+            self.mode_models.pop((port, target), None)
+
     def get_system_data(self, fallback = False):
-        fn = get_fallback_modes if fallback else get_valid_modes
-        self.using_fallback_hdmi_data = fallback
-        while True:
-            (self.valid_cea_modes, self.valid_cea_modes_txt) = \
-                fn("CEA", HDMI_BASE_MODE_TXT, self.use_fake_data, 0)
-            (self.valid_dmt_modes, self.valid_dmt_modes_txt) = \
-                fn("DMT", HDMI_BASE_MODE_TXT, self.use_fake_data, 0)
-            if len(self.valid_cea_modes) > 1 or len(self.valid_dmt_modes) > 1:
-                break
-            fn = get_fallback_modes
-            self.using_fallback_hdmi_data = True
+        self.set_port_system_data(
+            0, self.display_probe.port_modes(0, HDMI_BASE_MODE_TXT, fallback), fallback)
 
     def get_system_data1(self, fallback = False):
-        fn = get_fallback_modes if fallback else get_valid_modes
-        self.using_fallback_hdmi_data1 = fallback
-        while True:
-            (self.valid_cea_modes1, self.valid_cea_modes_txt1) = \
-                fn("CEA", HDMI_BASE_MODE_TXT, self.use_fake_data, 1)
-            (self.valid_dmt_modes1, self.valid_dmt_modes_txt1) = \
-                fn("DMT", HDMI_BASE_MODE_TXT, self.use_fake_data, 1)
-            if len(self.valid_cea_modes1) > 1 or len(self.valid_dmt_modes1) > 1:
-                break
-            fn = get_fallback_modes
-            self.using_fallback_hdmi_data1 = True
-        
+        self.set_port_system_data(
+            1, self.display_probe.port_modes(1, HDMI_BASE_MODE_TXT, fallback), fallback)
+
+    def get_port_system_data(self, port, fallback = False):
+        if port == 0:
+            self.get_system_data(fallback)
+        else:
+            self.get_system_data1(fallback)
 
     def setup_buttons(self):
         self.reset_b = self.ui.main_bb.button(QDialogButtonBox.Reset)
@@ -923,43 +754,9 @@ and your last-known-good config is again in force.</p>
         self.reset_b.setIcon(QIcon())
         self.reset_b.setText("Revert")
         self.reset_b.setToolTip("Revert all edits since you opened the application")
+        self.refresh_b = self.ui.main_bb.addButton("Refresh Displays", QDialogButtonBox.ActionRole)
+        self.refresh_b.setToolTip("Re-query the attached displays for the modes they support")
 
-    def setup_tooltips(self):
-        # avoid having to duplicate text in the .ui file
-        self.ui.normal_mode1_rb.setToolTip(self.ui.normal_mode_rb.toolTip())
-        self.ui.safe_mode1_rb.setToolTip(self.ui.safe_mode_rb.toolTip())
-        self.ui.hdmi_group_cb.setToolTip(self.ui.hdmi_group_lb.toolTip())
-        self.ui.hdmi_group1_lb.setToolTip(self.ui.hdmi_group_lb.toolTip())
-        self.ui.hdmi_group1_cb.setToolTip(self.ui.hdmi_group_lb.toolTip())
-        self.ui.hdmi_mode_cb.setToolTip(self.ui.hdmi_mode_lb.toolTip())
-        self.ui.hdmi_mode1_lb.setToolTip(self.ui.hdmi_mode_lb.toolTip())
-        self.ui.hdmi_mode1_cb.setToolTip(self.ui.hdmi_mode_lb.toolTip())
-        self.ui.graphics_driver_cb.setToolTip(self.ui.graphics_driver_lb.toolTip())
-        self.ui.cma_cb.setToolTip(self.ui.cma_lb.toolTip())
-        self.ui.gpu_cb.setToolTip(self.ui.gpu_lb.toolTip())
-        self.ui.config_hdmi_boost_sb.setToolTip(self.ui.config_hdmi_boost_lb.toolTip())
-        self.ui.config_hdmi_boost1_lb.setToolTip(self.ui.config_hdmi_boost_lb.toolTip())
-        self.ui.config_hdmi_boost1_sb.setToolTip(self.ui.config_hdmi_boost_lb.toolTip())
-        self.ui.overscan1_gb.setToolTip(self.ui.overscan_gb.toolTip())
-        self.ui.overscan_left_sb.setToolTip(self.ui.overscan_left_lb.toolTip())
-        self.ui.overscan_left1_lb.setToolTip(self.ui.overscan_left_lb.toolTip())
-        self.ui.overscan_left1_sb.setToolTip(self.ui.overscan_left_lb.toolTip())
-        self.ui.overscan_right_sb.setToolTip(self.ui.overscan_right_lb.toolTip())
-        self.ui.overscan_right1_lb.setToolTip(self.ui.overscan_right_lb.toolTip())
-        self.ui.overscan_right1_sb.setToolTip(self.ui.overscan_right_lb.toolTip())
-        self.ui.overscan_top_sb.setToolTip(self.ui.overscan_top_lb.toolTip())
-        self.ui.overscan_top1_lb.setToolTip(self.ui.overscan_top_lb.toolTip())
-        self.ui.overscan_top1_sb.setToolTip(self.ui.overscan_top_lb.toolTip())
-        self.ui.overscan_bottom_sb.setToolTip(self.ui.overscan_bottom_lb.toolTip())
-        self.ui.overscan_bottom1_lb.setToolTip(self.ui.overscan_bottom_lb.toolTip())
-        self.ui.overscan_bottom1_sb.setToolTip(self.ui.overscan_bottom_lb.toolTip())
-        self.ui.hdmi_force_hotplug1_cb.setToolTip(self.ui.hdmi_force_hotplug_cb.toolTip())
-        self.ui.hdmi_ignore_edid1_cb.setToolTip(self.ui.hdmi_ignore_edid_cb.toolTip())
-        self.ui.config_hdmi_boost1_lb.setToolTip(self.ui.config_hdmi_boost_lb.toolTip())
-        self.ui.hdmi_drive1_cb.setToolTip(self.ui.hdmi_drive_cb.toolTip())
-        self.ui.hdmi_force_edid_audio1_cb.setToolTip(self.ui.hdmi_force_edid_audio_cb.toolTip())
-        self.ui.wifi_country_code_cb.setToolTip(self.ui.wifi_country_code_lb.toolTip())
-        
     def reboot_now(self):
         if self.allow_reboot:
             do_reboot()
@@ -968,11 +765,10 @@ and your last-known-good config is again in force.</p>
         self.sys_exit(0)
 
     def has_pending_config_changes(self):
-        return(Path(CONFIG_TBC_PATHNAME).is_file())
+        return(paths.has_pending_config_changes(self.file_watcher))
 
     def break_reboot_lng_restore_just_happened(self):
-        return(Path(CONFIG_REJ_PATHNAME).is_file() and
-               not Path(self.handled_already_sentinel()).is_file())
+        return(paths.break_reboot_lng_restore_just_happened(self.file_watcher))
 
     def handle_pending_config_changes(self):
         # background: on save, old config.txt -> config.txt.lng, new
@@ -1039,19 +835,16 @@ without (e.g.) a visible display.</p>
             self.sys_exit(1)
 
     def local_home_dir(self):
-        # look through sudo
-        user = os.getenv("SUDO_USER") or "root"
-        homedir = "/root" if user == "root" else f"/home/{user}"
-        return(homedir)
+        return(paths.local_home_dir())
 
     def local_config_root_dir(self):
-        return(f"{self.local_home_dir()}/.config")
+        return(paths.local_config_root_dir())
 
     def local_config_dir(self):
-        return(f"{self.local_config_root_dir()}/{app_name()}")
+        return(paths.local_config_dir())
       
     def is_first_run(self):
-        return(not Path(self.local_config_dir()).is_dir())
+        return(paths.is_first_run())
 
     def make_local_config_dir(self):
         if self.first_run:
@@ -1065,7 +858,7 @@ without (e.g.) a visible display.</p>
                 make_real_user_owned(lcd)
                 
     def handled_already_sentinel(self):
-        return(f"/tmp/.{app_name()}_BREAK_REBOOT_NOTIFIED")
+        return(paths.handled_already_sentinel())
 
     def handle_break_reboot_lng_restore(self):
         # deal with a rej config being present: this indicates that
@@ -1076,18 +869,96 @@ without (e.g.) a visible display.</p>
             make_real_user_owned(self.handled_already_sentinel())
             self.show_break_reboot_detected_popup()
             
+    def recover_interrupted_commit(self):
+        # finish a save cut short, before anything is read
+        if paths.has_interrupted_commit():
+            try:
+                recover_commit(paths.COMMIT_JOURNAL_PATHNAME)
+            except OSError:
+                pass # not root; check_running_as_root will say so
+
     def resolve_prior_edit_without_reboot(self):
         # if an lng config is present, the user has modified config.txt via this
         # app, but not rebooted yet
         # in this case, mark that we don't want to save as last-known-good
         # on a "save and exit" this time
-        if Path(CONFIG_LNG_PATHNAME).is_file() and Path(CONFIG_PATHNAME).is_file():
+        if paths.has_unrebooted_config_changes(self.file_watcher):
             self.save_lng = False
 
+    def setup_file_watch(self):
+        # follow changes made (by other programs) to the files we edit
+        # while open, without polling; with no inotify, dirty_check just
+        # stats them
+        self.file_watcher = watcher_for(paths.WATCHED_PATHNAMES)
+        self.live_config = CachedConfigFile(CONFIG_PATHNAME, self.file_watcher)
+        self.live_regdom = CachedConfigFile(WIFI_REGDOM_PATHNAME, self.file_watcher)
+
+    def start_file_notifier(self):
+        # events are read by whichever poll of the watcher comes first
+        # (the notifier's, or a cache's on another thread), and reach us
+        # through its listeners, so none are missed
+        if self.file_watcher is not None:
+            self.changed_files = set()
+            self.changed_files_lock = threading.Lock()
+            self.file_change_relay = FileChangeRelay(self)
+            self.file_change_relay.files_changed.connect(self.watched_files_changed,
+                                                         QtCore.Qt.QueuedConnection)
+            for p in (CONFIG_PATHNAME, WIFI_REGDOM_PATHNAME, CONFIG_LNG_PATHNAME):
+                self.file_watcher.watch(p, self.note_watched_file_change)
+            self.following_changes = True
+            self.file_notifier = QtCore.QSocketNotifier(self.file_watcher.fileno(),
+                                                        QtCore.QSocketNotifier.Read, self)
+            self.file_notifier.activated.connect(self.poll_file_watcher)
+
+    def poll_file_watcher(self):
+        self.file_watcher.poll()
+
+    def note_watched_file_change(self, path):
+        # a watcher listener, so called on any thread
+        if not self.following_changes:
+            return
+        with self.changed_files_lock:
+            self.changed_files.add(path)
+        self.file_change_relay.files_changed.emit()
+
+    def watched_files_changed(self):
+        with self.changed_files_lock:
+            changed = self.changed_files
+            self.changed_files = set()
+        if not changed or not self.following_changes:
+            return
+        if CONFIG_LNG_PATHNAME in changed:
+            self.resolve_prior_edit_without_reboot()
+        if self.in_update or not (changed & {CONFIG_PATHNAME, WIFI_REGDOM_PATHNAME}):
+            return
+        if not self.dirty:
+            # nothing of ours to lose
+            self.do_revert()
+        elif QMessageBox.question(self, self.windowTitle(),
+"""
+
+<p>The RPi configuration has been changed by another program while you
+were editing it.</p>
+
+<p>Discard your unsaved changes, and reload it?</p>
+
+""") == QMessageBox.Yes:
+            self.do_revert()
+        else:
+            # the title and buttons reflect the new differences
+            self.dirty_check()
+
     def setup_wifi_country_codes(self):
-        self.country_list = get_wifi_country_list()
-        self.ui.wifi_country_code_cb.clear()
-        self.ui.wifi_country_code_cb.addItems(self.country_list)
+        if self.country_model is None:
+            self.country_model = TextListModel(self.country_list, self)
+        self.ui.wifi_country_code_cb.setModel(self.country_model)
+
+    def setup_coalescing(self):
+        self.deferred_settings = []
+        self.coalesce_timer = QtCore.QTimer(self)
+        self.coalesce_timer.setSingleShot(True)
+        self.coalesce_timer.setInterval(COALESCE_MSECS)
+        self.coalesce_timer.timeout.connect(self.flush_deferred_settings)
 
     def setup_overclock_button_group(self):
         self.overclock_bg = QButtonGroup()
@@ -1098,25 +969,323 @@ without (e.g.) a visible display.</p>
         self.overclock_bg.addButton(self.ui.overclock4_rb, 4)
         self.overclock_bg.buttonClicked['int'].connect(self.gui_value_changed)
     
+    def bind_setting(self, name, sources, reader, view):
+        # for each setting: the widget(s) whose signals edit it, how to
+        # read it back from the GUI, and the (widget, property, value)
+        # states which reflect it there
+        for w in sources:
+            self.setting_sources[w] = name
+        self.gui_readers[name] = reader
+        self.gui_views[name] = view
+
+    def bind_check_setting(self, name, w, invert = False):
+        self.bind_setting(name, [w], lambda: w.isChecked() != invert,
+                          lambda: [(w, "checked", getattr(self, name) != invert)])
+
+    def bind_graphics_settings(self):
+        ui = self.ui
+        self.bind_setting("dtoverlay_vc4", [ui.graphics_driver_cb],
+                          lambda: ui.graphics_driver_cb.currentIndex(),
+                          lambda: [(ui.graphics_driver_cb, "index", self.dtoverlay_vc4)])
+        self.bind_setting("cma_vc4", [ui.cma_cb],
+                          lambda: ui.cma_cb.currentIndex(),
+                          lambda: [(ui.cma_cb, "index", self.cma_vc4),
+                                   (ui.cma_cb, "enabled", SETTING_GRAPH.enabled(self, "cma_vc4"))])
+        self.bind_setting("gpu_vc4", [ui.gpu_cb],
+                          lambda: ui.gpu_cb.currentIndex(),
+                          lambda: [(ui.gpu_cb, "index", self.gpu_vc4)])
+        self.bind_check_setting("hdmi_4kp60", ui.pi4_4kp60_cb)
+
+    def bind_port_settings(self, p):
+        ui = self.ui
+        s = port_suffix(p)
+        w = lambda n: getattr(ui, n.format(s=s))
+        def boost_status(v):
+            return({5: "(default)", 11: "(max)", 0: "(min)"}.get(v, ""))
+        def mode_index():
+            mode = getattr(self, f"hdmi_mode{s}")
+            ix = [i for i, j in enumerate(getattr(self, f"valid_modes{s}")) if j[0] == mode]
+            return(ix[0] if ix else 0)
+        def mode_reader():
+            ix = w("hdmi_mode{s}_cb").currentIndex()
+            modes = getattr(self, f"valid_modes{s}")
+            return(modes[ix][0] if 0 <= ix < len(modes) else 0)
+        (safe_rb, normal_rb, normal_gb) = (w("safe_mode{s}_rb"), w("normal_mode{s}_rb"),
+                                           w("normal_mode{s}_gb"))
+        self.bind_setting(f"hdmi_safe{s}", [safe_rb, normal_rb],
+                          lambda: safe_rb.isChecked(),
+                          lambda: [(safe_rb, "checked", getattr(self, f"hdmi_safe{s}")),
+                                   (normal_rb, "checked", not getattr(self, f"hdmi_safe{s}")),
+                                   (normal_gb, "enabled", not getattr(self, f"hdmi_safe{s}"))])
+        group_cb = w("hdmi_group{s}_cb")
+        self.bind_setting(f"hdmi_group{s}", [group_cb],
+                          lambda: group_cb.currentIndex(),
+                          lambda: [(group_cb, "index", getattr(self, f"hdmi_group{s}"))])
+        mode_cb = w("hdmi_mode{s}_cb")
+        self.bind_setting(f"hdmi_mode{s}", [mode_cb], mode_reader,
+                          lambda: [(mode_cb, "index", mode_index()),
+                                   (mode_cb, "enabled", SETTING_GRAPH.enabled(self, f"hdmi_mode{s}"))])
+        self.bind_check_setting(f"hdmi_force_hotplug{s}", w("hdmi_force_hotplug{s}_cb"))
+        self.bind_check_setting(f"hdmi_ignore_edid{s}", w("hdmi_ignore_edid{s}_cb"))
+        self.bind_check_setting(f"disable_overscan{s}", w("overscan{s}_gb"), invert = True)
+        self.bind_check_setting(f"hdmi_force_edid_audio{s}", w("hdmi_force_edid_audio{s}_cb"))
+        (boost_sb, boost_lb) = (w("config_hdmi_boost{s}_sb"), w("config_hdmi_boost_status{s}_lb"))
+        self.bind_setting(f"config_hdmi_boost{s}", [boost_sb],
+                          lambda: boost_sb.value(),
+                          lambda: [(boost_sb, "value", getattr(self, f"config_hdmi_boost{s}")),
+                                   (boost_lb, "text", boost_status(getattr(self, f"config_hdmi_boost{s}")))])
+        for d in OVERSCAN_SIDES:
+            sb = w(f"overscan_{d}{{s}}_sb")
+            self.bind_setting(f"overscan_{d}{s}", [sb],
+                              lambda sb=sb: sb.value(),
+                              lambda n=f"overscan_{d}{s}", sb=sb: [(sb, "value", getattr(self, n))])
+        drive_cb = w("hdmi_drive{s}_cb")
+        self.bind_setting(f"hdmi_drive{s}", [drive_cb],
+                          lambda: 2 if drive_cb.isChecked() else 0,
+                          lambda: [(drive_cb, "checked", getattr(self, f"hdmi_drive{s}") == 2)])
+
+    def bind_interface_settings(self):
+        ui = self.ui
+        self.bind_check_setting("dtparam_spi", ui.spi_cb)
+        self.bind_check_setting("dtparam_i2c", ui.i2c_cb)
+        self.bind_check_setting("dtparam_i2s", ui.i2s_cb)
+        self.bind_check_setting("dtparam_audio", ui.audio_cb)
+        self.bind_check_setting("dtparam_camera", ui.camera_cb)
+        self.bind_check_setting("dtoverlay_disable_bt", ui.bluetooth_cb, invert = True)
+
+    def bind_wifi_settings(self):
+        ui = self.ui
+        def country_index():
+            ix = [i for i, j in enumerate(self.country_list) if j[0:2] == self.wifi_regdom]
+            return(ix[0] if ix else 0)
+        self.bind_setting("wifi_regdom", [ui.wifi_country_code_cb],
+                          lambda: self.country_list[ui.wifi_country_code_cb.currentIndex()][0:2],
+                          lambda: [(ui.wifi_country_code_cb, "index", country_index())])
+
+    def bind_tuning_settings(self):
+        ui = self.ui
+        self.bind_setting("overclock_level", [self.overclock_bg],
+                          lambda: self.overclock_bg.checkedId(),
+                          lambda: [(self.overclock_bg.button(i), "checked", i == self.overclock_level)
+                                   for i in range(5)])
+        self.bind_check_setting("dtoverlay_gpio_fan", ui.pimoroni_gb)
+        self.bind_setting("gpio_fan_trigger", [ui.fan_temps_hs],
+                          lambda: ui.fan_temps_hs.value() * 1000,
+                          lambda: [(ui.fan_temps_hs, "value", int(self.gpio_fan_trigger/1000)),
+                                   (ui.fan_temps_lb, "text",
+                                    f"{int(self.gpio_fan_trigger/1000)}°C (off at {int(self.gpio_fan_trigger/1000 - 10)}°C)")])
+
+    # tab pages are only built (and their settings bound) on first
+    # activation; the state, not the widgets, is authoritative, so a
+    # newly-built page is simply brought into line with it
+
+    def build_tab(self, index):
+        page = self.ui.tabWidget.widget(index)
+        name = page.objectName() if page is not None else None
+        if name not in TAB_BUILDERS or name in self.built_tabs:
+            return
+        self.built_tabs.add(name)
+        bound = set(self.gui_views)
+        getattr(self, f"build_{TAB_BUILDERS[name]}_tab")()
+        was_in_update = self.in_update
+        self.in_update = True
+        try:
+            self.populate_gui_from_state(
+                settings = [n for n in ALL_SETTINGS if n in self.gui_views and n not in bound])
+        finally:
+            self.in_update = was_in_update
+
+    def build_all_tabs(self):
+        for i in range(self.ui.tabWidget.count()):
+            self.build_tab(i)
+
+    def build_display_tab(self):
+        ui = self.ui
+        ui.setupDisplayTab(self)
+        # avoid having to duplicate text in the .ui file
+        ui.hdmi_group_cb.setToolTip(ui.hdmi_group_lb.toolTip())
+        ui.hdmi_mode_cb.setToolTip(ui.hdmi_mode_lb.toolTip())
+        ui.graphics_driver_cb.setToolTip(ui.graphics_driver_lb.toolTip())
+        ui.cma_cb.setToolTip(ui.cma_lb.toolTip())
+        ui.gpu_cb.setToolTip(ui.gpu_lb.toolTip())
+        ui.config_hdmi_boost_sb.setToolTip(ui.config_hdmi_boost_lb.toolTip())
+        for d in OVERSCAN_SIDES:
+            getattr(ui, f"overscan_{d}_sb").setToolTip(getattr(ui, f"overscan_{d}_lb").toolTip())
+        self.bind_graphics_settings()
+        self.bind_port_settings(0)
+        self.load_mode_list(0, force = True)
+
+    def build_second_display_tab(self):
+        ui = self.ui
+        ui.setupSecondDisplayTab(self)
+        # tooltips are copied from the first display's tab, which is
+        # always built first
+        self.build_tab(ui.tabWidget.indexOf(ui.display_tab))
+        ui.normal_mode1_rb.setToolTip(ui.normal_mode_rb.toolTip())
+        ui.safe_mode1_rb.setToolTip(ui.safe_mode_rb.toolTip())
+        ui.hdmi_group1_lb.setToolTip(ui.hdmi_group_lb.toolTip())
+        ui.hdmi_group1_cb.setToolTip(ui.hdmi_group_lb.toolTip())
+        ui.hdmi_mode1_lb.setToolTip(ui.hdmi_mode_lb.toolTip())
+        ui.hdmi_mode1_cb.setToolTip(ui.hdmi_mode_lb.toolTip())
+        ui.config_hdmi_boost1_lb.setToolTip(ui.config_hdmi_boost_lb.toolTip())
+        ui.config_hdmi_boost1_sb.setToolTip(ui.config_hdmi_boost_lb.toolTip())
+        ui.overscan1_gb.setToolTip(ui.overscan_gb.toolTip())
+        for d in OVERSCAN_SIDES:
+            getattr(ui, f"overscan_{d}1_lb").setToolTip(getattr(ui, f"overscan_{d}_lb").toolTip())
+            getattr(ui, f"overscan_{d}1_sb").setToolTip(getattr(ui, f"overscan_{d}_lb").toolTip())
+        ui.hdmi_force_hotplug1_cb.setToolTip(ui.hdmi_force_hotplug_cb.toolTip())
+        ui.hdmi_ignore_edid1_cb.setToolTip(ui.hdmi_ignore_edid_cb.toolTip())
+        ui.hdmi_drive1_cb.setToolTip(ui.hdmi_drive_cb.toolTip())
+        ui.hdmi_force_edid_audio1_cb.setToolTip(ui.hdmi_force_edid_audio_cb.toolTip())
+        self.bind_port_settings(1)
+        self.load_mode_list(1, force = True)
+
+    def build_interfaces_tab(self):
+        self.ui.setupInterfacesTab(self)
+        self.bind_interface_settings()
+
+    def build_wifi_tab(self):
+        self.ui.setupWifiTab(self)
+        self.ui.wifi_country_code_cb.setToolTip(self.ui.wifi_country_code_lb.toolTip())
+        if self.country_list is not None:
+            self.setup_wifi_country_codes()
+            self.bind_wifi_settings()
+        else:
+            # bound once the country list task delivers
+            self.ui.wifi_country_code_cb.setEnabled(False)
+
+    def build_tuning_tab(self):
+        self.ui.setupTuningTab(self)
+        self.setup_overclock_button_group()
+        self.bind_tuning_settings()
+
+    # startup tasks -------------------------------------------------
+    #
+    # the config copies, display probes and country list are mutually
+    # independent I/O, so run concurrently while the window is set up;
+    # the window waits only on what it needs to show the current state
+
+    def start_startup_tasks(self):
+        self.startup_task_relay = StartupTaskRelay(self)
+        self.startup_task_relay.task_done.connect(self.startup_task_done)
+        self.startup_tasks = StartupTasks()
+        self.startup_tasks.on_done = self.startup_task_relay.task_done.emit
+        self.startup_tasks.add("tmp_copies", self.make_tmp_copy_of_config)
+        # mode listings come from the cache if the attached displays
+        # have been seen before, otherwise all tvservice queries for
+        # both ports are started at once
+        self.display_probe = DisplayProbe(
+            self.use_fake_data,
+            cache = None if self.use_fake_data else ModeCache(paths.display_mode_cache_path()))
+        def probe_displays():
+            hit = self.display_probe.load_from_cache()
+            self.display_probe.prefetch(HDMI_PORTS)
+            return(hit)
+        self.startup_tasks.add("probe_displays", probe_displays)
+        for p in HDMI_PORTS:
+            self.startup_tasks.add(f"modes{p}", lambda hit, p=p: self.display_probe.port_modes(
+                p, HDMI_BASE_MODE_TXT), ["probe_displays"])
+        self.startup_tasks.add("countries", lambda: get_wifi_country_list(
+            paths.country_list_cache_path()))
+
+    def collect_startup_results(self):
+        self.startup_tasks.result("tmp_copies")
+        for p in HDMI_PORTS:
+            self.set_port_system_data(p, self.startup_tasks.result(f"modes{p}"), False)
+        if self.startup_tasks.result("probe_displays"):
+            # served from cache; check it's still right
+            self.refresh_display_modes()
+        else:
+            self.startup_tasks.add("save_modes",
+                                   lambda: self.display_probe.save_to_cache(HDMI_PORTS))
+
+    def refresh_display_modes(self):
+        # re-probe the displays in the background; the mode lists are
+        # reloaded if anything has changed
+        self.startup_tasks.add("refresh_modes",
+                               lambda: self.display_probe.revalidate(HDMI_PORTS))
+
+    def reload_display_modes(self):
+        for p in HDMI_PORTS:
+            # forces the list to be refetched, keeping the mode if
+            # still on offer
+            self.mode_data_ignores_edid[p] = None
+        self.flush_deferred_settings()
+        if not self.in_update:
+            self.in_update = True
+            try:
+                self.propagate_settings([port_setting("hdmi_mode", p) for p in HDMI_PORTS])
+            finally:
+                self.in_update = False
+
+    def startup_task_done(self, name, future):
+        # runs in the GUI thread; results needed before the window is
+        # shown have been collected directly already
+        if name == "refresh_modes":
+            if future.result():
+                self.reload_display_modes()
+        elif name == "countries":
+            self.country_list = future.result()
+            if "tab_2" in self.built_tabs and "wifi_regdom" not in self.gui_views:
+                self.setup_wifi_country_codes()
+                self.ui.wifi_country_code_cb.setEnabled(True)
+                self.bind_wifi_settings()
+                was_in_update = self.in_update
+                self.in_update = True
+                try:
+                    self.populate_gui_from_state(settings = ["wifi_regdom"])
+                finally:
+                    self.in_update = was_in_update
+
+    def paintEvent(self, event):
+        super(MainDialog, self).paintEvent(event)
+        if not self.first_paint_done:
+            self.first_paint_done = True
+            if self.show_startup_timing:
+                print(f"time to first paint: {time.monotonic() - self.startup_time:.3f}s "
+                      f"({len(self.built_tabs)} of {self.ui.tabWidget.count()} tabs built)")
+
     def __init__(self, allow_reboot = False, use_fake_data = False,
-                 is_autostart = False):
+                 is_autostart = False, show_startup_timing = False,
+                 build_all_tabs = False):
+        self.startup_time = time.monotonic()
+        self.show_startup_timing = show_startup_timing
         self.in_update = True
         self.allow_reboot = allow_reboot
         self.use_fake_data = use_fake_data
         self.is_autostart = is_autostart
+        if self.is_autostart and paths.autostart_has_nothing_to_do():
+            # nothing to do; decided before any copying, probing or
+            # widget construction (normally, the launcher has already
+            # exited in this case, without importing Qt at all)
+            sys.exit(0)
+        self.pending_settings = []
+        self.loaded_mode_groups = {}
+        self.mode_data_ignores_edid = {}
+        self.mode_models = {}
+        self.pushed_widget_states = {}
+        self.setting_sources = {}
+        self.gui_readers = {}
+        self.gui_views = {}
+        self.built_tabs = set()
+        self.recover_interrupted_commit()
+        self.setup_file_watch()
         self.resolve_prior_edit_without_reboot()
-        self.make_tmp_copy_of_config()
         super(MainDialog, self).__init__()
+        self.start_file_notifier()
+        self.start_startup_tasks()
         self.ui = Ui_MainDialog()
         self.ui.setupUi(self)
         self.setup_buttons()
-        self.setup_tooltips()
-        self.setup_wifi_country_codes()
-        self.get_system_data()
-        self.get_system_data1()
-        self.setup_overclock_button_group()
+        self.setup_coalescing()
+        self.collect_startup_results()
         self.in_update = False
         self.initial_update()
+        if build_all_tabs:
+            self.build_all_tabs()
+        else:
+            self.build_tab(self.ui.tabWidget.currentIndex())
+        self.ui.tabWidget.currentChanged.connect(self.build_tab)
         self.resize(0, 0) # shrink to minimum size given fonts etc.
         self.check_running_as_root()
         # save off the pre-sudo UID and GID
@@ -1125,11 +1294,6 @@ without (e.g.) a visible display.</p>
         self.original_path = os.environ["PATH"]
         self.original_display = os.environ["DISPLAY"]
         self.first_run = self.is_first_run()
-        if self.is_autostart and not self.has_pending_config_changes() and \
-           not self.break_reboot_lng_restore_just_happened() and \
-           not self.first_run:
-            # nothing to do
-            self.sys_exit(0)
         self.make_local_config_dir()
         self.show()
         if self.first_run:
@@ -1145,17 +1309,23 @@ def main():
     a_opt = QtCore.QCommandLineOption("a", "autostart run")
     r_opt = QtCore.QCommandLineOption("R", "prevent reboot")
     d_opt = QtCore.QCommandLineOption("d", "use fake data for testing")
+    t_opt = QtCore.QCommandLineOption("T", "print time to first paint")
+    l_opt = QtCore.QCommandLineOption("L", "build all tabs at startup, not on first use")
     parser.addOption(r_opt)
     parser.addOption(d_opt)
     parser.addOption(a_opt)
+    parser.addOption(t_opt)
+    parser.addOption(l_opt)
     parser.process(app)
     dialog = MainDialog(allow_reboot = not parser.isSet(r_opt),
                         use_fake_data = parser.isSet(d_opt),
-                        is_autostart = parser.isSet(a_opt))
+                        is_autostart = parser.isSet(a_opt),
+                        show_startup_timing = parser.isSet(t_opt),
+                        build_all_tabs = parser.isSet(l_opt))
     try:
         app.exec_()
     finally:
-        dialog.cleanup_tmp_copy_of_config()
+        dialog.shutdown()
 
 if __name__ == "__main__":
     main()
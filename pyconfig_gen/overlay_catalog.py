@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+#
+# A catalogue of the device tree overlays in a boot partition's overlays
+# directory: each overlay's name (its .dtbo file name) and parameters
+# (the properties of its /__overrides__ node), read by parsing the
+# flattened device tree blobs directly, with no need for dtc
+#
+# catalogues are cached on disk, per directory; a cached one is used
+# as-is while the directory's mtime is unchanged (as it is until an
+# overlay is added, removed or replaced, as package upgrades do), and
+# otherwise only the files whose mtime or size differ are re-parsed
+#
+# License: GPL v3+
+# NO WARRANTY
+
+import os, json, struct, threading
+from pathlib import Path
+from pyconfig_gen.config_utils import *
+
+FDT_MAGIC = 0xd00dfeed
+FDT_BEGIN_NODE = 1
+FDT_END_NODE = 2
+FDT_PROP = 3
+FDT_NOP = 4
+FDT_END = 9
+OVERLAY_SUFFIX = ".dtbo"
+OVERRIDES_NODE = "__overrides__"
+CATALOG_CACHE_VERSION = 1
+# overlay directories whose catalogues are cached, most recently used last
+CATALOG_CACHE_ENTRIES = 4
+
+def fdt_string(data, offset):
+    end = data.find(b"\0", offset)
+    if end < 0:
+        raise ValueError("unterminated string")
+    return(data[offset:end].decode("utf-8", "replace"))
+
+def fdt_overrides(data):
+    # the names of the properties of the root's __overrides__ node in the
+    # given blob (the overlay's parameters), in order; raises ValueError
+    # if it is not a well-formed blob
+    try:
+        (magic, totalsize, off_struct, off_strings, _, version) = struct.unpack_from(">6I", data)
+        if magic != FDT_MAGIC:
+            raise ValueError("not a flattened device tree")
+        if totalsize > len(data):
+            raise ValueError("truncated")
+        params = []
+        depth = 0
+        in_overrides = False
+        pos = off_struct
+        while True:
+            (token,) = struct.unpack_from(">I", data, pos)
+            pos += 4
+            if token == FDT_BEGIN_NODE:
+                name = fdt_string(data, pos)
+                pos += (len(name.encode("utf-8")) + 4) & ~3
+                depth += 1
+                in_overrides = depth == 2 and name == OVERRIDES_NODE
+            elif token == FDT_END_NODE:
+                depth -= 1
+                in_overrides = False
+            elif token == FDT_PROP:
+                (length, name_offset) = struct.unpack_from(">2I", data, pos)
+                pos += 8 + ((length + 3) & ~3)
+                if in_overrides:
+                    params.append(fdt_string(data, off_strings + name_offset))
+            elif token == FDT_END:
+                return(params)
+            elif token != FDT_NOP:
+                raise ValueError(f"bad token {token}")
+    except struct.error:
+        raise ValueError("truncated")
+
+def overlay_params(path):
+    # the parameters of the overlay at path, or None if it is unreadable
+    try:
+        return(fdt_overrides(Path(path).read_bytes()))
+    except (OSError, ValueError):
+        return(None)
+
+class OverlayCatalog:
+    # files: {file name: {"mtime_ns", "size", "params"}}, params being
+    # None for a file that could not be parsed
+    def __init__(self, overlays_dir, dir_mtime_ns, files):
+        self.overlays_dir = overlays_dir
+        self.dir_mtime_ns = dir_mtime_ns
+        self.files = files
+        self.overlays = {name[:-len(OVERLAY_SUFFIX)]: entry["params"]
+                         for (name, entry) in files.items()}
+
+    def has_overlay(self, name):
+        return(name in self.overlays)
+
+    def params(self, name):
+        # the overlay's parameters, or None if unknown (absent, or unparseable)
+        return(self.overlays.get(name))
+
+    def complete(self, text):
+        # completions of text, as typed after "dtoverlay=": overlay names,
+        # or (once there is a comma) that overlay's parameters
+        (name, comma, rest) = text.rpartition(",")
+        if not comma:
+            return(sorted(n for n in self.overlays if n.startswith(text)))
+        overlay = name.partition(",")[0].strip()
+        return([f"{name},{p}" for p in sorted(self.params(overlay) or [])
+                if p.startswith(rest.strip())])
+
+def scan_overlays(overlays_dir, known = {}):
+    # a fresh catalogue of overlays_dir, re-using the entries of known
+    # ({file name: entry}) for files whose mtime and size are unchanged
+    dir_mtime_ns = os.stat(overlays_dir).st_mtime_ns
+    files = {}
+    with os.scandir(overlays_dir) as it:
+        for e in it:
+            if not e.name.endswith(OVERLAY_SUFFIX) or not e.is_file():
+                continue
+            st = e.stat()
+            old = known.get(e.name)
+            if old is not None and (old["mtime_ns"], old["size"]) == (st.st_mtime_ns, st.st_size):
+                files[e.name] = old
+            else:
+                files[e.name] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size,
+                                 "params": overlay_params(e.path)}
+    return(OverlayCatalog(overlays_dir, dir_mtime_ns, files))
+
+class CatalogCache:
+    # catalogues per overlays directory, as JSON:
+    # {"version": 1, "dirs": {dir: {"mtime_ns": n, "files": {...}}}}
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path, "r") as f:
+                cached = json.load(f)
+            if cached["version"] != CATALOG_CACHE_VERSION:
+                raise ValueError("old version")
+            self.dirs = cached["dirs"]
+        except (OSError, ValueError, KeyError, TypeError):
+            # absent or unreadable: start afresh
+            self.dirs = {}
+
+    def lookup(self, overlays_dir):
+        with self.lock:
+            return(self.dirs.get(overlays_dir))
+
+    def store(self, catalog):
+        with self.lock:
+            self.dirs.pop(catalog.overlays_dir, None)
+            self.dirs[catalog.overlays_dir] = {"mtime_ns": catalog.dir_mtime_ns,
+                                               "files": catalog.files}
+            for d in list(self.dirs)[:-CATALOG_CACHE_ENTRIES]:
+                del self.dirs[d]
+            save_json_cache(self.path, {"version": CATALOG_CACHE_VERSION, "dirs": self.dirs})
+
+# catalogues already loaded in this process, by directory
+loaded_lock = threading.Lock()
+loaded = {}
+
+def load_overlay_catalog(overlays_dir, cache_path = None):
+    # the catalogue of overlays_dir (None if there is no such directory),
+    # from this process's, or the on-disk, cache, if still current
+    overlays_dir = os.path.abspath(overlays_dir)
+    try:
+        dir_mtime_ns = os.stat(overlays_dir).st_mtime_ns
+    except OSError:
+        return(None)
+    with loaded_lock:
+        catalog = loaded.get(overlays_dir)
+        if catalog is not None and catalog.dir_mtime_ns == dir_mtime_ns:
+            return(catalog)
+        cache = CatalogCache(cache_path) if cache_path is not None else None
+        entry = cache.lookup(overlays_dir) if cache is not None else None
+        if entry is not None and entry["mtime_ns"] == dir_mtime_ns:
+            catalog = OverlayCatalog(overlays_dir, dir_mtime_ns, entry["files"])
+        else:
+            try:
+                catalog = scan_overlays(overlays_dir, entry["files"] if entry else {})
+            except OSError:
+                return(None)
+            if cache is not None:
+                cache.store(catalog)
+        loaded[overlays_dir] = catalog
+        return(catalog)
+
+def config_overlays_dir(path):
+    # the overlays directory beside a config (e.g. /boot/overlays, for
+    # /boot/config.txt), or None for an in-memory or image config
+    if isinstance(path, ConfigFile):
+        return(None)
+    return(os.path.join(os.path.dirname(os.path.abspath(path)), "overlays"))
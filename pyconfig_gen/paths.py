@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+#
+# Locations of the files pyconfig_gen works on, and the checks on them
+# made at startup; kept free of Qt so they may be used (e.g. to decide
+# there is nothing to do on an autostart run) without loading the GUI;
+# the checks take an optional FileWatcher (see file_watch.py), watching
+# WATCHED_PATHNAMES, to answer from
+#
+# License: GPL v3+
+# NO WARRANTY
+
+import os
+from pathlib import Path
+from pyconfig_gen.config_utils import app_name
+from pyconfig_gen.file_watch import is_file
+
+CONFIG_PATHNAME = "/boot/config.txt"
+CONFIG_LNG_PATHNAME = "/boot/config.txt.lng"
+CONFIG_TBC_PATHNAME = "/boot/config.txt.tbc"
+CONFIG_REJ_PATHNAME = "/boot/config.txt.rej"
+CONFIG_OLD_PATHNAME = "/boot/config.txt.old"
+WIFI_REGDOM_PATHNAME = "/etc/conf.d/rpi3-wifi-regdom"
+WIFI_MODPROBE_PATHNAME = "/etc/modprobe.d/rpi3-wifi-regdom.conf"
+QUERY_SOCKET_PATHNAME = "/run/pyconfig_gen.sock"
+OVERLAYS_PATHNAME = "/boot/overlays"
+# present only while a save is being committed (see boot_commit.py)
+COMMIT_JOURNAL_PATHNAME = "/boot/config.txt.jnl"
+# the files whose changes an open MainDialog follows
+WATCHED_PATHNAMES = [CONFIG_PATHNAME, CONFIG_LNG_PATHNAME, CONFIG_TBC_PATHNAME,
+                     CONFIG_REJ_PATHNAME, WIFI_REGDOM_PATHNAME]
+
+def local_home_dir():
+    # look through sudo
+    user = os.getenv("SUDO_USER") or "root"
+    homedir = "/root" if user == "root" else f"/home/{user}"
+    return(homedir)
+
+def local_config_root_dir():
+    return(f"{local_home_dir()}/.config")
+
+def local_config_dir():
+    return(f"{local_config_root_dir()}/{app_name()}")
+
+def display_mode_cache_path():
+    return(f"{local_config_dir()}/display_modes.json")
+
+def country_list_cache_path():
+    return(f"{local_config_dir()}/countries.json")
+
+def settings_index_path():
+    return(f"{local_config_dir()}/settings_index.sqlite")
+
+def overlay_catalog_cache_path():
+    return(f"{local_config_dir()}/overlays.json")
+
+def is_first_run():
+    return(not Path(local_config_dir()).is_dir())
+
+def handled_already_sentinel():
+    return(f"/tmp/.{app_name()}_BREAK_REBOOT_NOTIFIED")
+
+def has_pending_config_changes(watcher = None):
+    return(is_file(CONFIG_TBC_PATHNAME, watcher))
+
+def has_unrebooted_config_changes(watcher = None):
+    # saved by this app, but not yet booted under
+    return(is_file(CONFIG_LNG_PATHNAME, watcher) and is_file(CONFIG_PATHNAME, watcher))
+
+def break_reboot_lng_restore_just_happened(watcher = None):
+    return(is_file(CONFIG_REJ_PATHNAME, watcher) and
+           not Path(handled_already_sentinel()).is_file())
+
+def has_interrupted_commit(watcher = None):
+    return(is_file(COMMIT_JOURNAL_PATHNAME, watcher))
+
+def autostart_has_nothing_to_do():
+    # an autostart run only needs to show the dialog after a reboot under
+    # a modified config, after a break reboot, on first use, or to finish
+    # a save interrupted (e.g. by a power cut)
+    return(not has_pending_config_changes() and
+           not has_interrupted_commit() and
+           not break_reboot_lng_restore_just_happened() and
+           not is_first_run())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+#
+# Declarative profiles: a JSON (or, with PyYAML installed, YAML) file
+# naming the settings MainDialog manages and the values they should
+# have; applying one reconciles config.txt and the regdom file against
+# it with a single parse and at most a single (atomic) write of each
+#
+# e.g.
+#   {"hdmi_group": 1, "hdmi_mode": 16, "dtoverlay_vc4": "fkms",
+#    "cma_vc4": 256, "gpu_vc4": 128, "dtparam_spi": true,
+#    "overclock_level": 1, "wifi_regdom": "GB"}
+#
+# License: GPL v3+
+# NO WARRANTY
+
+import json
+from types import SimpleNamespace
+from pyconfig_gen.config_utils import *
+from pyconfig_gen.settings import *
+from pyconfig_gen.constraints import affected_settings
+from pyconfig_gen.boot_commit import save_config_files
+
+VC4_DRIVERS = ["fkms", "kms", "none"]
+
+class ProfileError(ValueError):
+    pass
+
+# profile values -> state values, for settings stored in the state as an
+# index or otherwise not in their natural units; each raises ValueError
+# if given a bad value
+
+def decode_choice(choices):
+    def decode(v):
+        if v not in choices:
+            raise ValueError(f"expected one of {', '.join(str(c) for c in choices)}")
+        return(choices.index(v))
+    return(decode)
+
+def decode_bool(v):
+    if not isinstance(v, bool):
+        raise ValueError("expected true or false")
+    return(v)
+
+def decode_int(lo, hi):
+    def decode(v):
+        if isinstance(v, bool) or not isinstance(v, int) or not lo <= v <= hi:
+            raise ValueError(f"expected an integer in {lo}..{hi}")
+        return(v)
+    return(decode)
+
+def decode_regdom(v):
+    if not isinstance(v, str) or len(v) != 2 or not v.isalnum():
+        raise ValueError("expected a two-letter country code")
+    return(v.upper())
+
+PROFILE_DECODERS = {
+    "dtoverlay_vc4": decode_choice(VC4_DRIVERS),
+    "cma_vc4": decode_choice(CMAS),
+    "gpu_vc4": decode_choice(GPUS),
+    "overclock_level": decode_int(0, 4),
+    "wifi_regdom": decode_regdom,
+    "gpio_fan_trigger": decode_int(*GPIO_FAN_TRIGGER_RANGE),
+}
+for p in HDMI_PORTS:
+    s = port_suffix(p)
+    PROFILE_DECODERS.update({
+        f"hdmi_group{s}": decode_int(HDMI_GROUPS[0], HDMI_GROUPS[-1]),
+        f"hdmi_mode{s}": decode_int(0, 255), # checked against the group later
+        f"config_hdmi_boost{s}": decode_int(*CONFIG_HDMI_BOOST_RANGE),
+        f"hdmi_drive{s}": decode_int(HDMI_DRIVES[0], HDMI_DRIVES[-1]),
+    })
+    for d in OVERSCAN_SIDES:
+        PROFILE_DECODERS[f"overscan_{d}{s}"] = decode_int(*OVERSCAN_RANGE)
+for n in ALL_SETTINGS:
+    PROFILE_DECODERS.setdefault(n, decode_bool)
+
+# and back, for reporting
+PROFILE_CHOICES = {"dtoverlay_vc4": VC4_DRIVERS, "cma_vc4": CMAS, "gpu_vc4": GPUS}
+
+def profile_value(name, v):
+    return(PROFILE_CHOICES[name][v] if name in PROFILE_CHOICES else v)
+
+def load_profile(path):
+    # return the profile at path as a dict
+    with open(path, "r") as f:
+        text = f.read()
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ProfileError(f"{path}: reading YAML profiles needs PyYAML")
+        profile = yaml.safe_load(text)
+    else:
+        profile = json.loads(text)
+    if not isinstance(profile, dict):
+        raise ProfileError(f"{path}: expected a mapping of setting names to values")
+    return(profile)
+
+def decode_profile(profile):
+    # return the profile as state values, having checked every entry
+    errors = []
+    values = {}
+    for (n, v) in profile.items():
+        if n not in PROFILE_DECODERS:
+            errors += [f"{n}: unknown setting"]
+            continue
+        try:
+            values[n] = PROFILE_DECODERS[n](v)
+        except ValueError as e:
+            errors += [f"{n}: bad value {v!r} ({e})"]
+    if errors:
+        raise ProfileError("; ".join(errors))
+    return(values)
+
+def apply_profile(profile, config_path, regdom_path, dry_run = False):
+    # reconcile the given files with the profile; return a report of
+    # the settings and config lines changed, and whether a reboot is
+    # needed for them to take effect; either file may be given as a
+    # ConfigFile, rather than a path
+    # regdom_path may be None, for configs without one (e.g. a bare
+    # boot partition), in which case wifi_regdom may not be set
+    values = decode_profile(profile)
+    if regdom_path is None and "wifi_regdom" in values:
+        raise ProfileError("wifi_regdom: no regdom file to apply it to")
+    config = as_config_file(config_path)
+    regdom = as_config_file(regdom_path)
+    state = SimpleNamespace()
+    read_settings_from_config(state, config, regdom)
+    before = dict(vars(state))
+    for (n, v) in values.items():
+        setattr(state, n, v)
+    for p in HDMI_PORTS:
+        # as in the GUI, a new group invalidates the mode, unless given
+        s = port_suffix(p)
+        if f"hdmi_mode{s}" not in values and \
+           getattr(state, f"hdmi_group{s}") != before[f"hdmi_group{s}"]:
+            setattr(state, f"hdmi_mode{s}", 0)
+        if not is_valid_mode(getattr(state, f"hdmi_group{s}"), getattr(state, f"hdmi_mode{s}")):
+            raise ProfileError(f"hdmi_mode{s}: mode {getattr(state, f'hdmi_mode{s}')} "
+                               f"does not exist in hdmi_group {getattr(state, f'hdmi_group{s}')}")
+    changed = [n for n in ALL_SETTINGS if getattr(state, n) != before[n]]
+    old_lines = active_config_lines(config)
+    apply_settings_to_config(state, affected_settings(changed), config, regdom)
+    new_lines = active_config_lines(config)
+    report = {
+        "changed_settings": [{"setting": n, "old": profile_value(n, before[n]),
+                              "new": profile_value(n, getattr(state, n))}
+                             for n in changed],
+        "removed_lines": [f"{k}@{f}={v}" for (k, f, v) in old_lines if (k, f, v) not in new_lines],
+        "added_lines": [f"{k}@{f}={v}" for (k, f, v) in new_lines if (k, f, v) not in old_lines],
+        "regdom_changed": regdom.is_modified(),
+        # the firmware reads config.txt (and the wifi driver its
+        # regulatory domain) only at boot
+        "reboot_needed": old_lines != new_lines or regdom.is_modified(),
+        "written": [],
+    }
+    if not dry_run:
+        # config.txt last, so the regdom file is in place before it is
+        report["written"] = save_config_files([regdom, config])
+    return(report)
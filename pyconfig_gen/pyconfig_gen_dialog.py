@@ -5,6 +5,12 @@
 # Created by: PyQt5 UI code generator 5.13.1
 #
 # WARNING! All changes made in this file will be lost!
+#
+# NB: split by hand into setupUi (window frame and empty tab pages) plus
+# one setup*Tab / retranslate*Tab pair per page, so that pages may be
+# built on first activation (the cross-page tab order link from
+# hdmi_force_edid_audio_cb to spi_cb is dropped); redo this split if
+# regenerating.
 
 
 from PyQt5 import QtCore, QtGui, QtWidgets
@@ -42,6 +48,39 @@ class Ui_MainDialog(object):
         self.tabWidget.setObjectName("tabWidget")
         self.display_tab = QtWidgets.QWidget()
         self.display_tab.setObjectName("display_tab")
+        self.tabWidget.addTab(self.display_tab, "")
+        self.second_display_tab = QtWidgets.QWidget()
+        self.second_display_tab.setObjectName("second_display_tab")
+        self.tabWidget.addTab(self.second_display_tab, "")
+        self.wifi_tab = QtWidgets.QWidget()
+        self.wifi_tab.setObjectName("wifi_tab")
+        self.tabWidget.addTab(self.wifi_tab, "")
+        self.tab_2 = QtWidgets.QWidget()
+        self.tab_2.setObjectName("tab_2")
+        self.tabWidget.addTab(self.tab_2, "")
+        self.tab = QtWidgets.QWidget()
+        self.tab.setObjectName("tab")
+        self.tabWidget.addTab(self.tab, "")
+        self.gridLayout.addWidget(self.tabWidget, 1, 0, 1, 1)
+        self.horizontalLayout_7 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_7.setContentsMargins(-1, 5, -1, -1)
+        self.horizontalLayout_7.setObjectName("horizontalLayout_7")
+        self.layout_editor_pb = QtWidgets.QPushButton(MainDialog)
+        self.layout_editor_pb.setObjectName("layout_editor_pb")
+        self.horizontalLayout_7.addWidget(self.layout_editor_pb)
+        spacerItem12 = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.horizontalLayout_7.addItem(spacerItem12)
+        self.gridLayout.addLayout(self.horizontalLayout_7, 3, 0, 1, 1)
+
+        self.retranslateUi(MainDialog)
+        self.tabWidget.setCurrentIndex(0)
+        self.main_bb.accepted.connect(MainDialog.accept)
+        self.main_bb.rejected.connect(MainDialog.reject)
+        self.main_bb.clicked['QAbstractButton*'].connect(MainDialog.button_bar_button_clicked)
+        self.layout_editor_pb.clicked['bool'].connect(MainDialog.layout_editor_button_clicked)
+        QtCore.QMetaObject.connectSlotsByName(MainDialog)
+
+    def setupDisplayTab(self, MainDialog):
         self.verticalLayout_4 = QtWidgets.QVBoxLayout(self.display_tab)
         self.verticalLayout_4.setObjectName("verticalLayout_4")
         self.graphics_driver_gb = QtWidgets.QHBoxLayout()
@@ -236,9 +275,43 @@ class Ui_MainDialog(object):
         self.verticalLayout_4.addWidget(self.pi4_display_gb)
         spacerItem4 = QtWidgets.QSpacerItem(20, 5, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Expanding)
         self.verticalLayout_4.addItem(spacerItem4)
-        self.tabWidget.addTab(self.display_tab, "")
-        self.second_display_tab = QtWidgets.QWidget()
-        self.second_display_tab.setObjectName("second_display_tab")
+
+        self.retranslateDisplayTab(MainDialog)
+        self.hdmi_force_edid_audio_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
+        self.overscan_top_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
+        self.graphics_driver_cb.currentIndexChanged['int'].connect(MainDialog.gui_value_changed)
+        self.hdmi_group_cb.currentIndexChanged['int'].connect(MainDialog.hdmi_group_changed)
+        self.cma_cb.currentIndexChanged['int'].connect(MainDialog.gui_value_changed)
+        self.safe_mode_rb.clicked.connect(MainDialog.gui_changed)
+        self.normal_mode_rb.clicked.connect(MainDialog.gui_changed)
+        self.hdmi_mode_cb.currentIndexChanged['int'].connect(MainDialog.gui_value_changed)
+        self.overscan_gb.toggled['bool'].connect(MainDialog.gui_bool_changed)
+        self.overscan_right_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
+        self.overscan_left_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
+        self.config_hdmi_boost_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
+        self.hdmi_ignore_edid_cb.stateChanged['int'].connect(MainDialog.hdmi_ignore_edid_changed)
+        self.hdmi_force_hotplug_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
+        self.overscan_bottom_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
+        self.hdmi_drive_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
+        self.gpu_cb.currentIndexChanged['int'].connect(MainDialog.gui_value_changed)
+        self.pi4_4kp60_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
+        MainDialog.setTabOrder(self.graphics_driver_cb, self.cma_cb)
+        MainDialog.setTabOrder(self.cma_cb, self.normal_mode_rb)
+        MainDialog.setTabOrder(self.normal_mode_rb, self.safe_mode_rb)
+        MainDialog.setTabOrder(self.safe_mode_rb, self.hdmi_group_cb)
+        MainDialog.setTabOrder(self.hdmi_group_cb, self.hdmi_mode_cb)
+        MainDialog.setTabOrder(self.hdmi_mode_cb, self.hdmi_force_hotplug_cb)
+        MainDialog.setTabOrder(self.hdmi_force_hotplug_cb, self.hdmi_ignore_edid_cb)
+        MainDialog.setTabOrder(self.hdmi_ignore_edid_cb, self.config_hdmi_boost_sb)
+        MainDialog.setTabOrder(self.config_hdmi_boost_sb, self.overscan_gb)
+        MainDialog.setTabOrder(self.overscan_gb, self.overscan_left_sb)
+        MainDialog.setTabOrder(self.overscan_left_sb, self.overscan_right_sb)
+        MainDialog.setTabOrder(self.overscan_right_sb, self.overscan_top_sb)
+        MainDialog.setTabOrder(self.overscan_top_sb, self.overscan_bottom_sb)
+        MainDialog.setTabOrder(self.overscan_bottom_sb, self.hdmi_drive_cb)
+        MainDialog.setTabOrder(self.hdmi_drive_cb, self.hdmi_force_edid_audio_cb)
+
+    def setupSecondDisplayTab(self, MainDialog):
         self.verticalLayout_7 = QtWidgets.QVBoxLayout(self.second_display_tab)
         self.verticalLayout_7.setObjectName("verticalLayout_7")
         self.hdmi1_gb = QtWidgets.QGroupBox(self.second_display_tab)
@@ -363,9 +436,24 @@ class Ui_MainDialog(object):
         self.verticalLayout_7.addWidget(self.hdmi1_gb)
         spacerItem8 = QtWidgets.QSpacerItem(20, 40, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Expanding)
         self.verticalLayout_7.addItem(spacerItem8)
-        self.tabWidget.addTab(self.second_display_tab, "")
-        self.wifi_tab = QtWidgets.QWidget()
-        self.wifi_tab.setObjectName("wifi_tab")
+
+        self.retranslateSecondDisplayTab(MainDialog)
+        self.normal_mode1_rb.clicked.connect(MainDialog.gui_changed)
+        self.safe_mode1_rb.clicked['bool'].connect(MainDialog.gui_changed)
+        self.hdmi_group1_cb.currentIndexChanged['int'].connect(MainDialog.hdmi_group1_changed)
+        self.hdmi_mode1_cb.currentIndexChanged['int'].connect(MainDialog.gui_value_changed)
+        self.hdmi_force_hotplug1_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
+        self.hdmi_ignore_edid1_cb.stateChanged['int'].connect(MainDialog.hdmi_ignore_edid1_changed)
+        self.config_hdmi_boost1_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
+        self.overscan1_gb.toggled['bool'].connect(MainDialog.gui_bool_changed)
+        self.overscan_left1_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
+        self.overscan_right1_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
+        self.overscan_top1_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
+        self.overscan_bottom1_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
+        self.hdmi_drive1_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
+        self.hdmi_force_edid_audio1_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
+
+    def setupInterfacesTab(self, MainDialog):
         self.verticalLayout_5 = QtWidgets.QVBoxLayout(self.wifi_tab)
         self.verticalLayout_5.setObjectName("verticalLayout_5")
         self.main_interfaces_gb = QtWidgets.QGroupBox(self.wifi_tab)
@@ -398,9 +486,20 @@ class Ui_MainDialog(object):
         self.verticalLayout_5.addWidget(self.main_interfaces_gb)
         spacerItem9 = QtWidgets.QSpacerItem(20, 40, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Expanding)
         self.verticalLayout_5.addItem(spacerItem9)
-        self.tabWidget.addTab(self.wifi_tab, "")
-        self.tab_2 = QtWidgets.QWidget()
-        self.tab_2.setObjectName("tab_2")
+
+        self.retranslateInterfacesTab(MainDialog)
+        self.spi_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
+        self.i2c_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
+        self.bluetooth_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
+        self.i2s_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
+        self.audio_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
+        self.camera_cb.stateChanged['int'].connect(MainDialog.camera_cb_value_changed)
+        MainDialog.setTabOrder(self.spi_cb, self.i2c_cb)
+        MainDialog.setTabOrder(self.i2c_cb, self.i2s_cb)
+        MainDialog.setTabOrder(self.i2s_cb, self.bluetooth_cb)
+        MainDialog.setTabOrder(self.bluetooth_cb, self.audio_cb)
+
+    def setupWifiTab(self, MainDialog):
         self.verticalLayout_12 = QtWidgets.QVBoxLayout(self.tab_2)
         self.verticalLayout_12.setObjectName("verticalLayout_12")
         self.wifi_setup_gb = QtWidgets.QGroupBox(self.tab_2)
@@ -432,9 +531,11 @@ class Ui_MainDialog(object):
         self.verticalLayout_12.addWidget(self.wifi_setup_gb)
         spacerItem10 = QtWidgets.QSpacerItem(20, 40, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Expanding)
         self.verticalLayout_12.addItem(spacerItem10)
-        self.tabWidget.addTab(self.tab_2, "")
-        self.tab = QtWidgets.QWidget()
-        self.tab.setObjectName("tab")
+
+        self.retranslateWifiTab(MainDialog)
+        self.wifi_country_code_cb.currentIndexChanged['int'].connect(MainDialog.gui_value_changed)
+
+    def setupTuningTab(self, MainDialog):
         self.verticalLayout_10 = QtWidgets.QVBoxLayout(self.tab)
         self.verticalLayout_10.setObjectName("verticalLayout_10")
         self.overclocking_gb = QtWidgets.QGroupBox(self.tab)
@@ -501,90 +602,24 @@ class Ui_MainDialog(object):
         self.verticalLayout_10.addWidget(self.pimoroni_gb)
         spacerItem11 = QtWidgets.QSpacerItem(20, 40, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Expanding)
         self.verticalLayout_10.addItem(spacerItem11)
-        self.tabWidget.addTab(self.tab, "")
-        self.gridLayout.addWidget(self.tabWidget, 1, 0, 1, 1)
-        self.horizontalLayout_7 = QtWidgets.QHBoxLayout()
-        self.horizontalLayout_7.setContentsMargins(-1, 5, -1, -1)
-        self.horizontalLayout_7.setObjectName("horizontalLayout_7")
-        self.layout_editor_pb = QtWidgets.QPushButton(MainDialog)
-        self.layout_editor_pb.setObjectName("layout_editor_pb")
-        self.horizontalLayout_7.addWidget(self.layout_editor_pb)
-        spacerItem12 = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
-        self.horizontalLayout_7.addItem(spacerItem12)
-        self.gridLayout.addLayout(self.horizontalLayout_7, 3, 0, 1, 1)
 
-        self.retranslateUi(MainDialog)
-        self.tabWidget.setCurrentIndex(0)
-        self.main_bb.accepted.connect(MainDialog.accept)
-        self.main_bb.rejected.connect(MainDialog.reject)
-        self.main_bb.clicked['QAbstractButton*'].connect(MainDialog.button_bar_button_clicked)
-        self.hdmi_force_edid_audio_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
-        self.overscan_top_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
-        self.graphics_driver_cb.currentIndexChanged['int'].connect(MainDialog.gui_value_changed)
-        self.hdmi_group_cb.currentIndexChanged['int'].connect(MainDialog.hdmi_group_changed)
-        self.cma_cb.currentIndexChanged['int'].connect(MainDialog.gui_value_changed)
-        self.safe_mode_rb.clicked.connect(MainDialog.gui_changed)
-        self.normal_mode_rb.clicked.connect(MainDialog.gui_changed)
-        self.hdmi_mode_cb.currentIndexChanged['int'].connect(MainDialog.gui_value_changed)
-        self.overscan_gb.toggled['bool'].connect(MainDialog.gui_bool_changed)
-        self.overscan_right_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
-        self.overscan_left_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
-        self.config_hdmi_boost_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
-        self.hdmi_ignore_edid_cb.stateChanged['int'].connect(MainDialog.hdmi_ignore_edid_changed)
-        self.hdmi_force_hotplug_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
-        self.overscan_bottom_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
-        self.hdmi_drive_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
-        self.spi_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
-        self.i2c_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
-        self.bluetooth_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
-        self.i2s_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
-        self.audio_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
-        self.gpu_cb.currentIndexChanged['int'].connect(MainDialog.gui_value_changed)
-        self.camera_cb.stateChanged['int'].connect(MainDialog.camera_cb_value_changed)
-        self.normal_mode1_rb.clicked.connect(MainDialog.gui_changed)
-        self.safe_mode1_rb.clicked['bool'].connect(MainDialog.gui_changed)
-        self.hdmi_group1_cb.currentIndexChanged['int'].connect(MainDialog.hdmi_group1_changed)
-        self.hdmi_mode1_cb.currentIndexChanged['int'].connect(MainDialog.gui_value_changed)
-        self.hdmi_force_hotplug1_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
-        self.hdmi_ignore_edid1_cb.stateChanged['int'].connect(MainDialog.hdmi_ignore_edid1_changed)
-        self.config_hdmi_boost1_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
-        self.overscan1_gb.toggled['bool'].connect(MainDialog.gui_bool_changed)
-        self.overscan_left1_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
-        self.overscan_right1_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
-        self.overscan_top1_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
-        self.overscan_bottom1_sb.valueChanged['int'].connect(MainDialog.gui_value_changed)
-        self.hdmi_drive1_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
-        self.hdmi_force_edid_audio1_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
-        self.layout_editor_pb.clicked['bool'].connect(MainDialog.layout_editor_button_clicked)
-        self.wifi_country_code_cb.currentIndexChanged['int'].connect(MainDialog.gui_value_changed)
+        self.retranslateTuningTab(MainDialog)
         self.pimoroni_gb.toggled['bool'].connect(MainDialog.gui_bool_changed)
         self.fan_temps_hs.valueChanged['int'].connect(MainDialog.gui_value_changed)
-        self.pi4_4kp60_cb.stateChanged['int'].connect(MainDialog.gui_value_changed)
-        QtCore.QMetaObject.connectSlotsByName(MainDialog)
-        MainDialog.setTabOrder(self.graphics_driver_cb, self.cma_cb)
-        MainDialog.setTabOrder(self.cma_cb, self.normal_mode_rb)
-        MainDialog.setTabOrder(self.normal_mode_rb, self.safe_mode_rb)
-        MainDialog.setTabOrder(self.safe_mode_rb, self.hdmi_group_cb)
-        MainDialog.setTabOrder(self.hdmi_group_cb, self.hdmi_mode_cb)
-        MainDialog.setTabOrder(self.hdmi_mode_cb, self.hdmi_force_hotplug_cb)
-        MainDialog.setTabOrder(self.hdmi_force_hotplug_cb, self.hdmi_ignore_edid_cb)
-        MainDialog.setTabOrder(self.hdmi_ignore_edid_cb, self.config_hdmi_boost_sb)
-        MainDialog.setTabOrder(self.config_hdmi_boost_sb, self.overscan_gb)
-        MainDialog.setTabOrder(self.overscan_gb, self.overscan_left_sb)
-        MainDialog.setTabOrder(self.overscan_left_sb, self.overscan_right_sb)
-        MainDialog.setTabOrder(self.overscan_right_sb, self.overscan_top_sb)
-        MainDialog.setTabOrder(self.overscan_top_sb, self.overscan_bottom_sb)
-        MainDialog.setTabOrder(self.overscan_bottom_sb, self.hdmi_drive_cb)
-        MainDialog.setTabOrder(self.hdmi_drive_cb, self.hdmi_force_edid_audio_cb)
-        MainDialog.setTabOrder(self.hdmi_force_edid_audio_cb, self.spi_cb)
-        MainDialog.setTabOrder(self.spi_cb, self.i2c_cb)
-        MainDialog.setTabOrder(self.i2c_cb, self.i2s_cb)
-        MainDialog.setTabOrder(self.i2s_cb, self.bluetooth_cb)
-        MainDialog.setTabOrder(self.bluetooth_cb, self.audio_cb)
 
     def retranslateUi(self, MainDialog):
         _translate = QtCore.QCoreApplication.translate
         MainDialog.setWindowTitle(_translate("MainDialog", "RPi Configuration"))
+        self.tabWidget.setTabText(self.tabWidget.indexOf(self.display_tab), _translate("MainDialog", "Display"))
+        self.tabWidget.setTabText(self.tabWidget.indexOf(self.second_display_tab), _translate("MainDialog", "Second Display"))
+        self.tabWidget.setTabText(self.tabWidget.indexOf(self.wifi_tab), _translate("MainDialog", "Interfaces"))
+        self.tabWidget.setTabText(self.tabWidget.indexOf(self.tab_2), _translate("MainDialog", "WiFi"))
+        self.tabWidget.setTabText(self.tabWidget.indexOf(self.tab), _translate("MainDialog", "Pi4 Tuning"))
+        self.layout_editor_pb.setToolTip(_translate("MainDialog", "<html><head/><body><p><span style=\" font-weight:600;\">Launch Screen Layout Editor</span></p><p>This button starts the <span style=\" font-weight:600;\">arandr</span> program, which you can use to specify how your (possibly dual-monitor) display is laid out (horizontally stacked, vertically stacked, rotated <span style=\" font-style:italic;\">etc</span>.).</p><p>You can <span style=\" font-weight:600;\">save</span> your changes within the arandr program to a script file. If you do so to the location <span style=\" font-style:italic;\">~/.screenlayout/default.sh</span>, they will automatically be applied for you each login.</p><p>The arandr program can also be started via the menu (it lives at <span style=\" font-family:\'monospace\';\">Applications</span> → <span style=\" font-family:\'monospace\';\">Settings</span> → <span style=\" font-family:\'monospace\';\">ARandR</span>).</p></body></html>"))
+        self.layout_editor_pb.setText(_translate("MainDialog", "Launch Screen Layout Editor"))
+
+    def retranslateDisplayTab(self, MainDialog):
+        _translate = QtCore.QCoreApplication.translate
         self.graphics_driver_lb.setToolTip(_translate("MainDialog", "<html><head/><body><p><span style=\" font-weight:600;\">Graphics driver</span></p><p>Choose which display driver you\'d like from this dropdown. The three options are:</p><ol style=\"margin-top: 0px; margin-bottom: 0px; margin-left: 0px; margin-right: 0px; -qt-list-indent: 1;\"><li style=\" margin-top:12px; margin-bottom:0px; margin-left:0px; margin-right:0px; -qt-block-indent:0; text-indent:0px;\"><span style=\" font-weight:600;\">fkms-v3d</span>: an accelerated, GL-based graphics driver, using DispmanX for composition (\'fake\' KMS); recommended for most users (required for audio out on the Pi-Top), and the shipped default on the image;</li><li style=\" margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px; -qt-block-indent:0; text-indent:0px;\"><span style=\" font-weight:600;\">kms-v3d</span>: as above, but using the kernel KMS driver for composition (\'full\' KMS); may be used by non-Pi-Top users (if display manager compositing is turned off); and</li><li style=\" margin-top:0px; margin-bottom:12px; margin-left:0px; margin-right:0px; -qt-block-indent:0; text-indent:0px;\"><span style=\" font-weight:600;\">framebuffer</span>: fallback, unaccelerated graphics driver.</li></ol><p>Please note that currently, MMAL and OpenMAX IL access to the GPU is <span style=\" font-style:italic;\">unavailable</span> when booted into a 64-bit userspace (this issue is common to all 64-bit distros for the RPi3/4, not just Gentoo). </p><p>However, as of kernels &gt;= 4.19, camera and video codec access <span style=\" font-style:italic;\">are</span> available in 64-bit mode, via v4l2.</p></body></html>"))
         self.graphics_driver_lb.setText(_translate("MainDialog", "Graphics driver:"))
         self.graphics_driver_cb.setItemText(0, _translate("MainDialog", "fkms-v3d"))
@@ -648,7 +683,9 @@ class Ui_MainDialog(object):
         self.pi4_display_gb.setTitle(_translate("MainDialog", "Pi4 display settings"))
         self.pi4_4kp60_cb.setToolTip(_translate("MainDialog", "<html><head/><body><p><span style=\" font-weight:600;\">Enable 4Kp60 output on HDMI0</span></p><p>By default, when connected to a 4K monitor, the RPi4B will select a 30Hz refresh rate. Check this box to enable use of a 60Hz refresh rate on HDMI0.</p><p>Note that this will increase both the power consumption and running temperature of the RPi4. It is not possible to output 4Kp60 on both HDMI ports simultaneously.</p><p>This option has no effect on an RPi3.</p></body></html>"))
         self.pi4_4kp60_cb.setText(_translate("MainDialog", "Enable 4Kp60 output on HDMI0"))
-        self.tabWidget.setTabText(self.tabWidget.indexOf(self.display_tab), _translate("MainDialog", "Display"))
+
+    def retranslateSecondDisplayTab(self, MainDialog):
+        _translate = QtCore.QCoreApplication.translate
         self.hdmi1_gb.setToolTip(_translate("MainDialog", "<html><head/><body><p><span style=\" font-weight:600;\">RPi4 only (HDMI1 port)</span></p><p>These settings affect the <span style=\" font-style:italic;\">second</span> HDMI port - this connector is only present on the RPi4, and is the one <span style=\" font-style:italic;\">further</span> from the USB-C power connector (the other being HDMI0, the default).</p><p>They have no effect on an RPi3, nor on an RPi4 which has no display connected to the HDMI1 port.</p></body></html>"))
         self.hdmi1_gb.setTitle(_translate("MainDialog", "RPi4 only (HDMI1 port)"))
         self.normal_mode1_rb.setText(_translate("MainDialog", "Normal mode"))
@@ -675,7 +712,9 @@ class Ui_MainDialog(object):
         self.further_settings2_gb.setTitle(_translate("MainDialog", "Further settings"))
         self.hdmi_drive1_cb.setText(_translate("MainDialog", "Force audio output in DMT modes"))
         self.hdmi_force_edid_audio1_cb.setText(_translate("MainDialog", "Assume display supports audio (partial EDID override)"))
-        self.tabWidget.setTabText(self.tabWidget.indexOf(self.second_display_tab), _translate("MainDialog", "Second Display"))
+
+    def retranslateInterfacesTab(self, MainDialog):
+        _translate = QtCore.QCoreApplication.translate
         self.main_interfaces_gb.setTitle(_translate("MainDialog", "Main interfaces"))
         self.spi_cb.setToolTip(_translate("MainDialog", "<html><head/><body><p><span style=\" font-weight:600;\">Enable SPI</span></p><p>When checked, the RPi\'s SPI (Serial Peripheral Interface) will be enabled.</p></body></html>"))
         self.spi_cb.setText(_translate("MainDialog", "Enable SPI"))
@@ -689,11 +728,15 @@ class Ui_MainDialog(object):
         self.audio_cb.setText(_translate("MainDialog", "Enable audio"))
         self.camera_cb.setToolTip(_translate("MainDialog", "<html><head/><body><p><span style=\" font-weight:600;\">Enable camera</span></p><p>When checked, the RPi\'s onboard camera interface will be enabled. Requires kernel &gt;=4.19 to operate.</p><p>You must allocate at least 128 MiB of GPU memory when using the camera.</p></body></html>"))
         self.camera_cb.setText(_translate("MainDialog", "Enable camera"))
-        self.tabWidget.setTabText(self.tabWidget.indexOf(self.wifi_tab), _translate("MainDialog", "Interfaces"))
+
+    def retranslateWifiTab(self, MainDialog):
+        _translate = QtCore.QCoreApplication.translate
         self.wifi_setup_gb.setTitle(_translate("MainDialog", "WiFi settings"))
         self.wifi_country_code_lb.setToolTip(_translate("MainDialog", "<html><head/><body><p><span style=\" font-weight:600;\">Regulatory domain</span></p><p>Using this dropdown, you can select the appropriate WiFi regulatory domain.</p><p>This enables the use of WiFi channels (frequencies) and power levels appropriate to your country.</p></body></html>"))
         self.wifi_country_code_lb.setText(_translate("MainDialog", "Regulatory domain:"))
-        self.tabWidget.setTabText(self.tabWidget.indexOf(self.tab_2), _translate("MainDialog", "WiFi"))
+
+    def retranslateTuningTab(self, MainDialog):
+        _translate = QtCore.QCoreApplication.translate
         self.overclocking_gb.setToolTip(_translate("MainDialog", "<html><head/><body><p><span style=\" font-weight:600;\">Overclocking</span></p><p>It is possible to <span style=\" font-style:italic;\">overclock</span> the Pi4 without voiding your warranty. On the image as shipped, no overclocking is set, but you can use these radio buttons to select a more aggressive profile. Overclocking generally means that applications will run more quickly (although this will vary from case to case). The settings below have no effect on a Pi3.</p><p>There is a risk that your system will fail to boot, or exhibit instability once booted, at the faster profiles - if so, just comment out the arm<span style=\" font-style:italic;\">_freq</span> and <span style=\" font-style:italic;\">gpu_freq</span> settings in <span style=\" font-style:italic;\">/boot/config.txt</span>, and try again.</p><p>Most Pi4s should boot fine with the &quot;Mild&quot; or &quot;Mid&quot; overclocking settings. Your system will use more power, and run hotter with overclocking in use, so an official power supply, and possibly some active cooling, may be necessary to fully exploit the increased performance (since the system will automatically \'throttle\' to prevent damage should the temperature get too high).</p><p>For avoidance of doubt, none of the below settings set<span style=\" font-style:italic;\"> force_turbo=1</span>, nor do they set an <span style=\" font-style:italic;\">over_voltage&gt;6</span> (&gt; +0.15V), so per current RPF advice should not affect your warranty.</p><p><span style=\" font-weight:600;\">NB: </span><span style=\" font-style:italic;\">the above notwithstanding, use settings higher than &quot;None&quot; at your own risk!</span></p></body></html>"))
         self.overclocking_gb.setTitle(_translate("MainDialog", "Overclocking"))
         self.overclock0_rb.setText(_translate("MainDialog", "None (1500MHz CPU, 500MHz GPU, +0.00V)"))
@@ -705,7 +748,4 @@ class Ui_MainDialog(object):
         self.pimoroni_gb.setTitle(_translate("MainDialog", "Pimoroni Fan SHIM"))
         self.start_fan_lb.setText(_translate("MainDialog", "Start fan at:"))
         self.fan_temps_lb.setText(_translate("MainDialog", "65°C (off at 55°C)"))
-        self.tabWidget.setTabText(self.tabWidget.indexOf(self.tab), _translate("MainDialog", "Pi4 Tuning"))
-        self.layout_editor_pb.setToolTip(_translate("MainDialog", "<html><head/><body><p><span style=\" font-weight:600;\">Launch Screen Layout Editor</span></p><p>This button starts the <span style=\" font-weight:600;\">arandr</span> program, which you can use to specify how your (possibly dual-monitor) display is laid out (horizontally stacked, vertically stacked, rotated <span style=\" font-style:italic;\">etc</span>.).</p><p>You can <span style=\" font-weight:600;\">save</span> your changes within the arandr program to a script file. If you do so to the location <span style=\" font-style:italic;\">~/.screenlayout/default.sh</span>, they will automatically be applied for you each login.</p><p>The arandr program can also be started via the menu (it lives at <span style=\" font-family:\'monospace\';\">Applications</span> → <span style=\" font-family:\'monospace\';\">Settings</span> → <span style=\" font-family:\'monospace\';\">ARandR</span>).</p></body></html>"))
-        self.layout_editor_pb.setText(_translate("MainDialog", "Launch Screen Layout Editor"))
 from pyconfig_gen import pyconfig_gen_rc
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+#
+# An optional long-running service answering queries on config.txt and
+# the regdom file over a Unix domain socket, for monitoring agents that
+# poll them often; both files are kept parsed in memory (with anything
+# derived from them computed once per version), and re-read only when
+# inotify reports a change to them (see file_watch.py), so each query
+# costs a non-blocking read() or two and a lookup
+#
+# the protocol is JSON, one object per line, each way; a connection may
+# carry any number of requests:
+#
+#   {"op": "get", "keys": ["gpu_mem", "arm_freq@pi4"]}
+#       -> {"ok": true, "values": {"gpu_mem": "128", "arm_freq@pi4": null}}
+#   {"op": "settings", "names": ["overclock_level"]}   (all, if no names)
+#       -> {"ok": true, "settings": {"overclock_level": 1}}
+#   {"op": "diff", "other": "/boot/config.txt.lng"}
+#       -> {"ok": true, "differ": true, "added": [...], "removed": [...]}
+#       (other may only be the .lng, .tbc or .rej variant of the config)
+#   {"op": "validate"}
+#       -> {"ok": true, "valid": false, "problems": [...]}
+#   {"op": "ping"}
+#       -> {"ok": true}
+#
+# failures are {"ok": false, "error": "..."}
+#
+# License: GPL v3+
+# NO WARRANTY
+
+import os, re, sys, json, signal, socket, socketserver
+from types import SimpleNamespace
+from pyconfig_gen.config_utils import *
+from pyconfig_gen.settings import *
+from pyconfig_gen.profile import profile_value
+from pyconfig_gen.fleet import config_problems
+from pyconfig_gen.paths import QUERY_SOCKET_PATHNAME
+from pyconfig_gen.file_watch import shared_cached_config_file, memoized
+
+# the longest request line accepted
+MAX_REQUEST_SIZE = 65536
+# what a key to get may look like (as "arm_freq@pi4", "hdmi_mode:1" or
+# "dtparam=spi"); keys are used as (part of) regular expressions, so
+# nothing else is let through
+GET_KEY = re.compile(r"[\w.:@=,-]+")
+# distinct keys whose values are kept, per version of the config
+MAX_MEMOIZED_GETS = 256
+# the variants of the config a diff may be against; the daemon (run as
+# root) opens no file a client names, other than these
+DIFF_SUFFIXES = [".lng", ".tbc", ".rej"]
+
+class QueryHandler:
+    # answers requests against the given config and regdom files
+    def __init__(self, config_path, regdom_path):
+        self.config = shared_cached_config_file(config_path)
+        self.regdom = shared_cached_config_file(regdom_path)
+        self.diff_paths = [os.path.abspath(f"{config_path}{s}") for s in DIFF_SUFFIXES]
+
+    def state(self):
+        # the settings, as the GUI would read them
+        (config, memo, _) = self.config.current()
+        (regdom, _, regdom_version) = self.regdom.current()
+        def read():
+            state = SimpleNamespace()
+            read_settings_from_config(state, config, regdom)
+            return(state)
+        # depends on both files' versions
+        return(memoized(memo, ("state", regdom_version), read))
+
+    def op_ping(self, request):
+        return({})
+
+    def op_get(self, request):
+        (config, memo, _) = self.config.current()
+        keys = request.get("keys", [])
+        if not isinstance(keys, list) or not all(isinstance(k, str) for k in keys):
+            raise ValueError("keys: expected a list of strings")
+        bad = [k for k in keys if not GET_KEY.fullmatch(k)]
+        if bad:
+            raise ValueError(f"bad key(s): {', '.join(map(repr, bad))}")
+        gets = memo.setdefault("gets", {})
+        values = {}
+        for k in keys:
+            if k in gets:
+                values[k] = gets[k]
+            else:
+                values[k] = get_config_var(k, config, None, False)
+                if len(gets) < MAX_MEMOIZED_GETS:
+                    gets[k] = values[k]
+        return({"values": values})
+
+    def op_settings(self, request):
+        state = self.state()
+        names = request.get("names") or ALL_SETTINGS
+        if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+            raise ValueError("names: expected a list of strings")
+        unknown = [n for n in names if n not in ALL_SETTINGS]
+        if unknown:
+            raise ValueError(f"unknown setting(s): {', '.join(map(str, unknown))}")
+        return({"settings": {n: profile_value(n, getattr(state, n)) for n in names}})
+
+    def op_diff(self, request):
+        other_path = request.get("other")
+        if not isinstance(other_path, str):
+            raise ValueError("other: expected a path")
+        if os.path.abspath(other_path) not in self.diff_paths:
+            raise ValueError(f"other: expected one of {', '.join(self.diff_paths)}")
+        other = shared_cached_config_file(os.path.abspath(other_path))
+        (config, memo, _) = self.config.current()
+        (other_config, other_memo, _) = other.current()
+        lines = memoized(memo, "lines", lambda: set(
+            f"{k}@{f}={v}" for (k, f, v) in active_config_lines(config)))
+        other_lines = memoized(other_memo, "lines", lambda: set(
+            f"{k}@{f}={v}" for (k, f, v) in active_config_lines(other_config)))
+        (added, removed) = (sorted(lines - other_lines), sorted(other_lines - lines))
+        return({"differ": bool(added or removed), "added": added, "removed": removed})
+
+    def op_validate(self, request):
+        (config, memo, _) = self.config.current()
+        (_, _, regdom_version) = self.regdom.current()
+        state = self.state()
+        problems = memoized(memo, ("problems", regdom_version),
+                            lambda: config_problems(state, config))
+        return({"valid": not problems, "problems": problems})
+
+    def handle(self, request):
+        # the response to a request (a decoded JSON object)
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("expected a JSON object")
+            fn = getattr(self, f"op_{request.get('op')}", None)
+            if fn is None:
+                raise ValueError(f"unknown op {request.get('op')!r}")
+            response = fn(request)
+        except (OSError, ValueError, TypeError, re.error) as e:
+            return({"ok": False, "error": str(e)})
+        return(dict(ok = True, **response))
+
+class QueryStreamHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in iter(lambda: self.rfile.readline(MAX_REQUEST_SIZE), b""):
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"ok": False, "error": f"bad request: {e}"}
+            else:
+                response = self.server.query_handler.handle(request)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+class QueryServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, query_handler):
+        if os.path.exists(socket_path):
+            # left behind by an unclean exit, unless another server has it
+            if daemon_request({"op": "ping"}, socket_path, timeout = 1.0) is not None:
+                raise OSError(f"{socket_path}: already being served")
+            os.remove(socket_path)
+        self.query_handler = query_handler
+        super().__init__(socket_path, QueryStreamHandler)
+        # only config.txt (and its variants) and the regdom file can be
+        # read through it, and those are world-readable anyway
+        os.chmod(socket_path, 0o666)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+def serve(socket_path, config_path, regdom_path):
+    # run until interrupted (or terminated), removing the socket on exit
+    server = QueryServer(socket_path, QueryHandler(config_path, regdom_path))
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def daemon_request(request, socket_path = QUERY_SOCKET_PATHNAME, timeout = 5.0):
+    # a one-shot client: the response to request, or None if there is no
+    # server listening
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.settimeout(timeout)
+            s.connect(socket_path)
+            s.sendall(json.dumps(request).encode() + b"\n")
+            with s.makefile("rb") as f:
+                return(json.loads(f.readline()))
+    except (ConnectionRefusedError, FileNotFoundError):
+        return(None)
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+#
+# Per-setting config.txt writers (and the reader inverting them); the
+# dependencies between settings, which decide the writers a change to
+# one need run, are in constraints.py
+#
+# License: GPL v3+
+# NO WARRANTY
+
+import re
+from pyconfig_gen.config_utils import *
+from pyconfig_gen.directives import directives_of, save_directives
+
+CMAS = [256, 192, 128, 96, 64, 0]
+GPUS = [256, 192, 128, 96, 64, 32, 16, 0]
+OVERSCAN_SIDES = ["left", "right", "top", "bottom"]
+# (arm_freq, gpu_freq, over_voltage) for overclock levels 0..3 (RPi4);
+# level 4 means "custom", i.e. leave whatever is in the config alone
+OVERCLOCK_LEVELS = [(1500, 500, 0), (1750, 500, 2), (1750, 600, 4), (2000, 600, 6)]
+HDMI_PORTS = [0, 1]
+# the cfg80211 module option setting the regulatory domain, wherever it
+# appears in a line (e.g. among other options)
+MODPROBE_REGDOM = re.compile("ieee80211_regdom=.*$")
+# the vc4 driver overlays, by dtoverlay_vc4 (2 meaning neither)
+VC4_OVERLAYS = ["vc4-fkms-v3d", "vc4-kms-v3d"]
+# the Pimoroni fan shim, as a gpio-fan overlay on this pin
+FAN_SHIM_GPIO_PIN = "18"
+# ranges of values taken, shared by the reader, profiles and validation
+HDMI_GROUPS = [0, 1, 2]
+HDMI_DRIVES = [1, 2]
+CONFIG_HDMI_BOOST_RANGE = (0, 11)
+OVERSCAN_RANGE = (-100, 100)
+GPIO_FAN_TRIGGER_RANGE = (45000, 75000)
+
+def port_suffix(port):
+    # state attributes for the second HDMI port are suffixed with "1"
+    return("" if port == 0 else str(port))
+
+def port_key(key, port):
+    # config keys for the second HDMI port only apply on the RPi4
+    return(key if port == 0 else f"{key}:{port}@pi4")
+
+def port_setting(name, port):
+    return(f"{name}{port_suffix(port)}")
+
+# writers -----------------------------------------------------------
+#
+# each writer brings the config line(s) owned by one setting into line
+# with the current state; state is any object carrying the setting
+# attributes (MainDialog, in the GUI)
+
+def vc4_overlays(model):
+    return(model.overlays_matching(lambda name: name.startswith("vc4-")))
+
+def cma_params(overlay):
+    return([p for p in overlay.param_owner if p.startswith("cma-")])
+
+def write_vc4(state, path, regdom_path):
+    # driver and CMA size share a single dtoverlay line; any other
+    # parameters on it are kept, and any further vc4 lines commented out
+    model = directives_of(path)
+    overlays = vc4_overlays(model)
+    if state.dtoverlay_vc4 == 2:
+        model.disable_all(overlays)
+    else:
+        cma = f"cma-{CMAS[state.cma_vc4]}" if state.cma_vc4 < 5 else None
+        if not overlays:
+            model.add_overlay(VC4_OVERLAYS[state.dtoverlay_vc4], {cma: None} if cma else {})
+        else:
+            o = overlays[0]
+            model.rename(o, VC4_OVERLAYS[state.dtoverlay_vc4])
+            for p in cma_params(o):
+                if p != cma:
+                    model.remove_param(o, p)
+            if cma:
+                model.set_param(o, cma)
+            model.disable_all(overlays[1:])
+    save_directives(path, model)
+
+def write_gpu_mem(state, path, regdom_path):
+    set_or_comment_config_var("gpu_mem", GPUS[state.gpu_vc4], 0, path)
+
+def make_port_writers(port):
+    s = port_suffix(port)
+
+    def safe(state):
+        return(getattr(state, f"hdmi_safe{s}"))
+
+    def write_hdmi_safe(state, path, regdom_path):
+        if safe(state):
+            set_config_var(port_key("hdmi_safe", port), 1, path)
+        else:
+            comment_config_var(port_key("hdmi_safe", port), path)
+
+    def int_writer(name, key, default):
+        # commented out in safe mode, otherwise set unless default
+        def write(state, path, regdom_path):
+            if safe(state):
+                comment_config_var(port_key(key, port), path)
+            else:
+                set_or_comment_config_var(port_key(key, port),
+                                          getattr(state, f"{name}{s}"),
+                                          default, path)
+        return(write)
+
+    def flag_writer(name, key):
+        def write(state, path, regdom_path):
+            if safe(state):
+                comment_config_var(port_key(key, port), path)
+            else:
+                set_or_comment_config_var(port_key(key, port),
+                                          1 if getattr(state, f"{name}{s}") else 0,
+                                          0, path)
+        return(write)
+
+    def write_hdmi_ignore_edid(state, path, regdom_path):
+        if safe(state):
+            comment_config_var(port_key("hdmi_ignore_edid", port), path)
+        else:
+            set_or_comment_config_var(port_key("hdmi_ignore_edid", port),
+                                      "0xa5000080" if getattr(state, f"hdmi_ignore_edid{s}") else None,
+                                      None, path)
+
+    def overscan_writer(side):
+        def write(state, path, regdom_path):
+            key = port_key(f"overscan_{side}", port)
+            if safe(state) or getattr(state, f"disable_overscan{s}"):
+                comment_config_var(key, path)
+            else:
+                set_or_comment_config_var(key, getattr(state, f"overscan_{side}{s}"),
+                                          0, path)
+        return(write)
+
+    def unsafe_writer(name, key, value_fn):
+        # left untouched in safe mode
+        def write(state, path, regdom_path):
+            if not safe(state):
+                set_or_comment_config_var(port_key(key, port),
+                                          value_fn(getattr(state, f"{name}{s}")),
+                                          0, path)
+        return(write)
+
+    writers = {
+        "hdmi_safe": write_hdmi_safe,
+        "hdmi_group": int_writer("hdmi_group", "hdmi_group", 0),
+        "hdmi_mode": int_writer("hdmi_mode", "hdmi_mode", 0),
+        "hdmi_force_hotplug": flag_writer("hdmi_force_hotplug", "hdmi_force_hotplug"),
+        "hdmi_ignore_edid": write_hdmi_ignore_edid,
+        "config_hdmi_boost": int_writer("config_hdmi_boost", "config_hdmi_boost", 5),
+        "disable_overscan": flag_writer("disable_overscan", "disable_overscan"),
+        "hdmi_force_edid_audio": unsafe_writer("hdmi_force_edid_audio",
+                                               "hdmi_force_edid_audio",
+                                               lambda v: 1 if v else 0),
+        "hdmi_drive": unsafe_writer("hdmi_drive", "hdmi_drive", lambda v: v),
+    }
+    for d in OVERSCAN_SIDES:
+        writers[f"overscan_{d}"] = overscan_writer(d)
+    return({f"{k}{s}": w for (k, w) in writers.items()})
+
+def dtparam_writer(name, param):
+    # a parameter of the base device tree
+    def write(state, path, regdom_path):
+        model = directives_of(path)
+        if getattr(state, name):
+            model.set_base_param(param, "on")
+        else:
+            model.remove_base_param(param)
+        save_directives(path, model)
+    return(write)
+
+def write_disable_bt(state, path, regdom_path):
+    model = directives_of(path)
+    overlays = model.overlays_matching(lambda name: name == "pi3-disable-bt")
+    if state.dtoverlay_disable_bt and not overlays:
+        model.add_overlay("pi3-disable-bt")
+    elif not state.dtoverlay_disable_bt:
+        model.disable_all(overlays)
+    save_directives(path, model)
+
+def write_camera(state, path, regdom_path):
+    set_or_comment_config_var("start_x", 1 if state.dtparam_camera else 0, 0, path)
+
+def write_overclock(state, path, regdom_path):
+    if state.overclock_level < 4:
+        (arm_freq, gpu_freq, over_voltage) = OVERCLOCK_LEVELS[state.overclock_level]
+        set_or_comment_config_var("force_turbo", 0, 0, path)
+        set_or_comment_config_var("force_turbo@pi4", 0, 0, path)
+        set_or_comment_config_var("arm_freq@pi4", arm_freq, 1500, path)
+        set_or_comment_config_var("gpu_freq@pi4", gpu_freq, 500, path)
+        set_or_comment_config_var("over_voltage@pi4", over_voltage, 0, path)
+
+def write_wifi_regdom(state, path, regdom_path):
+    set_config_var("WIFI_REGDOM", '"' + state.wifi_regdom + '"',
+                   regdom_path, True, False)
+
+def write_modprobe_regdom(regdom, path):
+    # the wifi module's own option (in a modprobe.d file) follows the
+    # regdom file: every ieee80211_regdom= is set, to the end of its line
+    # (as by sed 's#ieee80211_regdom=.*$#...#g'); none is added
+    lines = config_lines(path)
+    new_lines = [MODPROBE_REGDOM.sub(lambda m: f'ieee80211_regdom="{regdom}"', l) for l in lines]
+    if new_lines != lines:
+        store_config_lines(path, new_lines)
+
+def fan_shim_overlays(model):
+    # the gpio-fan overlays driving the fan shim's pin
+    return([o for o in model.overlays_matching(lambda name: name == "gpio-fan", "pi4")
+            if model.param(o, "gpiopin") == FAN_SHIM_GPIO_PIN])
+
+def write_gpio_fan(state, path, regdom_path):
+    # enablement and trigger temperature share a single dtoverlay line
+    # (any further such lines being commented out)
+    model = directives_of(path)
+    fans = fan_shim_overlays(model)
+    if state.dtoverlay_gpio_fan:
+        if not fans:
+            model.add_overlay("gpio-fan", {"gpiopin": FAN_SHIM_GPIO_PIN,
+                                           "temp": str(state.gpio_fan_trigger)}, "pi4")
+        else:
+            model.set_param(fans[0], "temp", str(state.gpio_fan_trigger))
+            model.disable_all(fans[1:])
+    else:
+        model.disable_all(fans)
+    save_directives(path, model)
+
+def write_4kp60(state, path, regdom_path):
+    set_or_comment_config_var("hdmi_enable_4kp60@pi4",
+                              1 if state.hdmi_4kp60 else 0, 0, path)
+
+CONFIG_WRITERS = {
+    "dtoverlay_vc4": write_vc4,
+    "cma_vc4": write_vc4,
+    "gpu_vc4": write_gpu_mem,
+    "dtparam_spi": dtparam_writer("dtparam_spi", "spi"),
+    "dtparam_i2c": dtparam_writer("dtparam_i2c", "i2c_arm"),
+    "dtparam_i2s": dtparam_writer("dtparam_i2s", "i2s"),
+    "dtparam_audio": dtparam_writer("dtparam_audio", "audio"),
+    "dtoverlay_disable_bt": write_disable_bt,
+    "dtparam_camera": write_camera,
+    "overclock_level": write_overclock,
+    "wifi_regdom": write_wifi_regdom,
+    "dtoverlay_gpio_fan": write_gpio_fan,
+    "gpio_fan_trigger": write_gpio_fan,
+    "hdmi_4kp60": write_4kp60,
+}
+for p in HDMI_PORTS:
+    CONFIG_WRITERS.update(make_port_writers(p))
+
+# reader ------------------------------------------------------------
+
+def read_settings_from_config(state, path, regdom_path):
+    # the inverse of the writers: set every setting on state from the
+    # config (and regdom) file, falling back to defaults where unset or
+    # out of range
+    model = directives_of(path)
+    v = get_config_var("hdmi_safe", path, 0)
+    state.hdmi_safe = (v == 1)
+    v = get_config_var("hdmi_safe:1@pi4", path, 0)
+    state.hdmi_safe1 = (v == 1)
+    v = get_config_var("hdmi_group", path, 0)
+    # assume default if undefined
+    state.hdmi_group = v if v in HDMI_GROUPS else 0
+    v = get_config_var("hdmi_group:1@pi4", path, 0)
+    # assume default if undefined
+    state.hdmi_group1 = v if v in HDMI_GROUPS else 0
+    v = get_config_var("hdmi_mode", path, 0)
+    # assume default if undefined
+    state.hdmi_mode = v if is_valid_mode(state.hdmi_group, v) else 0
+    v = get_config_var("hdmi_mode:1@pi4", path, 0)
+    # assume default if undefined
+    state.hdmi_mode1 = v if is_valid_mode(state.hdmi_group1, v) else 0
+    overlays = vc4_overlays(model)
+    state.dtoverlay_vc4 = 2
+    state.cma_vc4 = CMAS.index(0)
+    if overlays:
+        if overlays[0].name in VC4_OVERLAYS:
+            state.dtoverlay_vc4 = VC4_OVERLAYS.index(overlays[0].name)
+        cma = cma_params(overlays[0])
+        try:
+            state.cma_vc4 = CMAS.index(int(cma[0][4:]))
+        except (ValueError, IndexError):
+            pass
+    v = get_config_var("gpu_mem", path, 9999)
+    try:
+        state.gpu_vc4 = GPUS.index(v)
+    except (ValueError, TypeError):
+        state.gpu_vc4 = GPUS.index(0)
+    v = get_config_var("hdmi_force_hotplug", path, 0)
+    state.hdmi_force_hotplug = v == 1
+    v = get_config_var("hdmi_force_hotplug:1@pi4", path, 0)
+    state.hdmi_force_hotplug1 = v == 1
+    v = get_config_var("hdmi_ignore_edid", path, None, False)
+    state.hdmi_ignore_edid = v is not None and v.lower() == "0xa5000080"
+    v = get_config_var("hdmi_ignore_edid:1@pi4", path, None, False)
+    state.hdmi_ignore_edid1 = v is not None and v.lower() == "0xa5000080"
+    v = get_config_var("config_hdmi_boost", path, 5)
+    state.config_hdmi_boost = v
+    v = get_config_var("config_hdmi_boost:1@pi4", path, 5)
+    state.config_hdmi_boost1 = v
+    v = get_config_var("disable_overscan", path, 0)
+    state.disable_overscan = v == 1
+    v = get_config_var("disable_overscan:1@pi4", path, 0)
+    state.disable_overscan1 = v == 1
+    v = get_config_var("overscan_left", path, 0)
+    state.overscan_left = v
+    v = get_config_var("overscan_right", path, 0)
+    state.overscan_right = v
+    v = get_config_var("overscan_top", path, 0)
+    state.overscan_top = v
+    v = get_config_var("overscan_bottom", path, 0)
+    state.overscan_bottom = v
+    v = get_config_var("overscan_left:1@pi4", path, 0)
+    state.overscan_left1 = v
+    v = get_config_var("overscan_right:1@pi4", path, 0)
+    state.overscan_right1 = v
+    v = get_config_var("overscan_top:1@pi4", path, 0)
+    state.overscan_top1 = v
+    v = get_config_var("overscan_bottom:1@pi4", path, 0)
+    state.overscan_bottom1 = v
+    v = get_config_var("hdmi_force_edid_audio", path, 0)
+    state.hdmi_force_edid_audio = v == 1
+    v = get_config_var("hdmi_force_edid_audio:1@pi4", path, 0)
+    state.hdmi_force_edid_audio1 = v == 1
+    v = get_config_var("hdmi_drive", path, 1)
+    state.hdmi_drive = v
+    v = get_config_var("hdmi_drive:1@pi4", path, 1)
+    state.hdmi_drive1 = v
+    v = model.base_param("spi")
+    state.dtparam_spi = True if v and "on" in v else False
+    v = model.base_param("i2c_arm")
+    state.dtparam_i2c = True if v and "on" in v else False
+    v = model.base_param("i2s")
+    state.dtparam_i2s = True if v and "on" in v else False
+    v = model.base_param("audio")
+    state.dtparam_audio = True if v and "on" in v else False
+    state.dtoverlay_disable_bt = model.overlay("pi3-disable-bt") is not None
+    v = get_config_var("start_x", path, 0)
+    state.dtparam_camera = v == 1
+
+    force_turbo = max(get_config_var("force_turbo", path, 0),
+                      get_config_var("force_turbo@pi4", path, 0))
+    arm_freq = get_config_var("arm_freq@pi4", path, 1500)
+    gpu_freq = get_config_var("gpu_freq@pi4", path, 500)
+    over_voltage = get_config_var("over_voltage@pi4", path, 0)
+    # infer the overclock level
+    state.overclock_level = 4
+    if force_turbo == 0:
+        if arm_freq == 1500 and gpu_freq == 500 and over_voltage == 0:
+            state.overclock_level = 0
+        elif arm_freq == 1750 and gpu_freq == 500 and over_voltage == 2:
+            state.overclock_level = 1
+        elif arm_freq == 1750 and gpu_freq == 600 and over_voltage == 4:
+            state.overclock_level = 2
+        elif arm_freq == 2000 and gpu_freq == 600 and over_voltage == 6:
+            state.overclock_level = 3
+
+    # WiFi status
+    # world, if unset
+    v = get_config_var("WIFI_REGDOM", regdom_path, "00", False)
+    v = v.replace('"', '')
+    v = v.replace("'", "")
+    state.wifi_regdom = v
+
+    # Pimoroni fan shim
+    fans = fan_shim_overlays(model)
+    state.dtoverlay_gpio_fan = bool(fans)
+    try:
+        state.gpio_fan_trigger = int(model.param(fans[0], "temp"))
+    except (IndexError, TypeError, ValueError):
+        state.gpio_fan_trigger = 65000
+    # force sane defaults
+    (lo, hi) = GPIO_FAN_TRIGGER_RANGE
+    if state.gpio_fan_trigger < lo or state.gpio_fan_trigger > hi:
+        state.gpio_fan_trigger = 65000
+
+    # Pi-4 specific display settings
+    v = get_config_var("hdmi_enable_4kp60@pi4", path, 0)
+    state.hdmi_4kp60 = (v == 1)
+
+ALL_SETTINGS = list(CONFIG_WRITERS.keys())
+
+# settings edited via sliders or spinboxes, which emit a burst of
+# changes while dragged or held
+CONTINUOUS_SETTINGS = ["gpio_fan_trigger"] + [
+    f"{n}{port_suffix(p)}" for p in HDMI_PORTS
+    for n in ["config_hdmi_boost"] + [f"overscan_{d}" for d in OVERSCAN_SIDES]]
+
+def apply_settings_to_config(state, names, path, regdom_path):
+    # run the writers for the named settings; settings sharing a
+    # config line share a writer, which need only run once
+    done = set()
+    for n in names:
+        w = CONFIG_WRITERS[n]
+        if w not in done:
+            w(state, path, regdom_path)
+            done.add(w)
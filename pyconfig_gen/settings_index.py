@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+#
+# A SQLite index of the active settings of many config.txt files (in
+# boot directories or disk images, as for fleet.py), normalized as by
+# active_config_lines into (key, filter, value) rows, so that questions
+# across a fleet are answered by a query, not by re-parsing every file
+#
+# re-indexing skips files whose size and mtime are unchanged, and then
+# those whose content hash is; targets that have gone from under an
+# indexed root are dropped
+#
+# License: GPL v3+
+# NO WARRANTY
+
+import os, time, sqlite3, hashlib
+from pyconfig_gen.config_utils import *
+from pyconfig_gen.fleet import find_targets, open_target, pool_map, finish_stats, \
+    CONFIG_FILENAME
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    target TEXT UNIQUE NOT NULL,
+    content_hash TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    filter TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS settings_by_kfv ON settings (key, filter, value);
+CREATE INDEX IF NOT EXISTS settings_by_file ON settings (file_id);
+"""
+
+def open_index(db_path):
+    db = sqlite3.connect(db_path)
+    db.execute("PRAGMA foreign_keys = ON")
+    version = db.execute("PRAGMA user_version").fetchone()[0]
+    if version not in (0, SCHEMA_VERSION):
+        db.close()
+        raise ValueError(f"{db_path}: unknown index version {version}")
+    db.executescript(SCHEMA)
+    db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return(db)
+
+def target_stat(target):
+    # (mtime_ns, size) of the file that holds a target's config
+    path = os.path.join(target, CONFIG_FILENAME) if os.path.isdir(target) else target
+    st = os.stat(path)
+    return((st.st_mtime_ns, st.st_size))
+
+def index_target(job):
+    # worker process entry point: the target's settings, unless unchanged
+    # from what is already known of it; never raises
+    (target, known) = job
+    result = {"target": target, "status": "unchanged"}
+    try:
+        stat = target_stat(target)
+        result["stat"] = stat
+        if known is not None and tuple(known[0:2]) == stat:
+            return(result)
+        (config, regdom) = open_target(target, None)
+        h = hashlib.sha256("".join(config.lines).encode("utf-8", "surrogateescape")).hexdigest()
+        if known is None or known[2] != h:
+            result.update({"status": "indexed", "hash": h,
+                           "lines": active_config_lines(config)})
+    except (OSError, ValueError) as e:
+        result.update({"status": "failed", "error": str(e)})
+    return(result)
+
+def under_root(target, roots):
+    return(any(target == r or target.startswith(r.rstrip("/") + "/") for r in roots))
+
+def index_roots(db_path, roots, parallel = None, on_result = None):
+    # bring the index at db_path up to date with the targets under roots;
+    # returns summary stats
+    roots = [os.path.abspath(r) for r in roots]
+    stats = {"targets": 0, "indexed": 0, "unchanged": 0, "failed": 0, "removed": 0}
+    start = time.monotonic()
+    db = open_index(db_path)
+    try:
+        known = {t: (m, s, h) for (t, m, s, h) in
+                 db.execute("SELECT target, mtime_ns, size, content_hash FROM files")}
+        seen = set()
+        jobs = ((t, known.get(t)) for r in roots for t in find_targets(r))
+        with db:
+            for r in pool_map(index_target, jobs, parallel):
+                t = r["target"]
+                seen.add(t)
+                stats["targets"] += 1
+                stats[r["status"]] += 1
+                if r["status"] == "indexed":
+                    db.execute("DELETE FROM files WHERE target = ?", (t, ))
+                    file_id = db.execute(
+                        "INSERT INTO files (target, content_hash, mtime_ns, size) "
+                        "VALUES (?, ?, ?, ?)", (t, r["hash"]) + r["stat"]).lastrowid
+                    db.executemany("INSERT INTO settings VALUES (?, ?, ?, ?)",
+                                   ((file_id, ) + l for l in r["lines"]))
+                elif r["status"] == "unchanged" and known[t][0:2] != r["stat"]:
+                    # touched, but not changed
+                    db.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE target = ?",
+                               r["stat"] + (t, ))
+                if on_result is not None:
+                    on_result(r)
+            gone = [t for t in known if t not in seen and under_root(t, roots)]
+            db.executemany("DELETE FROM files WHERE target = ?", ((t, ) for t in gone))
+            stats["removed"] = len(gone)
+    finally:
+        db.close()
+    return(finish_stats(stats, start))
+
+def parse_query_term(term):
+    # a query term is a config line, "key[@filter][=value]", whose
+    # (filter and) value may contain glob wildcards; with no value, any
+    # will do; as for lines, the key runs up to the last "="
+    (key, eq, value) = term.rpartition("=") if "=" in term else (term, "", "*")
+    (key, filt) = parse_key(key)
+    return((key, filt, value))
+
+def query_index(db_path, terms, group_by = None):
+    # the targets having settings matching every term, in order, with
+    # (if group_by, a key[@filter], is given) their value of group_by
+    # (or None) as (target, value) pairs
+    if not os.path.isfile(db_path):
+        raise FileNotFoundError(f"{db_path}: no such index")
+    db = open_index(db_path)
+    try:
+        sql = "SELECT f.target"
+        args = []
+        if group_by is not None:
+            sql += (", (SELECT value FROM settings s WHERE s.file_id = f.id "
+                    "AND s.key = ? AND s.filter = ? LIMIT 1)")
+            args += list(parse_key(group_by))
+        sql += " FROM files f"
+        for (i, t) in enumerate(terms):
+            sql += (" WHERE" if i == 0 else " AND") + \
+                   (" EXISTS (SELECT 1 FROM settings s WHERE s.file_id = f.id "
+                    "AND s.key GLOB ? AND s.filter GLOB ? AND s.value GLOB ?)")
+            args += list(parse_query_term(t))
+        sql += " ORDER BY f.target"
+        return([(r[0], r[1] if group_by is not None else None)
+                for r in db.execute(sql, args)])
+    finally:
+        db.close()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+#
+# A small graph of independent startup jobs (config copies, display
+# probes, country list parsing, ...) run concurrently on a thread pool,
+# so that startup takes about as long as the slowest job, rather than
+# the sum of them all; kept free of Qt, results are handed back via a
+# callback (which the GUI relays to its own thread)
+#
+# License: GPL v3+
+# NO WARRANTY
+
+from concurrent.futures import ThreadPoolExecutor
+
+class StartupTasks:
+    def __init__(self, max_workers = None):
+        self.executor = ThreadPoolExecutor(max_workers = max_workers,
+                                           thread_name_prefix = "startup")
+        self.futures = {}
+        self.on_done = None
+
+    def add(self, name, fn, deps = []):
+        # fn is passed the results of deps, in order; these must have
+        # been added already, so (as the pool's queue is FIFO) a task
+        # only ever waits on tasks which were started before it
+        for d in deps:
+            if d not in self.futures:
+                raise ValueError(f"startup task {name} depends on unknown task {d}")
+        def run():
+            return(fn(*[self.futures[d].result() for d in deps]))
+        f = self.executor.submit(run)
+        self.futures[name] = f
+        f.add_done_callback(lambda f: self.task_done(name, f))
+        return(f)
+
+    def task_done(self, name, future):
+        # called from a worker thread (or the adding thread, if the
+        # task has already finished); on_done gets the future, so any
+        # exception is raised where its result is used
+        if self.on_done is not None:
+            self.on_done(name, future)
+
+    def result(self, name):
+        # block until the named task has finished
+        return(self.futures[name].result())
+
+    def shutdown(self, wait = True):
+        self.executor.shutdown(wait = wait)
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+#
+# Rule-based checking of config.txt: rules on the value of a single key
+# (ranges, enumerations), optionally only within given board sections,
+# and rules across keys (e.g. the camera needs 128 MiB of GPU memory);
+# they are compiled into an index by key, so a config is checked in a
+# single pass over its active lines, at the cost of a lookup per line
+# plus the rules of the keys actually present
+#
+# cross-key rules are checked per board section in which any of their
+# keys is set, a key set in [all] applying to every board (as for the
+# firmware); where a key is set more than once in a section, the first
+# value counts (as for get_config_var), and the rest are flagged
+#
+# given a catalogue of the overlays installed (see overlay_catalog.py),
+# the overlays loaded, and the parameters given them, are also checked
+# against it, as a bad reference is otherwise only found on booting
+#
+# used by the GUI (before saving), the CLI (validate) and fleet audits
+#
+# License: GPL v3+
+# NO WARRANTY
+
+from collections import namedtuple
+from pyconfig_gen.config_utils import *
+from pyconfig_gen.settings import *
+from pyconfig_gen.directives import directives_of
+
+ERROR = "error"
+WARNING = "warning"
+
+# boards with a single HDMI port, and no 4Kp60 support
+SINGLE_PORT_BOARDS = ["pi0", "pi0w", "pi02", "pi1", "pi2", "pi3", "pi3+"]
+# keys which may legitimately appear many times in a section
+REPEATABLE_KEYS = ["dtoverlay", "dtparam", "gpio", "include"]
+# as the firmware assumes, if unset
+DEFAULT_GPU_MEM = 64
+CAMERA_GPU_MEM = 128
+
+Problem = namedtuple("Problem", ["severity", "key", "filter", "value", "message"])
+# a check on one key's value, in the given sections (or all, if None)
+ValueRule = namedtuple("ValueRule", ["severity", "filters", "check"])
+# a check on the values of several keys, given a function fetching them
+CrossRule = namedtuple("CrossRule", ["severity", "keys", "check"])
+
+def problem_text(p):
+    key = p.key if p.filter == "all" else f"{p.key}@{p.filter}"
+    setting = key if p.value is None else f"{key}={p.value}"
+    return(f"{p.severity}: {setting}: {p.message}")
+
+def int_or(v, default):
+    try:
+        return(int(v))
+    except (TypeError, ValueError):
+        return(default)
+
+# value checks; each returns a message, or None if the value is fine
+
+def in_range(lo, hi):
+    def check(v):
+        try:
+            n = int(v)
+        except ValueError:
+            return(f"expected an integer in {lo}..{hi}")
+        if not lo <= n <= hi:
+            return(f"out of range {lo}..{hi}")
+    return(check)
+
+def one_of(choices, what = None):
+    texts = [str(c) for c in choices]
+    def check(v):
+        if v not in texts:
+            return(what or f"expected one of {', '.join(texts)}")
+    return(check)
+
+def board_only(boards_text):
+    def check(v):
+        return(f"has no effect, except on the {boards_text}")
+    return(check)
+
+def check_gpu_mem_offered(v):
+    if int_or(v, None) not in GPUS:
+        return("not one of the sizes offered by the GUI (shown there as 0)")
+
+def check_vc4_cma(v):
+    # only the CMA size the GUI sets is checked: other drivers (e.g.
+    # vc4-kms-v3d-pi4) and parameters are left to the overlay catalogue
+    (name, _, rest) = v.partition(",")
+    if not name.strip().startswith("vc4-"):
+        return(None)
+    params = [p.strip() for p in rest.split(",")]
+    odd = [p for p in params if p.startswith("cma-") and p not in (f"cma-{c}" for c in CMAS if c)]
+    if odd:
+        return(f"{', '.join(odd)}: not a CMA size offered by the GUI")
+
+def check_dtparam_switch(v):
+    if v not in ("on", "off"):
+        return("expected on or off")
+
+VALUE_RULES = {
+    "gpu_mem": [ValueRule(ERROR, None, in_range(16, 1024)),
+                ValueRule(WARNING, None, check_gpu_mem_offered)],
+    "start_x": [ValueRule(ERROR, None, one_of([0, 1]))],
+    "force_turbo": [ValueRule(ERROR, None, one_of([0, 1]))],
+    "arm_freq": [ValueRule(ERROR, ["pi4"], in_range(600, 2147))],
+    "gpu_freq": [ValueRule(ERROR, ["pi4"], in_range(250, 750))],
+    "over_voltage": [ValueRule(ERROR, None, in_range(-16, 8))],
+    "hdmi_enable_4kp60": [ValueRule(ERROR, None, one_of([0, 1])),
+                          ValueRule(WARNING, SINGLE_PORT_BOARDS, board_only("RPi4"))],
+    "dtoverlay": [ValueRule(WARNING, None, check_vc4_cma)],
+    "dtoverlay=gpio-fan,gpiopin=18,temp": [
+        ValueRule(ERROR, None, in_range(*GPIO_FAN_TRIGGER_RANGE))],
+}
+for k in ["spi", "i2c_arm", "i2s", "audio"]:
+    VALUE_RULES[f"dtparam={k}"] = [ValueRule(ERROR, None, check_dtparam_switch)]
+
+def port_config_key(key, port):
+    return(key if port == 0 else f"{key}:{port}")
+
+def port_value_rules(port):
+    rules = {
+        "hdmi_safe": one_of([0, 1]),
+        "hdmi_group": one_of(HDMI_GROUPS),
+        "hdmi_mode": in_range(0, 255),
+        "hdmi_force_hotplug": one_of([0, 1]),
+        "hdmi_ignore_edid": one_of(["0xa5000080"], "only 0xa5000080 has any effect"),
+        "config_hdmi_boost": in_range(*CONFIG_HDMI_BOOST_RANGE),
+        "disable_overscan": one_of([0, 1]),
+        "hdmi_force_edid_audio": one_of([0, 1]),
+        "hdmi_drive": one_of(HDMI_DRIVES),
+    }
+    for d in OVERSCAN_SIDES:
+        rules[f"overscan_{d}"] = in_range(*OVERSCAN_RANGE)
+    out = {}
+    for (key, check) in rules.items():
+        out[port_config_key(key, port)] = [ValueRule(ERROR, None, check)]
+        if port != 0:
+            out[port_config_key(key, port)].append(
+                ValueRule(WARNING, SINGLE_PORT_BOARDS, board_only("RPi4 (the only model with two HDMI ports)")))
+    return(out)
+
+for p in HDMI_PORTS:
+    VALUE_RULES.update(port_value_rules(p))
+
+# cross-key checks, each given get(key), the value of key in the section
+# being checked (or None)
+
+def check_camera_gpu_mem(get):
+    if get("start_x") == "1" and int_or(get("gpu_mem"), DEFAULT_GPU_MEM) < CAMERA_GPU_MEM:
+        return(f"the camera needs gpu_mem of at least {CAMERA_GPU_MEM}")
+
+def check_over_voltage(get):
+    if int_or(get("over_voltage"), 0) > 6 and get("force_turbo") != "1":
+        return("over_voltage above 6 is ignored unless force_turbo=1")
+
+def port_cross_rules(port):
+    (safe_key, group_key, mode_key, disable_key) = (
+        port_config_key(k, port) for k in ["hdmi_safe", "hdmi_group", "hdmi_mode", "disable_overscan"])
+    overscan_keys = [port_config_key(f"overscan_{d}", port) for d in OVERSCAN_SIDES]
+
+    def check_mode_has_group(get):
+        if int_or(get(mode_key), 0) != 0 and int_or(get(group_key), 0) not in (1, 2):
+            return(f"ignored, unless {group_key} is 1 or 2")
+
+    def check_mode_in_group(get):
+        (mode, group) = (int_or(get(mode_key), 0), int_or(get(group_key), 0))
+        if group in (1, 2) and not is_valid_mode(group, mode):
+            return(f"no such mode in {group_key} {group}")
+
+    def check_safe_overrides(get):
+        if get(safe_key) == "1" and (get(group_key) is not None or get(mode_key) is not None):
+            return(f"overrides {group_key} and {mode_key}")
+
+    def check_overscan_disabled(get):
+        if get(disable_key) == "1" and any(get(k) is not None for k in overscan_keys):
+            return("overscan_* settings are then ignored")
+
+    return([CrossRule(WARNING, [mode_key, group_key], check_mode_has_group),
+            CrossRule(ERROR, [mode_key, group_key], check_mode_in_group),
+            CrossRule(WARNING, [safe_key, group_key, mode_key], check_safe_overrides),
+            CrossRule(WARNING, [disable_key] + overscan_keys, check_overscan_disabled)])
+
+CROSS_RULES = [
+    CrossRule(ERROR, ["start_x", "gpu_mem"], check_camera_gpu_mem),
+    CrossRule(WARNING, ["over_voltage", "force_turbo"], check_over_voltage),
+]
+for p in HDMI_PORTS:
+    CROSS_RULES += port_cross_rules(p)
+
+# the compiled index -------------------------------------------------
+
+class KeyRules:
+    def __init__(self):
+        self.value_rules = []
+        self.cross_rules = []
+
+def compile_rules(value_rules, cross_rules):
+    # {key: KeyRules} for every key any rule looks at; cross rules are
+    # given as their index in cross_rules, so they run in a fixed order
+    index = {}
+    for (key, rules) in value_rules.items():
+        index.setdefault(key, KeyRules()).value_rules += rules
+    for (i, rule) in enumerate(cross_rules):
+        for key in rule.keys:
+            index.setdefault(key, KeyRules()).cross_rules.append(i)
+    return(index)
+
+RULE_INDEX = compile_rules(VALUE_RULES, CROSS_RULES)
+
+def validate_lines(lines, index = RULE_INDEX, cross_rules = CROSS_RULES):
+    # the problems with the given active (key, filter, value) lines, as
+    # returned by active_config_lines
+    problems = []
+    sections = {}
+    triggered = set()
+    for (key, filt, value) in lines:
+        rules = index.get(key)
+        if rules is None:
+            continue
+        value = value.strip()
+        section = sections.setdefault(filt, {})
+        # repeatable directives' keys include their parameter or overlay
+        # (e.g. "dtparam=spi"); the directive is the part before the "="
+        if key.partition("=")[0] not in REPEATABLE_KEYS:
+            if key in section:
+                # the firmware takes the last value, and so is it here
+                problems.append(Problem(WARNING, key, filt, value,
+                                        f"set again (earlier to {section[key]}; "
+                                        "the firmware takes this, the last)"))
+            section[key] = value
+        for r in rules.value_rules:
+            if r.filters is None or filt in r.filters:
+                message = r.check(value)
+                if message is not None:
+                    problems.append(Problem(r.severity, key, filt, value, message))
+        triggered.update(rules.cross_rules)
+    base = sections.get("all", {})
+    for i in sorted(triggered):
+        rule = cross_rules[i]
+        for (filt, section) in sections.items():
+            if not any(k in section for k in rule.keys):
+                continue
+            def get(k):
+                return(section.get(k, base.get(k)))
+            message = rule.check(get)
+            if message is not None:
+                problems.append(Problem(rule.severity, rule.keys[0], filt,
+                                        get(rule.keys[0]), message))
+    return(problems)
+
+def overlay_problems(path, catalog):
+    # the overlays the config loads which are not in catalog, and the
+    # parameters given them inline which they lack (a dtparam line's
+    # parameters an overlay lacks are the base device tree's, as the
+    # firmware takes them; which the base tree has depends on the board,
+    # so they are not checked)
+    problems = []
+    model = directives_of(path, catalog)
+    for (section, overlays) in model.section_overlays.items():
+        for o in overlays:
+            if not catalog.has_overlay(o.name):
+                problems.append(Problem(ERROR, "dtoverlay", section, o.name,
+                                        f"no such overlay in {catalog.overlays_dir}"))
+                continue
+            params = catalog.params(o.name)
+            if params is None:
+                continue # unparseable; give it the benefit of the doubt
+            for (p, owner) in o.param_owner.items():
+                if p not in params:
+                    v = owner.params[p]
+                    problems.append(Problem(ERROR, owner.kind, section,
+                                            p if v is None else f"{p}={v}",
+                                            f"overlay {o.name} has no such parameter"))
+    return(problems)
+
+def validate_config(path, catalog = None):
+    # the problems with the given config (a path, or a ConfigFile), and
+    # with its overlays, if given a catalogue of those installed
+    problems = validate_lines(active_config_lines(path))
+    if catalog is not None:
+        problems += overlay_problems(path, catalog)
+    return(problems)
+
+def check_values(values, filt = "all"):
+    # the problems with the given {key: value} settings, as if they were
+    # the whole of a config's section filt
+    return(validate_lines([(k, filt, str(v)) for (k, v) in values.items()]))
+
+def errors_only(problems):
+    return([p for p in problems if p.severity == ERROR])
@@ -13,7 +13,7 @@ setuptools.setup(
     long_description_content_type = "text/markdown",
     url = "https://github.com/sakaki-/pyconfig_gen",
     packages = setuptools.find_packages(),
-    scripts = ["bin/pyconfig_gen"],
+    scripts = ["bin/pyconfig_gen", "bin/pyconfig_gen-cli"],
     classifiers = [
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: GNU General Public License v3 or later (GPLv3+)",